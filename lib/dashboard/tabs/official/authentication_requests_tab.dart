@@ -60,6 +60,8 @@ class _OfficialAuthenticationTabState extends State<OfficialAuthenticationTab> {
               'requested_discount_rate': request['discountRate'],
               'user_photo_base64': request['userPhotoUrl'],
               'valid_id_base64': request['validIdUrl'],
+              'user_photo_thumbnail_url': request['userPhotoThumbnailUrl'] ?? request['userPhotoUrl'],
+              'valid_id_thumbnail_url': request['validIdThumbnailUrl'] ?? request['validIdUrl'],
               'status': request['status'],
               'residential_address': request['address'],
               'created_at': request['submittedAt'] ?? request['created_at'],
@@ -352,7 +354,7 @@ class _OfficialAuthenticationTabState extends State<OfficialAuthenticationTab> {
                         Expanded(
                           child: _buildPhotoCard(
                             title: 'Profile Photo',
-                            imageUrl: request['user_photo_base64'],
+                            imageUrl: request['user_photo_thumbnail_url'],
                             onTap: () => _showPhotoViewer('Profile Photo', request['user_photo_base64']),
                           ),
                         ),
@@ -360,7 +362,7 @@ class _OfficialAuthenticationTabState extends State<OfficialAuthenticationTab> {
                         Expanded(
                           child: _buildPhotoCard(
                             title: 'Valid ID',
-                            imageUrl: request['valid_id_base64'],
+                            imageUrl: request['valid_id_thumbnail_url'],
                             onTap: () => _showPhotoViewer('Valid ID', request['valid_id_base64']),
                           ),
                         ),
@@ -667,8 +669,20 @@ class _OfficialAuthenticationTabState extends State<OfficialAuthenticationTab> {
     );
   }
 
-  // Helper method to safely build image from Base64 with validation
+  // Helper method to safely build image from a document URL or Base64 with validation
   Widget _buildValidImage(String imageUrl) {
+    if (imageUrl.startsWith('http')) {
+      return Image.network(
+        imageUrl,
+        fit: BoxFit.cover,
+        width: double.infinity,
+        height: double.infinity,
+        errorBuilder: (context, error, stackTrace) {
+          print('❌ Error displaying image: $error');
+          return _buildImagePlaceholder();
+        },
+      );
+    }
     try {
       // Extract Base64 string if it's a data URL
       String base64String = imageUrl.startsWith('data:') 
@@ -767,11 +781,15 @@ class _PhotoViewerScreenState extends State<PhotoViewerScreen> {
     ImageProvider imageProvider;
     
     try {
-      final cleanBase64 = widget.base64Image.startsWith('data:') ? widget.base64Image.split(',')[1] : widget.base64Image;
-      if (cleanBase64 == null || cleanBase64.isEmpty) {
-        throw Exception('Invalid base64 data');
+      if (widget.base64Image.startsWith('http')) {
+        imageProvider = NetworkImage(widget.base64Image);
+      } else {
+        final cleanBase64 = widget.base64Image.startsWith('data:') ? widget.base64Image.split(',')[1] : widget.base64Image;
+        if (cleanBase64 == null || cleanBase64.isEmpty) {
+          throw Exception('Invalid base64 data');
+        }
+        imageProvider = MemoryImage(base64.decode(cleanBase64));
       }
-      imageProvider = MemoryImage(base64.decode(cleanBase64));
     } catch (e) {
       print('❌ Error loading image: $e');
       return Scaffold(
@@ -464,7 +464,8 @@ class _OfficialBookingRequestsTabState extends State<OfficialBookingRequestsTab>
                     final userEmail = booking['user_email'] ?? 'Not provided';
                     final contactNumber = _getSafeString(booking['contact_number'] ?? booking['contactNumber']);
                     final address = _getSafeString(booking['address']);
-                    final receiptUrl = booking['receiptBase64'] ?? booking['receipt_base64'];
+                    // Lists show the small thumbnail; BookingDetailScreen loads the full receipt
+                    final receiptUrl = booking['receipt_thumbnail_url'] ?? booking['receiptBase64'] ?? booking['receipt_base64'];
                     final bookingId = booking['id'].toString();
                     
                     print('🔍 Official facility name: $facilityName'); // Debug logging
@@ -598,6 +599,32 @@ class _OfficialBookingRequestsTabState extends State<OfficialBookingRequestsTab>
                                   ),
                                 ),
                               
+                              // Duplicate receipt warning (same image used on another booking)
+                              if (booking['duplicate_receipt'] == true)
+                                Container(
+                                  margin: const EdgeInsets.only(top: 6),
+                                  padding: const EdgeInsets.symmetric(horizontal: 8, vertical: 4),
+                                  decoration: BoxDecoration(
+                                    color: Colors.red.shade100,
+                                    borderRadius: BorderRadius.circular(12),
+                                  ),
+                                  child: Row(
+                                    mainAxisSize: MainAxisSize.min,
+                                    children: [
+                                      Icon(Icons.warning_amber, size: 16, color: Colors.red.shade700),
+                                      const SizedBox(width: 4),
+                                      Text(
+                                        'Receipt already used on booking #${(booking['duplicate_receipt_booking_ids'] as List?)?.join(', #') ?? ''}',
+                                        style: TextStyle(
+                                          color: Colors.red.shade700,
+                                          fontSize: 12,
+                                          fontWeight: FontWeight.w500,
+                                        ),
+                                      ),
+                                    ],
+                                  ),
+                                ),
+                              
                               const SizedBox(height: 8),
                               
                               // Booking details
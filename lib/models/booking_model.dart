@@ -13,6 +13,8 @@ class Booking {
   final String status; // 'pending', 'approved', 'rejected'
   final String? paymentDetails;
   final String? receiptBase64;
+  final String? receiptUrl; // Full image, downloaded on demand
+  final String? receiptThumbnailUrl; // Small variant for lists
   final String contactNumber;
   final String address;
   final DateTime createdAt;
@@ -34,6 +36,8 @@ class Booking {
     this.status = 'pending',
     this.paymentDetails,
     this.receiptBase64,
+    this.receiptUrl,
+    this.receiptThumbnailUrl,
     this.contactNumber = '',
     this.address = '',
     required this.createdAt,
@@ -58,6 +62,8 @@ class Booking {
       status: map['status'] ?? 'pending',
       paymentDetails: map['payment_details'],
       receiptBase64: map['receipt_base64'],
+      receiptUrl: map['receipt_url'],
+      receiptThumbnailUrl: map['receipt_thumbnail_url'],
       contactNumber: map['contact_number'] ?? '',
       address: map['address'] ?? '',
       createdAt: map['created_at'] != null 
@@ -87,6 +93,8 @@ class Booking {
       'status': status,
       'payment_details': paymentDetails,
       'receipt_base64': receiptBase64,
+      'receipt_url': receiptUrl,
+      'receipt_thumbnail_url': receiptThumbnailUrl,
       'contact_number': contactNumber,
       'address': address,
       'created_at': createdAt.toIso8601String(),
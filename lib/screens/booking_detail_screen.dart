@@ -33,6 +33,9 @@ class _BookingDetailScreenState extends State<BookingDetailScreen> {
       receiptUrl = widget.booking['receipt_image'];
     } else if (widget.booking['receipt_image_url'] != null && widget.booking['receipt_image_url'].toString().isNotEmpty) {
       receiptUrl = widget.booking['receipt_image_url'];
+    } else if (widget.booking['receipt_url'] != null && widget.booking['receipt_url'].toString().isNotEmpty) {
+      // Lists no longer carry inline base64; the full image is downloaded here
+      receiptUrl = widget.booking['receipt_url'];
     }
     
     print('🔍 Receipt URL check:');
@@ -40,6 +43,7 @@ class _BookingDetailScreenState extends State<BookingDetailScreen> {
     print('  - receiptBase64: ${widget.booking['receiptBase64']}');
     print('  - receipt_image: ${widget.booking['receipt_image']}');
     print('  - receipt_image_url: ${widget.booking['receipt_image_url']}');
+    print('  - receipt_url: ${widget.booking['receipt_url']}');
     print('  - Final receiptUrl: $receiptUrl');
     
     return Scaffold(
@@ -122,7 +126,9 @@ class _BookingDetailScreenState extends State<BookingDetailScreen> {
                       ),
                       child: ClipRRect(
                         borderRadius: BorderRadius.circular(8),
-                        child: _buildBase64Image(receiptUrl),
+                        child: receiptUrl.startsWith('http')
+                            ? _buildNetworkImage(receiptUrl)
+                            : _buildBase64Image(receiptUrl),
                       ),
                     ),
                     const SizedBox(height: 8),
@@ -311,6 +317,36 @@ class _BookingDetailScreenState extends State<BookingDetailScreen> {
     }
   }
 
+  Widget _buildNetworkImage(String imageUrl) {
+    return GestureDetector(
+      onTap: () {
+        // Show fullscreen viewer
+        Navigator.push(context, MaterialPageRoute(builder: (_) {
+          return Scaffold(
+            appBar: AppBar(backgroundColor: Colors.black),
+            backgroundColor: Colors.black,
+            body: Center(
+              child: InteractiveViewer(
+                child: Image.network(imageUrl, fit: BoxFit.contain),
+              ),
+            ),
+          );
+        }));
+      },
+      child: Image.network(
+        imageUrl,
+        width: double.infinity,
+        height: 200,
+        fit: BoxFit.contain,
+        errorBuilder: (context, error, stackTrace) {
+          return const Center(
+            child: Text('Unable to load receipt image'),
+          );
+        },
+      ),
+    );
+  }
+
   Widget _buildBase64Image(String base64String) {
     print('🔍 DEBUG: _buildBase64Image called with: ${base64String.substring(0, base64String.length > 100 ? 100 : base64String.length)}...');
     
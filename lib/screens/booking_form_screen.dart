@@ -592,7 +592,8 @@ class _BookingFormScreenState extends State<BookingFormScreen> {
                 const SizedBox(height: 12),
                 
                 // Receipt image if available
-                if (booking['receipt_base64'] != null && booking['receipt_base64'].toString().isNotEmpty)
+                if ((booking['receipt_thumbnail_url'] ?? booking['receipt_base64']) != null &&
+                    (booking['receipt_thumbnail_url'] ?? booking['receipt_base64']).toString().isNotEmpty)
                   Column(
                     crossAxisAlignment: CrossAxisAlignment.start,
                     children: [
@@ -613,24 +614,17 @@ class _BookingFormScreenState extends State<BookingFormScreen> {
                         ),
                         child: ClipRRect(
                           borderRadius: BorderRadius.circular(8),
-                          child: Image.memory(
-                            base64Decode(booking['receipt_base64'].toString().split(',').last),
-                            fit: BoxFit.cover,
-                            errorBuilder: (context, error, stackTrace) {
-                              return Container(
-                                color: Colors.grey.shade100,
-                                child: const Center(
-                                  child: Column(
-                                    mainAxisAlignment: MainAxisAlignment.center,
-                                    children: [
-                                      Icon(Icons.broken_image, color: Colors.grey),
-                                      Text('Receipt image not available'),
-                                    ],
-                                  ),
+                          child: booking['receipt_thumbnail_url'] != null
+                              ? Image.network(
+                                  booking['receipt_thumbnail_url'].toString(),
+                                  fit: BoxFit.cover,
+                                  errorBuilder: (context, error, stackTrace) => _buildReceiptUnavailable(),
+                                )
+                              : Image.memory(
+                                  base64Decode(booking['receipt_base64'].toString().split(',').last),
+                                  fit: BoxFit.cover,
+                                  errorBuilder: (context, error, stackTrace) => _buildReceiptUnavailable(),
                                 ),
-                              );
-                            },
-                          ),
                         ),
                       ),
                     ],
@@ -691,6 +685,21 @@ class _BookingFormScreenState extends State<BookingFormScreen> {
     );
   }
 
+  Widget _buildReceiptUnavailable() {
+    return Container(
+      color: Colors.grey.shade100,
+      child: const Center(
+        child: Column(
+          mainAxisAlignment: MainAxisAlignment.center,
+          children: [
+            Icon(Icons.broken_image, color: Colors.grey),
+            Text('Receipt image not available'),
+          ],
+        ),
+      ),
+    );
+  }
+
   Future<void> _pickReceiptImage() async {
     try {
       final XFile? pickedFile = await _imagePicker.pickImage(
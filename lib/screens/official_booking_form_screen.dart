@@ -449,7 +449,7 @@ class _OfficialBookingFormScreenState extends State<OfficialBookingFormScreen> {
                     _buildDetailRow('Address', residentBooking['contact_address'] ?? 'N/A'),
                     _buildDetailRow('Status', residentBooking['status'] ?? 'N/A'),
                     _buildDetailRow('Purpose', residentBooking['purpose'] ?? 'N/A'),
-                    if (residentBooking['receipt_base64'] != null) ...[
+                    if ((residentBooking['receipt_thumbnail_url'] ?? residentBooking['receipt_base64']) != null) ...[
                       const SizedBox(height: 12),
                       const Text('Receipt:', style: TextStyle(fontWeight: FontWeight.bold)),
                       const SizedBox(height: 8),
@@ -464,6 +464,25 @@ class _OfficialBookingFormScreenState extends State<OfficialBookingFormScreen> {
                           borderRadius: BorderRadius.circular(8),
                           child: Builder(
                             builder: (context) {
+                              final thumbnailUrl = residentBooking['receipt_thumbnail_url'];
+                              if (thumbnailUrl != null) {
+                                return Image.network(
+                                  thumbnailUrl.toString(),
+                                  fit: BoxFit.contain,
+                                  errorBuilder: (context, error, stackTrace) {
+                                    return const Center(
+                                      child: Column(
+                                        mainAxisAlignment: MainAxisAlignment.center,
+                                        children: [
+                                          Icon(Icons.error, color: Colors.red),
+                                          SizedBox(height: 8),
+                                          Text('Error loading receipt'),
+                                        ],
+                                      ),
+                                    );
+                                  },
+                                );
+                              }
                               try {
                                 final base64String = residentBooking['receipt_base64'].toString();
                                 final cleanBase64 = base64String.contains(',') 
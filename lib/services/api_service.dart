@@ -346,8 +346,13 @@ class ApiService {
   // Get verification requests
   static Future<Map<String, dynamic>> getVerificationRequests() async {
     try {
+      // Document URLs in the response carry these, so photo downloads pass the owner/official check
+      final prefs = await SharedPreferences.getInstance();
+      final userRole = prefs.getString('user_role') ?? 'resident';
+      final params = <String, String>{'user_role': userRole};
+      if (userRole == 'resident') params['user_email'] = prefs.getString('user_email') ?? '';
       final response = await http.get(
-        Uri.parse('$baseUrl/api/verification-requests'),
+        Uri.parse('$baseUrl/api/verification-requests').replace(queryParameters: params),
         headers: await getHeaders(),
       );
 
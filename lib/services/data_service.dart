@@ -110,6 +110,11 @@ class DataService {
     }
   }
   
+  // Bookings already downloaded, by id, and the /api/bookings/changes cursor they are current to;
+  // keyed by the visibility they were fetched with (role, email, facility)
+  static final Map<String, Map<int, Map<String, dynamic>>> _syncedBookings = {};
+  static final Map<String, int> _bookingCursors = {};
+
   // Fetch bookings data with proper authentication
   static Future<Map<String, dynamic>> fetchBookings({
     String? facilityId,
@@ -117,6 +122,10 @@ class DataService {
     String? status,
     String? userRole, // Optional override for user_role
     bool? excludeUserRole, // New flag to completely exclude user_role parameter
+    String? view, // 'calendar' | 'list' | 'detail': only the fields the screen renders
+    String? fields, // Comma separated field names, overrides view
+    int? limit, // Page size; the response then carries next_cursor
+    String? cursor, // next_cursor from the previous page
   }) async {
     try {
       final userData = await getCurrentUserData();
@@ -124,11 +133,21 @@ class DataService {
         return {'success': false, 'error': 'User not logged in'};
       }
       
+      // Whole-list refreshes only download what changed since the last one
+      if (date == null && status == null && view == null && fields == null && limit == null && cursor == null) {
+        final synced = await _syncBookings(userData, facilityId, userRole, excludeUserRole);
+        if (synced != null) return synced;
+      }
+      
       // Build query parameters
       Map<String, String> queryParams = {};
       if (facilityId != null) queryParams['facility_id'] = facilityId;
       if (date != null) queryParams['date'] = date;
       if (status != null) queryParams['status'] = status;
+      if (view != null) queryParams['view'] = view;
+      if (fields != null) queryParams['fields'] = fields;
+      if (limit != null) queryParams['limit'] = limit.toString();
+      if (cursor != null) queryParams['cursor'] = cursor;
       
       // Use provided userRole or default to current user's role
       if (excludeUserRole == true) {
@@ -213,6 +232,62 @@ class DataService {
     }
   }
   
+  // Bring the cached booking list up to date through fetchBookingChanges; null when the server
+  // cannot answer (fetchBookings then downloads the whole list)
+  static Future<Map<String, dynamic>?> _syncBookings(
+    Map<String, dynamic> userData,
+    String? facilityId,
+    String? userRole,
+    bool? excludeUserRole,
+  ) async {
+    final key = '${excludeUserRole == true}|${userRole ?? userData['role']}|${userData['email']}|${facilityId ?? ''}';
+    final since = _syncedBookings.containsKey(key) ? _bookingCursors[key]! : 0;
+    final changes = await fetchBookingChanges(
+      since: since,
+      facilityId: facilityId,
+      userRole: userRole,
+      excludeUserRole: excludeUserRole,
+    );
+    if (changes['success'] != true) {
+      print('⚠️ DataService booking sync failed, fetching the full list: ${changes['error']}');
+      return null;
+    }
+    
+    // A reset (or the first sync) carries every booking: start from an empty list
+    final bookings = changes['reset'] == true || since == 0
+        ? <int, Map<String, dynamic>>{}
+        : _syncedBookings[key]!;
+    for (final booking in changes['data'] as List<Map<String, dynamic>>) {
+      bookings[booking['id'] as int] = booking;
+    }
+    for (final id in changes['deleted'] as List<int>) {
+      bookings.remove(id);
+    }
+    _syncedBookings[key] = bookings;
+    _bookingCursors[key] = changes['cursor'] as int;
+    print('🔄 DataService booking sync since $since: ${changes['data'].length} changed, '
+        '${changes['deleted'].length} deleted, ${bookings.length} total');
+    
+    // Callers may edit the rows they get, so hand out copies in the server's listing order
+    final data = bookings.values.map((booking) => Map<String, dynamic>.from(booking)).toList()
+      ..sort(_compareBookings);
+    return {'success': true, 'data': data};
+  }
+  
+  // Same order as GET /api/bookings: newest date first, then start time (unknown last), then id
+  static int _compareBookings(Map<String, dynamic> a, Map<String, dynamic> b) {
+    final byDate = (b['booking_date'] ?? '').toString().compareTo((a['booking_date'] ?? '').toString());
+    if (byDate != 0) return byDate;
+    final aStart = a['start_minute'] as int?;
+    final bStart = b['start_minute'] as int?;
+    if (aStart != bStart) {
+      if (aStart == null) return 1;
+      if (bStart == null) return -1;
+      return aStart.compareTo(bStart);
+    }
+    return (a['id'] as int).compareTo(b['id'] as int);
+  }
+  
   // Fetch time slots for a facility
   static Future<Map<String, dynamic>> fetchTimeSlots({
     required String facilityId,
@@ -235,11 +310,140 @@ class DataService {
     }
   }
   
+  // Fetch per-day availability for a calendar range (one request per month view)
+  static Future<Map<String, dynamic>> fetchAvailabilityRange({
+    required String facilityId,
+    required String from,
+    required String to,
+  }) async {
+    try {
+      final response = await http.get(
+        Uri.parse('${AppConfig.baseUrl}/api/available-timeslots/range?facility_id=$facilityId&from=$from&to=$to'),
+        headers: await getHeaders(),
+      );
+
+      if (response.statusCode == 200) {
+        final data = json.decode(response.body);
+        return {'success': true, 'data': data};
+      } else {
+        return {'success': false, 'error': 'HTTP ${response.statusCode}'};
+      }
+    } catch (e) {
+      return {'success': false, 'error': e.toString()};
+    }
+  }
+
+  // Fetch the facilities x time slots occupancy grid (official dashboard)
+  static Future<Map<String, dynamic>> fetchAvailabilityGrid({
+    required String date,
+    String? to,
+  }) async {
+    try {
+      final range = to != null ? '&to=$to' : '';
+      final response = await http.get(
+        Uri.parse('${AppConfig.baseUrl}/api/availability/grid?date=$date$range'),
+        headers: await getHeaders(),
+      );
+
+      if (response.statusCode == 200) {
+        final data = json.decode(response.body);
+        return {'success': true, 'data': data};
+      } else {
+        return {'success': false, 'error': 'HTTP ${response.statusCode}'};
+      }
+    } catch (e) {
+      return {'success': false, 'error': e.toString()};
+    }
+  }
+
+  // Fetch the earliest free slots (duration in minutes; all facilities when facilityId is null)
+  static Future<Map<String, dynamic>> fetchNextAvailable({
+    String? facilityId,
+    String? after,
+    int? duration,
+    int limit = 5,
+  }) async {
+    try {
+      final params = <String, String>{'limit': '$limit'};
+      if (facilityId != null) params['facility_id'] = facilityId;
+      if (after != null) params['after'] = after;
+      if (duration != null) params['duration'] = '$duration';
+      final response = await http.get(
+        Uri.parse('${AppConfig.baseUrl}/api/availability/next').replace(queryParameters: params),
+        headers: await getHeaders(),
+      );
+
+      if (response.statusCode == 200) {
+        final data = json.decode(response.body);
+        return {'success': true, 'data': data['data']};
+      } else {
+        return {'success': false, 'error': 'HTTP ${response.statusCode}'};
+      }
+    } catch (e) {
+      return {'success': false, 'error': e.toString()};
+    }
+  }
+
+  // Fetch only the bookings changed or deleted since the cursor of the previous call
+  // (0 on the first sync); apply 'data' then remove 'deleted', and start over when 'reset' is true
+  static Future<Map<String, dynamic>> fetchBookingChanges({
+    int since = 0,
+    String? facilityId,
+    String? userRole, // Same meaning as in fetchBookings
+    bool? excludeUserRole,
+  }) async {
+    try {
+      final userData = await getCurrentUserData();
+      if (userData == null) {
+        return {'success': false, 'error': 'User not logged in'};
+      }
+
+      final params = <String, String>{'since': '$since'};
+      if (excludeUserRole == true) {
+        params['excludeUserRole'] = 'true';
+      } else if (userRole != null) {
+        if (userRole.isNotEmpty) params['user_role'] = userRole;
+      } else {
+        params['user_role'] = userData['role'];
+      }
+      if (userData['role'] == 'resident' && excludeUserRole != true) params['user_email'] = userData['email'];
+      if (facilityId != null) params['facility_id'] = facilityId;
+      final response = await http.get(
+        Uri.parse('${AppConfig.baseUrl}/api/bookings/changes').replace(queryParameters: params),
+        headers: await getHeaders(),
+      );
+
+      if (response.statusCode == 200) {
+        final data = json.decode(response.body);
+        return {
+          'success': true,
+          'data': List<Map<String, dynamic>>.from(data['data']),
+          'deleted': List<int>.from(data['deleted']),
+          'cursor': data['cursor'],
+          'reset': data['reset'] == true,
+        };
+      } else {
+        return {'success': false, 'error': 'HTTP ${response.statusCode}'};
+      }
+    } catch (e) {
+      return {'success': false, 'error': e.toString()};
+    }
+  }
+
+  // Who is asking; document URLs in the response carry these so downloads pass the owner/official check
+  static Future<Map<String, String>> _documentAccessParams() async {
+    final userData = await getCurrentUserData();
+    final params = <String, String>{'user_role': userData?['role'] ?? 'resident'};
+    if (userData != null && userData['role'] == 'resident') params['user_email'] = userData['email'];
+    return params;
+  }
+
   // Fetch verification requests (for officials)
   static Future<Map<String, dynamic>> fetchVerificationRequests() async {
     try {
       final response = await http.get(
-        Uri.parse('${AppConfig.baseUrl}/api/verification-requests'),
+        Uri.parse('${AppConfig.baseUrl}/api/verification-requests')
+            .replace(queryParameters: await _documentAccessParams()),
         headers: await getHeaders(),
       );
       
@@ -400,7 +604,8 @@ class DataService {
   static Future<Map<String, dynamic>> getVerificationRequests() async {
     try {
       final response = await http.get(
-        Uri.parse('${AppConfig.baseUrl}/api/verification-requests'),
+        Uri.parse('${AppConfig.baseUrl}/api/verification-requests')
+            .replace(queryParameters: await _documentAccessParams()),
         headers: await getHeaders(),
       );
       
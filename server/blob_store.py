@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Blob Store for Barangay Reserve
+Receipts, ID photos and profile photos live on disk, sharded by SHA-256,
+with a reference-counted blobs table. Rows only keep the hash.
+
+Usage:
+    python blob_store.py migrate [--vacuum]   # move inline base64 out of the database
+    python blob_store.py gc                   # delete unreferenced blobs
+    python blob_store.py stats                # blob count, size and dedup ratio
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from config import Config
+
+
+# Inline base64 column -> blob hash column, per table
+DOCUMENT_COLUMNS = {
+    'bookings': [('receipt_base64', 'receipt_blob')],
+    'verification_requests': [
+        ('user_photo_base64', 'user_photo_blob'),
+        ('valid_id_base64', 'valid_id_blob'),
+        ('proof_of_residency_base64', 'proof_of_residency_blob'),
+    ],
+    'users': [('profile_photo_url', 'profile_photo_blob')],
+}
+
+# Uploads are limited to what the app actually sends: photos of receipts and IDs
+ALLOWED_MIME_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'application/pdf'}
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+_MAGIC_NUMBERS = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF8', 'image/gif'),
+    (b'%PDF', 'application/pdf'),
+]
+
+
+def sniff_mime(data):
+    for magic, mime_type in _MAGIC_NUMBERS:
+        if data.startswith(magic):
+            return mime_type
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def decode_document(value):
+    """(bytes, mime_type) for a data URL or bare base64 string, None for anything else (e.g. http URLs)"""
+    if not value or not isinstance(value, str):
+        return None
+    mime_type = None
+    if value.startswith('data:'):
+        header, _, value = value.partition(',')
+        if not header.endswith(';base64'):
+            return None
+        mime_type = header[5:-len(';base64')] or None
+    try:
+        data = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if not data:
+        return None
+    return data, mime_type or sniff_mime(data)
+
+
+def is_inline_document(value):
+    """Cheap check (no decoding) for values that hold document bytes rather than a link"""
+    return bool(value) and isinstance(value, str) and (value.startswith('data:') or '://' not in value[:16])
+
+
+def encode_data_url(data, mime_type=None):
+    return f"data:{mime_type or sniff_mime(data)};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+class BlobStore:
+    """Files under <root>/ab/cd/<sha256>; refcounts live in the blobs table of the caller's connection"""
+
+    def __init__(self, root=None):
+        self._root = root
+
+    @property
+    def root(self):
+        return self._root or Config.BLOB_DIR
+
+    def path_for(self, blob_hash):
+        return os.path.join(self.root, blob_hash[:2], blob_hash[2:4], blob_hash)
+
+    def exists(self, blob_hash):
+        return os.path.exists(self.path_for(blob_hash))
+
+    def write_bytes(self, data):
+        """Write data once (identical content is only stored once) and return its hash"""
+        blob_hash = hashlib.sha256(data).hexdigest()
+        path = self.path_for(blob_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so readers never see a partial blob
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        else:
+            os.utime(path)  # Keeps collect_garbage() from racing a new reference
+        return blob_hash
+
+    def write_stream(self, stream, max_bytes, chunk_size=CHUNK_SIZE):
+        """Copy a file-like stream to disk in chunks, hashing as it goes.
+
+        Returns (hash, size, mime_type). Never holds more than one chunk in memory and
+        raises UploadTooLarge (leaving nothing behind) once max_bytes is exceeded.
+        """
+        incoming = os.path.join(self.root, '.incoming')
+        os.makedirs(incoming, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=incoming, prefix='.tmp-')
+        digest = hashlib.sha256()
+        size = 0
+        head = b''
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadTooLarge(f'Upload exceeds {max_bytes} bytes')
+                    if len(head) < 16:
+                        head += chunk[:16]
+                    digest.update(chunk)
+                    f.write(chunk)
+            blob_hash = digest.hexdigest()
+            path = self.path_for(blob_hash)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return blob_hash, size, sniff_mime(head)
+
+    def register_upload(self, conn, blob_hash, size, mime_type):
+        """Record an uploaded blob with no references yet; attach() takes the first one"""
+        conn.execute('''
+            INSERT INTO blobs (hash, size, mime_type, refcount) VALUES (?, ?, ?, 0)
+            ON CONFLICT(hash) DO UPDATE SET created_at = CURRENT_TIMESTAMP WHERE refcount <= 0
+        ''', (blob_hash, size, mime_type))  # Restarts the garbage collection grace period
+
+    def attach(self, conn, blob_hash):
+        """Take a reference on a previously uploaded blob; False if it was never uploaded"""
+        if not blob_hash or not conn.execute('SELECT 1 FROM blobs WHERE hash = ?', (blob_hash,)).fetchone():
+            return False
+        self.incref(conn, blob_hash)
+        return True
+
+    def read_bytes(self, blob_hash):
+        with open(self.path_for(blob_hash), 'rb') as f:
+            return f.read()
+
+    def put(self, conn, data, mime_type=None):
+        """Store data and take one reference on it inside the caller's transaction"""
+        blob_hash = self.write_bytes(data)
+        conn.execute('''
+            INSERT INTO blobs (hash, size, mime_type, refcount) VALUES (?, ?, ?, 1)
+            ON CONFLICT(hash) DO UPDATE SET refcount = refcount + 1
+        ''', (blob_hash, len(data), mime_type or sniff_mime(data)))
+        return blob_hash
+
+    def incref(self, conn, blob_hash):
+        if blob_hash:
+            conn.execute('UPDATE blobs SET refcount = refcount + 1 WHERE hash = ?', (blob_hash,))
+
+    def release(self, conn, blob_hash):
+        """Drop one reference; the file itself is removed later by collect_garbage()"""
+        if blob_hash:
+            conn.execute('UPDATE blobs SET refcount = MAX(refcount - 1, 0) WHERE hash = ?', (blob_hash,))
+
+    def store_document(self, conn, value):
+        """Hash for an inline data URL/base64 value, or None when it isn't base64 content"""
+        decoded = decode_document(value)
+        if decoded is None:
+            return None
+        data, mime_type = decoded
+        return self.put(conn, data, mime_type)
+
+    def data_url(self, blob_hash):
+        """Rehydrate a blob into the data URL older clients expect in JSON responses"""
+        try:
+            return encode_data_url(self.read_bytes(blob_hash))
+        except OSError:
+            print(f"⚠️  Blob {blob_hash} is missing from {self.root}")
+            return None
+
+    def hydrate(self, row, table):
+        """Fill inline columns of a row dict from their blob hashes (no-op for unmigrated rows)"""
+        for inline_column, blob_column in DOCUMENT_COLUMNS[table]:
+            blob_hash = row.get(blob_column)
+            if blob_hash and not row.get(inline_column):
+                row[inline_column] = self.data_url(blob_hash)
+        return row
+
+    def collect_garbage(self, conn, grace_seconds=3600):
+        """Delete unreferenced blob rows, then any file without a row, once they are older than
+        grace_seconds (so fresh uploads and in-flight transactions are left alone)"""
+        conn.execute("DELETE FROM blobs WHERE refcount <= 0 AND created_at <= datetime('now', ?)",
+                     (f'-{int(grace_seconds)} seconds',))
+        conn.commit()
+        known = {row[0] for row in conn.execute('SELECT hash FROM blobs').fetchall()}
+
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if filename not in known and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    def stats(self, conn):
+        blobs, stored, refs = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(refcount), 0) FROM blobs').fetchone()
+        logical = conn.execute('SELECT COALESCE(SUM(size * refcount), 0) FROM blobs').fetchone()[0]
+        return {
+            'root': self.root,
+            'blobs': blobs,
+            'references': refs,
+            'stored_bytes': stored,
+            'referenced_bytes': logical,
+            'dedup_saved_bytes': logical - stored,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BlobStore()
+    return _store
+
+
+def migrate_inline_documents(db_path=None, batch_size=50, vacuum=False, store=None, verbose=True):
+    """Move inline base64 documents into the blob store a batch at a time.
+
+    Only batch_size rows are held in memory at once and each batch commits on its own,
+    so the migration can be interrupted and re-run safely.
+    """
+    store = store or get_blob_store()
+    conn = sqlite3.connect(db_path or Config.DATABASE_PATH, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0)
+    totals = {'moved': 0, 'skipped': 0, 'bytes': 0}
+    try:
+        for table, columns in DOCUMENT_COLUMNS.items():
+            for inline_column, blob_column in columns:
+                last_id = 0
+                while True:
+                    rows = conn.execute(f'''
+                        SELECT id, {inline_column} FROM {table}
+                        WHERE id > ? AND {blob_column} IS NULL
+                        AND {inline_column} IS NOT NULL AND {inline_column} != ''
+                        ORDER BY id LIMIT ?
+                    ''', (last_id, batch_size)).fetchall()
+                    if not rows:
+                        break
+                    for row_id, value in rows:
+                        last_id = row_id
+                        blob_hash = store.store_document(conn, value)
+                        if blob_hash is None:
+                            totals['skipped'] += 1  # URLs and other non-base64 values stay inline
+                            continue
+                        conn.execute(f'UPDATE {table} SET {blob_column} = ?, {inline_column} = NULL WHERE id = ?',
+                                     (blob_hash, row_id))
+                        totals['moved'] += 1
+                        totals['bytes'] += len(value)
+                    conn.commit()
+                    if verbose:
+                        print(f"📦 {table}.{inline_column}: moved up to id {last_id}")
+        if vacuum and totals['moved']:
+            if verbose:
+                print("🧹 Running VACUUM to return freed pages to the filesystem...")
+            conn.execute('VACUUM')
+    finally:
+        conn.close()
+    if verbose:
+        print(f"✅ Moved {totals['moved']} documents ({totals['bytes']} bytes of base64) to {store.root}, "
+              f"skipped {totals['skipped']}")
+    return totals
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    if command == 'migrate':
+        from schema_migrations import migrate
+        migrate()  # The hash columns come from migration 004
+        migrate_inline_documents(vacuum='--vacuum' in sys.argv)
+    elif command == 'gc':
+        from image_derivatives import prune_derivatives
+        conn = sqlite3.connect(Config.DATABASE_PATH)
+        try:
+            store = get_blob_store()
+            removed = store.collect_garbage(conn)
+            pruned = prune_derivatives(conn, store)  # Thumbnails of documents removed above
+            conn.commit()
+            if pruned:
+                removed += store.collect_garbage(conn)
+            print(f"🧹 Removed {removed} unreferenced blob file(s), including {pruned} thumbnail(s)/preview(s)")
+        finally:
+            conn.close()
+    elif command == 'stats':
+        conn = sqlite3.connect(Config.DATABASE_PATH)
+        try:
+            for key, value in get_blob_store().stats(conn).items():
+                print(f"📊 {key}: {value}")
+        finally:
+            conn.close()
+    else:
+        print("Usage: python blob_store.py [migrate [--vacuum]|gc|stats]")
+        sys.exit(1)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Booking Change Feed for Barangay Reserve
+Lets the app refresh its booking list with only what changed since its last
+sync instead of downloading every booking again
+
+Triggers (migration 013) stamp each inserted/updated booking with the next
+value of the 'bookings' change sequence and move deleted bookings to
+booking_tombstones. A client keeps the cursor from its last response and asks
+GET /api/bookings/changes?since=<cursor> for everything stamped after it.
+"""
+
+from config import Config
+
+# Bookings written after the cursor; the parameter is the cursor
+CHANGED_SINCE = 'b.id IN (SELECT booking_id FROM booking_changes WHERE seq > ?)'
+
+
+def _sequence(conn, name):
+    row = conn.execute('SELECT value FROM change_sequence WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def current_cursor(conn):
+    """Latest change sequence value; read it before the changes so none are missed"""
+    return _sequence(conn, 'bookings')
+
+
+def parse_since(value):
+    """?since= as a non-negative int (0 or missing: everything). Raises ValueError otherwise"""
+    if value in (None, ''):
+        return 0
+    since = int(value)
+    if since < 0:
+        raise ValueError('since must not be negative')
+    return since
+
+
+def needs_reset(conn, since):
+    """True when tombstones the client still needs were pruned: it must start over from 0"""
+    return 0 < since < _sequence(conn, 'bookings_pruned')
+
+
+def deleted_since(conn, since):
+    return [row[0] for row in conn.execute(
+        'SELECT booking_id FROM booking_tombstones WHERE seq > ? ORDER BY seq', (since,)).fetchall()]
+
+
+def prune_tombstones(conn, days=None):
+    """Forget deletions older than TOMBSTONE_RETENTION_DAYS; clients behind them get reset=true"""
+    days = Config.TOMBSTONE_RETENTION_DAYS if days is None else days
+    pruned_through = conn.execute(
+        "SELECT MAX(seq) FROM booking_tombstones WHERE deleted_at < datetime('now', ?)", (f'-{days} days',)
+    ).fetchone()[0]
+    if pruned_through is None:
+        return 0
+    deleted = conn.execute('DELETE FROM booking_tombstones WHERE seq <= ?', (pruned_through,)).rowcount
+    conn.execute('''
+        UPDATE change_sequence SET value = MAX(value, ?) WHERE name = 'bookings_pruned'
+    ''', (pruned_through,))
+    return deleted
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Booking Interval Index for Barangay Reserve
+Finds bookings whose time range overlaps a proposed one, for the same
+facility and day, through an R*Tree in SQLite
+
+Each active (pending/approved) booking is a box facility x day x [start, end)
+minute in booking_intervals, kept in sync by triggers on bookings (see
+migration 009). "ALL DAY" is 0-1440, so it overlaps every slot, and a 6-10 AM
+booking collides with an 8-10 AM one. SQLite builds without the R*Tree module
+fall back to the (facility_id, day_key, start_minute, end_minute) index.
+"""
+
+ACTIVE_STATUSES = ('pending', 'approved')
+
+
+def has_rtree(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'booking_intervals'").fetchone() is not None
+
+
+def find_conflicts(conn, facility_id, day_key, start_minute, end_minute, statuses=ACTIVE_STATUSES,
+                   exclude_booking_id=None):
+    """Ids of bookings with one of statuses that overlap [start_minute, end_minute) on that facility/day"""
+    if day_key is None or start_minute is None or end_minute is None or end_minute <= start_minute:
+        return []
+    facility_id = int(facility_id)  # Form posts send strings, and the R*Tree doesn't coerce them
+    placeholders = ', '.join('?' * len(statuses))
+    if has_rtree(conn):
+        # R*Tree boxes are closed intervals; shrinking the query by one minute on each side
+        # turns "touches" into "overlaps", so 6-8 AM and 8-10 AM don't conflict
+        rows = conn.execute(f'''
+            SELECT b.id FROM booking_intervals bi
+            JOIN bookings b ON b.id = bi.id
+            WHERE bi.facility_min <= ? AND bi.facility_max >= ?
+            AND bi.day_min <= ? AND bi.day_max >= ?
+            AND bi.start_minute <= ? AND bi.end_minute >= ?
+            AND b.status IN ({placeholders})
+            ORDER BY b.id
+        ''', (facility_id, facility_id, day_key, day_key, end_minute - 1, start_minute + 1, *statuses)).fetchall()
+    else:
+        rows = conn.execute(f'''
+            SELECT id FROM bookings
+            WHERE facility_id = ? AND day_key = ? AND start_minute < ? AND end_minute > ?
+            AND status IN ({placeholders})
+            ORDER BY id
+        ''', (facility_id, day_key, end_minute, start_minute, *statuses)).fetchall()
+    return [row[0] for row in rows if row[0] != exclude_booking_id]
+
+
+def rebuild(conn):
+    """Re-index every active booking (after bulk edits made with the triggers missing)"""
+    if not has_rtree(conn):
+        return 0
+    conn.execute('DELETE FROM booking_intervals')
+    cursor = conn.execute(f'''
+        INSERT INTO booking_intervals (id, facility_min, facility_max, day_min, day_max, start_minute, end_minute)
+        SELECT id, facility_id, facility_id, day_key, day_key, start_minute, end_minute FROM bookings
+        WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})
+        AND day_key IS NOT NULL AND start_minute IS NOT NULL AND end_minute IS NOT NULL
+    ''', ACTIVE_STATUSES)
+    return cursor.rowcount
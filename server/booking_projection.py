@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Booking Projection for Barangay Reserve
+Builds the SELECT list for booking listings, with resident privacy masking
+done in SQL instead of in a Python loop
+
+A column residents may not see is selected as
+CASE WHEN <caller owns the booking> THEN b.column ELSE 'private' END, so
+other people's contacts and receipts never leave SQLite (SQLite only reads a
+row's large base64 receipt when the CASE actually returns it).
+
+Listings can also be narrowed with ?fields=a,b or ?view=calendar|list|detail;
+only the columns those fields need are selected.
+"""
+
+from operator import itemgetter
+from pagination import SortKey, order_by
+from serializers import RowSerializer
+
+# bookings columns residents may not see on other people's bookings -> value shown instead
+MASKED_BOOKING_COLUMNS = {
+    'purpose': "'Private Booking'",
+    'special_requirements': 'NULL',
+    'contact_number': "'private'",
+    'contact_address': "'private'",
+    'receipt_base64': 'NULL',
+    'receipt_blob': 'NULL',
+    'receipt_filename': 'NULL',
+    'rejection_reason': 'NULL',
+}
+
+# Joined columns (alias -> (expression, masked value)), in the order the API has always returned them
+JOINED_COLUMNS = [
+    ('facility_name', 'f.name', None),
+    ('full_name', 'u.full_name', "'Reserved'"),
+    ('user_email', 'u.email', "'private'"),
+    ('verified', 'u.verified', None),
+    ('discount_rate', 'u.discount_rate', None),  # Overrides b.discount_rate, as before
+    ('user_role', 'u.role', None),
+]
+
+FROM_CLAUSE = '''
+    FROM bookings b
+    LEFT JOIN facilities f ON b.facility_id = f.id
+    LEFT JOIN users u ON b.user_id = u.id
+'''
+
+# The caller's own bookings; the parameter is their email, lowercased
+OWNER_PREDICATE = 'lower(u.email) = ?'
+
+# Same heuristic the app uses to spot official bookings on masked rows
+OFFICIAL_EMAIL = "COALESCE(instr(u.email, 'official') > 0 OR instr(u.email, 'barangay') > 0 OR instr(u.email, 'admin') > 0, 0)"
+
+# Fields get_bookings computes after the query -> what they are computed from
+DERIVED_FIELDS = {
+    'receipt_base64': ('receipt_blob',),  # Rebuilt from the blob store for include_documents
+    'receipt_hash': ('receipt_blob',),
+    'receipt_url': ('receipt_blob', 'has_inline_receipt'),
+    'receipt_thumbnail_url': ('receipt_blob', 'has_inline_receipt'),
+    'duplicate_receipt': ('receipt_blob',),
+    'duplicate_receipt_booking_ids': ('receipt_blob',),
+    'is_official_booking': (),
+}
+
+# Cheap stand-ins for large columns (alias -> (expression, masked value)), for fields that only
+# need to know a value is there
+PRESENCE_COLUMNS = {
+    'has_inline_receipt': ("COALESCE(b.receipt_base64, '') != ''", '0'),
+}
+
+# Columns that are selected internally but never returned
+INTERNAL_COLUMNS = ('receipt_blob',)
+
+# Named field sets for ?view=; None means every field
+VIEWS = {
+    'calendar': ('id', 'facility_id', 'facility_name', 'booking_date', 'start_time', 'end_time', 'status',
+                 'user_email', 'user_role', 'is_official_booking'),
+    'list': ('id', 'facility_id', 'facility_name', 'time_slot_id', 'booking_date', 'start_time', 'end_time',
+             'status', 'purpose', 'full_name', 'user_email', 'user_role', 'is_official_booking',
+             'total_amount', 'downpayment_amount', 'rejection_reason', 'created_at',
+             'receipt_url', 'receipt_thumbnail_url'),
+    'detail': None,
+}
+
+# Listing order; id last makes it total, so keyset pages never skip or repeat a booking
+SORT_KEYS = [
+    SortKey('b.booking_date', 'DESC', False),
+    SortKey('b.start_minute', 'ASC', True),
+    SortKey('b.id', 'ASC', False),
+]
+SORT_FIELDS = ('booking_date', 'start_minute', 'id')
+sort_values = itemgetter(*SORT_FIELDS)
+ORDER_BY = order_by(SORT_KEYS)
+
+_booking_columns = None
+
+
+def booking_columns(conn):
+    """bookings columns in table order (read once per process, like b.* but explicit)"""
+    global _booking_columns
+    if _booking_columns is None:
+        _booking_columns = [row[1] for row in conn.execute('PRAGMA table_info(bookings)').fetchall()]
+    return _booking_columns
+
+
+def available_fields(conn):
+    """Every field a booking listing can return, in response order"""
+    names = [name for name in booking_columns(conn) if name not in INTERNAL_COLUMNS]
+    names += [alias for alias, _, _ in JOINED_COLUMNS]
+    return names + [name for name in DERIVED_FIELDS if name not in names]
+
+
+def resolve_fields(conn, fields=None, view=None):
+    """Field names for ?fields= / ?view= (id always included), None for every field.
+
+    Raises ValueError for unknown fields or views.
+    """
+    if fields:
+        names = [name.strip() for name in fields.split(',') if name.strip()]
+    elif view:
+        if view not in VIEWS:
+            raise ValueError(f"Unknown view '{view}' (expected one of: {', '.join(VIEWS)})")
+        names = VIEWS[view]
+        if names is None:
+            return None
+    else:
+        return None
+    unknown = [name for name in names if name not in available_fields(conn)]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return tuple(dict.fromkeys(['id', *names]))
+
+
+def wants(fields, *names):
+    """Whether any of names will be returned for these fields"""
+    return fields is None or any(name in fields for name in names)
+
+
+def _source_columns(fields):
+    """Columns to select for these output fields, including what derived fields are computed from"""
+    if fields is None:
+        return None
+    columns = set(fields)
+    for name in fields:
+        columns.update(DERIVED_FIELDS.get(name, ()))
+    return columns
+
+
+def select_clause(conn, viewer_email=None, masked=False, fields=None):
+    """(sql, params) for SELECT ... FROM bookings b + facilities f + users u.
+
+    masked=False: every column as stored (officials).
+    masked=True with viewer_email: only that resident's bookings are unmasked.
+    masked=True without viewer_email: every booking masked (the shared calendar cache).
+    fields: output fields from resolve_fields; only the columns they need are selected.
+    """
+    params = []
+    selected = _source_columns(fields)
+    if masked and viewer_email:
+        visible = OWNER_PREDICATE
+    elif masked:
+        visible = '0'
+    else:
+        visible = None
+
+    def column(expression, alias, masked_value):
+        if visible is None or masked_value is None:
+            return f'{expression} AS {alias}'
+        if visible == OWNER_PREDICATE:
+            params.append(viewer_email.lower().strip())
+        return f'CASE WHEN {visible} THEN {expression} ELSE {masked_value} END AS {alias}'
+
+    def wanted(name):
+        return selected is None or name in selected
+
+    columns = [column(f'b.{name}', name, MASKED_BOOKING_COLUMNS.get(name))
+               for name in booking_columns(conn) if wanted(name)]
+    columns += [column(expression, alias, masked_value)
+                for alias, expression, masked_value in JOINED_COLUMNS if wanted(alias)]
+    if selected is not None:
+        columns += [column(expression, alias, masked_value)
+                    for alias, (expression, masked_value) in PRESENCE_COLUMNS.items() if alias in selected]
+    if visible is not None and wanted('is_official_booking'):
+        if visible == OWNER_PREDICATE:
+            params.append(viewer_email.lower().strip())
+        columns.append(f'CASE WHEN {visible} THEN NULL ELSE {OFFICIAL_EMAIL} END AS is_official_booking')
+    return f"SELECT {', '.join(columns)}{FROM_CLAUSE}", params
+
+
+def listing_query(conn, conditions=(), params=(), viewer_email=None, masked=False,
+                  order_by=ORDER_BY, fields=None, limit=None):
+    """(sql, params) for a filtered, ordered booking listing"""
+    sql, select_params = select_clause(conn, viewer_email, masked, fields)
+    params = select_params + list(params)
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += f' ORDER BY {order_by}'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
+
+
+# is_official_booking comes back from SQLite as 0/1 (NULL on the caller's own rows)
+ROWS = RowSerializer(booleans=('is_official_booking',))
+
+
+def fetch(conn, sql, params):
+    """Rows as dicts, through a mapper compiled once per column list"""
+    return ROWS.all(conn.execute(sql, params))
+
+
+def project(rows, fields):
+    """Rows trimmed to the requested fields (new dicts, so shared cached rows stay untouched)"""
+    if fields is None:
+        return rows
+    return [{name: row.get(name) for name in fields} for row in rows]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Masked Calendar Cache for Barangay Reserve
+Residents see every booking of a facility/day, with other people's details
+replaced by "Reserved"/"private" (masked in SQL by booking_projection.py).
+That masked list is the same for every resident, so it is built once per
+facility/day and shared; each request only merges in the caller's own bookings
+
+Entries are keyed by (facility_id, date, requested fields) and validated
+against the calendar_versions counters that triggers bump on booking, user and
+facility writes (migration 011), so writes from any process invalidate them.
+"""
+
+import threading
+from collections import OrderedDict
+from config import Config
+import time_model
+
+# Receipt fields as get_bookings returns them for a booking without a visible receipt
+_NO_RECEIPT = {'receipt_hash': None, 'receipt_url': None, 'receipt_thumbnail_url': None, 'receipt_base64': None}
+
+
+def without_receipt(booking):
+    """A masked booking (see booking_projection.py) in its final API shape"""
+    booking.pop('receipt_blob', None)
+    booking.update(_NO_RECEIPT)
+    return booking
+
+
+def cache_key(facility_id, date):
+    """(facility_id, day_key) when both filters are set, else None for the global counter"""
+    day = time_model.day_key(date) if date else None
+    if facility_id and day is not None:
+        try:
+            return int(facility_id), day
+        except ValueError:
+            return None
+    return None
+
+
+def current_version(conn, facility_id, date):
+    """Counters an entry for these filters depends on"""
+    key = cache_key(facility_id, date)
+    wanted = [key, (-1, 0)] if key else [(0, 0)]
+    rows = dict(((f, d), v) for f, d, v in conn.execute(f'''
+        SELECT facility_id, day_key, version FROM calendar_versions
+        WHERE {' OR '.join('(facility_id = ? AND day_key = ?)' for _ in wanted)}
+    ''', [value for pair in wanted for value in pair]).fetchall())
+    return tuple(rows.get(pair, 0) for pair in wanted)
+
+
+class MaskedCalendarCache:
+    """LRU of pre-masked booking lists, shared by every resident"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or Config.CALENDAR_CACHE_ENTRIES
+        self._entries = OrderedDict()  # (facility_id, date, fields) -> (version, rows)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def get(self, conn, facility_id, date, build, fields=None):
+        """Masked rows for the filters; build(conn) runs the masked query on a miss.
+
+        fields (booking_projection.resolve_fields) keeps slim and full listings apart.
+        The returned dicts are shared between requests and must not be modified.
+        """
+        key = (facility_id or None, date or None, fields)
+        version = current_version(conn, facility_id, date)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['misses'] += 1
+        rows = [without_receipt(row) for row in build(conn)]
+        with self._lock:
+            self._entries[key] = (version, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), max_entries=self.max_entries)
+
+
+def merge_own(masked_rows, own_rows):
+    """Shared masked list with the caller's own (unmasked) bookings swapped in, same order"""
+    own_by_id = {row['id']: row for row in own_rows}
+    merged = [own_by_id.pop(row['id'], row) for row in masked_rows]
+    merged.extend(own_by_id.values())  # Written after the cached list was built
+    return merged
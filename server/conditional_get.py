@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Conditional GET for Barangay Reserve
+Answers the app's constant polling with 304 Not Modified when nothing it
+depends on has changed, without running the endpoint's queries
+
+Each route declares the tables its response is built from:
+
+    @app.route('/api/facilities', methods=['GET'])
+    @conditional_get.depends_on('facilities')
+    def get_facilities(): ...
+
+Triggers (migrations 013/014) count writes per table in change_sequence.
+The ETag hashes those counters with the request URL, so a matching
+If-None-Match costs one primary-key lookup instead of the full query. No
+Last-Modified is sent: HTTP dates have one-second resolution, so
+If-Modified-Since would answer 304 for a write made in the same second.
+"""
+
+import hashlib
+import sqlite3
+from functools import wraps
+from flask import Response, make_response, request
+from werkzeug.http import is_resource_modified
+from database_manager import db_manager
+
+# View name -> tables its validator covers
+DEPENDENCIES = {}
+
+
+def table_versions(conn, tables):
+    """{name: write counter} for the tables plus the database epoch"""
+    names = ('epoch',) + tuple(tables)
+    return dict(conn.execute(f'''
+        SELECT name, value FROM change_sequence WHERE name IN ({', '.join('?' * len(names))})
+    ''', names).fetchall())
+
+
+def etag_for(conn, tables):
+    """ETag of the current request's response while the tables keep their counters"""
+    versions = table_versions(conn, tables)
+    state = ','.join(f'{name}={versions.get(name, 0)}' for name in ('epoch',) + tuple(tables))
+    return hashlib.sha256(f'{request.full_path}|{state}'.encode('utf-8')).hexdigest()[:32]
+
+
+def depends_on(*tables, manager=db_manager):
+    """Route decorator: 304 when the declared tables are unchanged since the client's copy"""
+    def decorator(view):
+        DEPENDENCIES[view.__name__] = tables
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                with manager.read_connection() as conn:
+                    etag = etag_for(conn, tables)
+            except sqlite3.Error as e:
+                # Counters missing (schema not migrated yet): serve the response uncached
+                print(f"⚠️  Conditional GET skipped for {view.__name__}: {e}")
+                return view(*args, **kwargs)
+
+            # Validators are read before the view runs, so the body is never older than its ETag
+            if not is_resource_modified(request.environ, etag=etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.cache_control.no_cache = True  # Clients may keep it but must revalidate
+            return response
+        return wrapper
+    return decorator
@@ -29,7 +29,53 @@ class Config:
     
     # Database settings - Always use server folder
     DATABASE_PATH = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), 'barangay.db'))
-    
+
+    # Connection pool settings
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 8))  # Max open connections per process
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+    DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', 30000))
+    DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', -20000))  # Negative = KiB (~20 MB page cache)
+
+    # Group-commit writer for booking writes (off by default)
+    GROUP_COMMIT_ENABLED = os.getenv('GROUP_COMMIT_ENABLED', 'False').lower() == 'true'
+    GROUP_COMMIT_MAX_BATCH = int(os.getenv('GROUP_COMMIT_MAX_BATCH', 64))
+    GROUP_COMMIT_FLUSH_MS = float(os.getenv('GROUP_COMMIT_FLUSH_MS', 5))
+    GROUP_COMMIT_TIMEOUT = float(os.getenv('GROUP_COMMIT_TIMEOUT', 30))  # Seconds a request waits before it is cancelled
+
+    # Content-addressed store for receipts, ID photos and profile photos
+    BLOB_DIR = os.getenv('BLOB_DIR', os.path.join(os.path.dirname(__file__), 'blobs'))
+    MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 10 * 1024 * 1024))  # Streamed receipt uploads
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # Any request body, incl. base64 JSON
+
+    # Thumbnail/preview generation (needs Pillow); runs in a separate process pool
+    IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+    IMAGE_QUEUE_LIMIT = int(os.getenv('IMAGE_QUEUE_LIMIT', 16))  # Jobs in flight before new ones are skipped
+    THUMBNAIL_SIZE = int(os.getenv('THUMBNAIL_SIZE', 160))  # Longest edge in pixels
+    PREVIEW_SIZE = int(os.getenv('PREVIEW_SIZE', 800))
+    DERIVATIVE_RETRY_SECONDS = int(os.getenv('DERIVATIVE_RETRY_SECONDS', 300))  # Wait before re-rendering a failed variant
+    RECEIPT_SIMILARITY_THRESHOLD = int(os.getenv('RECEIPT_SIMILARITY_THRESHOLD', 10))  # Max differing pHash bits (of 64)
+
+    # Longest span GET /api/available-timeslots/range answers in one request
+    AVAILABILITY_RANGE_MAX_DAYS = int(os.getenv('AVAILABILITY_RANGE_MAX_DAYS', 92))
+    AVAILABILITY_GRID_MAX_DAYS = int(os.getenv('AVAILABILITY_GRID_MAX_DAYS', 14))  # Every facility per day
+
+    # Pre-masked resident calendars kept in memory (facility/day entries)
+    CALENDAR_CACHE_ENTRIES = int(os.getenv('CALENDAR_CACHE_ENTRIES', 256))
+
+    # Encoder for list responses: 'auto' uses orjson when installed, 'json' is the standard library
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto').lower()
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 500))  # Rows fetched per chunk of a streamed listing
+
+    # Keyset pagination of listings (?limit=&cursor=)
+    PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 50))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 200))
+
+    # Deleted-booking tombstones kept for GET /api/bookings/changes; older cursors get a full resync
+    TOMBSTONE_RETENTION_DAYS = int(os.getenv('TOMBSTONE_RETENTION_DAYS', 90))
+
+    # Run the EXPLAIN QUERY PLAN index advisor when the server starts
+    INDEX_ADVISOR_ON_STARTUP = os.getenv('INDEX_ADVISOR_ON_STARTUP', 'True').lower() == 'true'
+
     # DuckDNS settings (from environment)
     DUCKDNS_DOMAIN = os.getenv('DUCKDNS_DOMAIN', '')
     DUCKDNS_TOKEN = os.getenv('DUCKDNS_TOKEN', '')
@@ -1,64 +1,159 @@
 #!/usr/bin/env python3
 """
 Database Manager for Barangay Reserve
-Handles all database connections with proper locking prevention
+Concurrent readers / single writer access to the SQLite database
+
+Reads borrow their own pooled connection and run in parallel (the database is
+in WAL mode, so they never block the writer). Writes are funnelled through one
+dedicated writer connection that opens every transaction with BEGIN IMMEDIATE,
+so two writers never race to upgrade a read lock into a write lock.
 """
 
 import sqlite3
 import threading
+import time
 from contextlib import contextmanager
 from config import Config
+from db_pool import ConnectionPool, configure_connection, get_pool
+
+
+class WriteRollback(Exception):
+    """Raised inside a write operation to roll it back but still hand a result to the caller"""
+
+    def __init__(self, result=None):
+        super().__init__(result)
+        self.result = result
 
-# Global lock for database access
-db_lock = threading.Lock()
 
 class DatabaseManager:
-    def __init__(self):
-        self.db_path = Config.DATABASE_PATH
-    
+    def __init__(self, db_path=None):
+        # None means "follow Config.DATABASE_PATH" and share the server-wide pool
+        self._db_path = db_path
+        self._pool = None
+        self._writer_lock = threading.Lock()
+        self._writer_conn = None
+        self._stats_lock = threading.Lock()
+        self._reads = 0
+        self._writes = 0
+        self._rollbacks = 0
+        self._lock_wait = 0.0
+        self._lock_wait_max = 0.0
+        self._lock_hold = 0.0
+        self._lock_hold_max = 0.0
+
+    @property
+    def db_path(self):
+        return self._db_path or Config.DATABASE_PATH
+
+    @property
+    def pool(self):
+        if self._db_path is None:
+            return get_pool()
+        if self._pool is None:
+            self._pool = ConnectionPool(self._db_path)
+        return self._pool
+
     @contextmanager
-    def get_connection(self):
-        """Context manager for database connections with proper locking"""
-        conn = None
+    def read_connection(self):
+        """Borrow a connection for reads; runs concurrently with other readers and the writer"""
+        with self._stats_lock:
+            self._reads += 1
+        with self.pool.connection() as conn:
+            yield conn
+
+    def _get_writer(self):
+        if self._writer_conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0,
+                                   check_same_thread=False, isolation_level=None)
+            self._writer_conn = configure_connection(conn)
+        return self._writer_conn
+
+    @contextmanager
+    def write_connection(self):
+        """Hold the single writer connection inside a BEGIN IMMEDIATE transaction"""
+        wait_started = time.perf_counter()
+        with self._writer_lock:
+            acquired = time.perf_counter()
+            waited = acquired - wait_started
+            conn = self._get_writer()
+            succeeded = False
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                yield conn
+                if conn.in_transaction:
+                    conn.execute('COMMIT')
+                succeeded = True
+            finally:
+                if not succeeded and conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                held = time.perf_counter() - acquired
+                with self._stats_lock:
+                    self._writes += 1
+                    if not succeeded:
+                        self._rollbacks += 1
+                    self._lock_wait += waited
+                    self._lock_wait_max = max(self._lock_wait_max, waited)
+                    self._lock_hold += held
+                    self._lock_hold_max = max(self._lock_hold_max, held)
+
+    def run_write(self, operation, *args, **kwargs):
+        """Run operation(conn, *args) in one write transaction and return its result.
+
+        If the operation raises WriteRollback, its changes are rolled back and the
+        exception's result is returned instead.
+        """
         try:
-            with db_lock:
-                conn = sqlite3.connect(self.db_path, timeout=30.0)  # 30 second timeout
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                # Enable WAL mode for better concurrency
-                cursor.execute('PRAGMA journal_mode=WAL')
-                cursor.execute('PRAGMA synchronous=NORMAL')
-                cursor.execute('PRAGMA cache_size=10000')
-                cursor.execute('PRAGMA temp_store=MEMORY')
-                
-                yield conn, cursor
-                
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            raise e
-        finally:
-            if conn:
-                conn.commit()
-                conn.close()
+            with self.write_connection() as conn:
+                return operation(conn, *args, **kwargs)
+        except WriteRollback as rollback:
+            return rollback.result
+
+    @contextmanager
+    def get_connection(self):
+        """Backwards compatible (conn, cursor) context; runs on the writer and commits on exit"""
+        with self.write_connection() as conn:
+            yield conn, conn.cursor()
+
+    def stats(self):
+        with self._stats_lock:
+            writes = self._writes
+            return {
+                'reads': self._reads,
+                'writes': writes,
+                'rollbacks': self._rollbacks,
+                'writer_lock_wait_ms_total': round(self._lock_wait * 1000, 3),
+                'writer_lock_wait_ms_avg': round(self._lock_wait * 1000 / writes, 3) if writes else 0.0,
+                'writer_lock_wait_ms_max': round(self._lock_wait_max * 1000, 3),
+                'writer_lock_hold_ms_total': round(self._lock_hold * 1000, 3),
+                'writer_lock_hold_ms_avg': round(self._lock_hold * 1000 / writes, 3) if writes else 0.0,
+                'writer_lock_hold_ms_max': round(self._lock_hold_max * 1000, 3),
+                'pool': self.pool.stats(),
+            }
+
+    def close(self):
+        with self._writer_lock:
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
+
 
 # Global instance
 db_manager = DatabaseManager()
 
 # Convenience functions
 def get_db_connection():
-    """Get database connection with proper locking"""
+    """Get a (conn, cursor) pair on the writer connection"""
     return db_manager.get_connection()
 
 def execute_query(query, params=None, fetch_one=False, fetch_all=True):
-    """Execute a query with proper connection management"""
-    with get_db_connection() as (conn, cursor):
+    """Execute a read query on a concurrent reader connection"""
+    with db_manager.read_connection() as conn:
+        cursor = conn.cursor()
         if params:
             cursor.execute(query, params)
         else:
             cursor.execute(query)
-        
+
         if fetch_one:
             return cursor.fetchone()
         elif fetch_all:
@@ -67,8 +162,9 @@ def execute_query(query, params=None, fetch_one=False, fetch_all=True):
             return None
 
 def execute_update(query, params=None):
-    """Execute an update query with proper connection management"""
-    with get_db_connection() as (conn, cursor):
+    """Execute an update query on the single writer connection"""
+    with db_manager.write_connection() as conn:
+        cursor = conn.cursor()
         if params:
             cursor.execute(query, params)
         else:
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+SQLite Connection Pool for Barangay Reserve
+Hands out pre-configured, reusable connections instead of opening a new
+database file handle on every request
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+
+
+def configure_connection(conn):
+    """Apply the per-connection PRAGMAs once, right after the connection is opened"""
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA cache_size={int(Config.DB_CACHE_SIZE)}')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute(f'PRAGMA busy_timeout={int(Config.DB_BUSY_TIMEOUT_MS)}')
+    cursor.close()
+    return conn
+
+
+class PooledConnection:
+    """Thin wrapper around sqlite3.Connection whose close() returns it to the pool"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Same semantics as sqlite3.Connection: commit or roll back, don't close
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __del__(self):
+        # Safety net for code paths that return early without calling close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of configured SQLite connections with hit/miss/wait metrics"""
+
+    def __init__(self, db_path, max_size=None, timeout=None):
+        self.db_path = db_path
+        self.max_size = max_size or Config.DB_POOL_SIZE
+        self.timeout = timeout if timeout is not None else Config.DB_POOL_TIMEOUT
+        # LIFO so the most recently used (warmest page cache) connection is reused first
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0,
+                               check_same_thread=False)
+        return configure_connection(conn)
+
+    def acquire(self):
+        """Borrow a connection; call close() on the returned object to give it back"""
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self._hits += 1
+                self._in_use += 1
+            return PooledConnection(self, conn)
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.max_size
+            if can_create:
+                self._created += 1
+                self._misses += 1
+                self._in_use += 1
+
+        if can_create:
+            try:
+                return PooledConnection(self, self._connect())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                    self._in_use -= 1
+                raise
+
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise sqlite3.OperationalError(
+                f'Connection pool exhausted ({self.max_size} connections in use)')
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._waits += 1
+            self._wait_time += waited
+            self._in_use += 1
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """Return a raw connection to the pool, discarding any uncommitted work"""
+        with self._lock:
+            self._in_use -= 1
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            # Broken connection - drop it so a fresh one gets created next time
+            with self._lock:
+                self._created -= 1
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager that borrows a connection and always returns it"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            requests = self._hits + self._misses + self._waits
+            return {
+                'db_path': self.db_path,
+                'max_size': self.max_size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+                'hits': self._hits,
+                'misses': self._misses,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'total_wait_ms': round(self._wait_time * 1000, 3),
+                'avg_wait_ms': round(self._wait_time * 1000 / self._waits, 3) if self._waits else 0.0,
+                'hit_ratio': round(self._hits / requests, 4) if requests else 0.0,
+            }
+
+    def close_all(self):
+        """Close every idle connection (connections in use are closed on release)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+            conn.close()
+
+
+# Global pool, created lazily so Config.DATABASE_PATH can be overridden first
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(Config.DATABASE_PATH)
+    return _pool
+
+
+def reset_pool():
+    """Drop the global pool (used by scripts/tests that switch database files)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = None
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Group-Commit Writer for Barangay Reserve
+Batches queued write operations into a single transaction (one fsync per batch)
+
+Each operation runs inside its own SAVEPOINT, so one failing booking does not
+undo the others in its batch. Callers get a Future that resolves to their own
+result (or exception) once the whole batch has been committed. A caller that
+stops waiting cancels its Future, and the writer skips cancelled requests, so
+a write never commits after its client was told it failed.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from config import Config
+from database_manager import WriteRollback
+
+
+class _WriteRequest:
+    __slots__ = ('operation', 'args', 'kwargs', 'future', 'enqueued_at')
+
+    def __init__(self, operation, args, kwargs):
+        self.operation = operation
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class GroupCommitWriter:
+    def __init__(self, manager, max_batch_size=None, flush_interval_ms=None):
+        self.manager = manager
+        self.max_batch_size = max_batch_size or Config.GROUP_COMMIT_MAX_BATCH
+        self.flush_interval = (flush_interval_ms if flush_interval_ms is not None
+                               else Config.GROUP_COMMIT_FLUSH_MS) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = False
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._operations = 0
+        self._failed_batches = 0
+        self._cancelled = 0
+        self._max_batch = 0
+        self._queue_latency = 0.0
+        self._queue_latency_max = 0.0
+        self._commit_time = 0.0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, operation, *args, **kwargs):
+        """Queue operation(conn, *args, **kwargs); returns a Future for its result"""
+        if self._thread is None:
+            self.start()
+        request = _WriteRequest(operation, args, kwargs)
+        self._queue.put(request)
+        return request.future
+
+    def run(self, operation, *args, timeout=None, **kwargs):
+        """submit() and wait for the result. After timeout seconds the request is cancelled and
+        TimeoutError raised; if its batch had already started, the result is waited for instead."""
+        future = self.submit(operation, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise  # Never applied: safe for the client to retry
+            return future.result()
+
+    def stop(self, timeout=5):
+        self._stopping = True
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.flush_interval
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._stopping = True
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect_batch(first)
+            self._apply(batch)
+            if self._stopping and self._queue.empty():
+                break
+
+    def _apply(self, batch):
+        # Requests whose callers gave up are dropped; the rest can no longer be cancelled
+        live = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if len(live) < len(batch):
+            with self._stats_lock:
+                self._cancelled += len(batch) - len(live)
+        batch = live
+        if not batch:
+            return
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            with self.manager.write_connection() as conn:
+                for index, request in enumerate(batch):
+                    savepoint = f'op_{index}'
+                    conn.execute(f'SAVEPOINT {savepoint}')
+                    try:
+                        result = request.operation(conn, *request.args, **request.kwargs)
+                        conn.execute(f'RELEASE {savepoint}')
+                        outcomes.append((True, result))
+                    except WriteRollback as rollback:
+                        conn.execute(f'ROLLBACK TO {savepoint}')
+                        conn.execute(f'RELEASE {savepoint}')
+                        outcomes.append((True, rollback.result))
+                    except Exception as e:
+                        conn.execute(f'ROLLBACK TO {savepoint}')
+                        conn.execute(f'RELEASE {savepoint}')
+                        outcomes.append((False, e))
+        except Exception as e:
+            # The batch itself failed to commit - nothing in it was applied
+            with self._stats_lock:
+                self._failed_batches += 1
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        with self._stats_lock:
+            self._batches += 1
+            self._operations += len(batch)
+            self._max_batch = max(self._max_batch, len(batch))
+            self._commit_time += finished - started
+            for request in batch:
+                latency = started - request.enqueued_at
+                self._queue_latency += latency
+                self._queue_latency_max = max(self._queue_latency_max, latency)
+
+        # Only resolve futures once the batch is durable
+        for request, (ok, value) in zip(batch, outcomes):
+            if ok:
+                request.future.set_result(value)
+            else:
+                request.future.set_exception(value)
+
+    def stats(self):
+        with self._stats_lock:
+            batches = self._batches
+            operations = self._operations
+            return {
+                'max_batch_size': self.max_batch_size,
+                'flush_interval_ms': round(self.flush_interval * 1000, 3),
+                'queued': self._queue.qsize(),
+                'batches': batches,
+                'failed_batches': self._failed_batches,
+                'cancelled': self._cancelled,
+                'operations': operations,
+                'avg_batch_size': round(operations / batches, 2) if batches else 0.0,
+                'max_batch_seen': self._max_batch,
+                'queue_latency_ms_avg': round(self._queue_latency * 1000 / operations, 3) if operations else 0.0,
+                'queue_latency_ms_max': round(self._queue_latency_max * 1000, 3),
+                'batch_commit_ms_avg': round(self._commit_time * 1000 / batches, 3) if batches else 0.0,
+            }
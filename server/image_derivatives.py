@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Image Derivatives for Barangay Reserve
+Small thumbnails and medium previews of receipts and ID photos, generated in a
+bounded process pool and cached in the blob store
+
+Lists show thumbnails and detail views fetch the full image. Derivatives are
+scheduled on ingest, or lazily the first time a variant is requested (the
+original is served until the derivative is ready). Needs Pillow; without it
+every variant falls back to the original.
+"""
+
+import io
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional: thumbnails are skipped, originals still served
+    Image = None
+
+
+def _variant_sizes():
+    return {'thumb': Config.THUMBNAIL_SIZE, 'preview': Config.PREVIEW_SIZE}
+
+
+VARIANTS = ('thumb', 'preview')
+JPEG_QUALITY = 82
+
+
+def render_variant(source_path, max_edge, quality=JPEG_QUALITY):
+    """Downscale an image file to a JPEG whose longest edge is max_edge (runs in a worker process)"""
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)  # Phone photos carry their rotation in EXIF
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.thumbnail((max_edge, max_edge))
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=quality, optimize=True)
+        return output.getvalue(), image.size
+
+
+class DerivativeCache:
+    """Looks up, schedules and records derivatives; at most queue_limit jobs are in flight"""
+
+    def __init__(self, manager, store, max_workers=None, queue_limit=None, retry_seconds=None):
+        self.manager = manager
+        self.store = store
+        self.max_workers = max_workers or Config.IMAGE_WORKERS
+        self.retry_seconds = Config.DERIVATIVE_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self._slots = threading.BoundedSemaphore(queue_limit or Config.IMAGE_QUEUE_LIMIT)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._failed = {}  # (source_hash, variant) -> when rendering last failed; retried after retry_seconds
+        self._ready = set()  # Rendered by this process, so re-scheduling is a no-op
+        self._stats = {'generated': 0, 'failed': 0, 'skipped_busy': 0, 'hits': 0, 'misses': 0}
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def lookup(self, conn, source_hash, variant):
+        """Hash of a ready derivative, or None"""
+        row = conn.execute('SELECT derived_hash FROM blob_derivatives WHERE source_hash = ? AND variant = ?',
+                           (source_hash, variant)).fetchone()
+        with self._lock:
+            self._stats['hits' if row else 'misses'] += 1
+        return row[0] if row else None
+
+    def submit(self, fn, *args, on_done=None):
+        """Run fn(*args) in the worker pool if a slot is free; False (nothing queued) when saturated.
+
+        on_done(future) is called from the pool's result thread once fn finishes.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['skipped_busy'] += 1
+            return False
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        def done(f):
+            # The job has left the pool, so its slot is free before on_done runs (it may submit more)
+            self._slots.release()
+            if on_done is not None:
+                on_done(f)
+        future.add_done_callback(done)
+        return True
+
+    def schedule(self, source_hash, variants=VARIANTS, mime_type=None):
+        """Queue missing derivatives without waiting for them; returns the number of jobs queued"""
+        if not self.available or not source_hash:
+            return 0
+        if mime_type is not None and not mime_type.startswith('image/'):
+            return 0
+        queued = 0
+        for variant in variants:
+            key = (source_hash, variant)
+            with self._lock:
+                if key in self._pending or key in self._ready or self._failed_recently(key):
+                    continue
+                self._pending.add(key)
+            if not self.submit(render_variant, self.store.path_for(source_hash), _variant_sizes()[variant],
+                               on_done=lambda f, key=key: self._record(key, f)):
+                # Pool is saturated: skip for now, the next request for this variant retries
+                with self._lock:
+                    self._pending.discard(key)
+                break
+            queued += 1
+        return queued
+
+    def _failed_recently(self, key):
+        """True while a failed render is inside its retry window (caller holds the lock); a
+        transient error (worker crash, pool shutdown, I/O) doesn't hide a thumbnail for good"""
+        failed_at = self._failed.get(key)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at < self.retry_seconds:
+            return True
+        del self._failed[key]
+        return False
+
+    def _record(self, key, future):
+        source_hash, variant = key
+        try:
+            data, (width, height) = future.result()
+            with self.manager.write_connection() as conn:
+                if conn.execute('SELECT 1 FROM blob_derivatives WHERE source_hash = ? AND variant = ?',
+                                key).fetchone() is None:
+                    derived_hash = self.store.put(conn, data, 'image/jpeg')
+                    conn.execute('''
+                        INSERT INTO blob_derivatives (source_hash, variant, derived_hash, width, height)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (source_hash, variant, derived_hash, width, height))
+            with self._lock:
+                self._ready.add(key)
+                self._stats['generated'] += 1
+        except Exception as e:
+            print(f"⚠️  Could not create {variant} for blob {source_hash[:12]}: {e}")
+            with self._lock:
+                self._failed[key] = time.monotonic()
+                self._stats['failed'] += 1
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def prune(self, conn):
+        return prune_derivatives(conn, self.store)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+            stats['failed_recently'] = len(self._failed)
+        stats['available'] = self.available
+        stats['max_workers'] = self.max_workers
+        return stats
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def prune_derivatives(conn, store):
+    """Drop derivatives whose source blob was garbage collected, releasing their own blobs"""
+    orphans = conn.execute('''
+        SELECT d.source_hash, d.variant, d.derived_hash FROM blob_derivatives d
+        LEFT JOIN blobs b ON b.hash = d.source_hash
+        WHERE b.hash IS NULL
+    ''').fetchall()
+    for source_hash, variant, derived_hash in orphans:
+        store.release(conn, derived_hash)
+        conn.execute('DELETE FROM blob_derivatives WHERE source_hash = ? AND variant = ?', (source_hash, variant))
+    return len(orphans)
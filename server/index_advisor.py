@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Hot-Query Index Advisor for Barangay Reserve
+Runs EXPLAIN QUERY PLAN over the queries behind the busiest endpoints, flags
+full table scans and creates (or recommends) the indexes that remove them
+
+Usage:
+    python index_advisor.py            # human readable report
+    python index_advisor.py --json     # machine readable report
+    python index_advisor.py --apply    # create missing recommended indexes first
+"""
+
+import json
+import sqlite3
+import sys
+from config import Config
+
+
+# Queries issued by the hot endpoints in server.py, with representative parameters
+HOT_QUERIES = [
+    {
+        'name': 'get_bookings.facility_date',
+        'endpoint': 'GET /api/bookings',
+        'sql': '''
+            SELECT b.*, f.name as facility_name, u.full_name, u.email as user_email
+            FROM bookings b
+            LEFT JOIN facilities f ON b.facility_id = f.id
+            LEFT JOIN users u ON b.user_id = u.id
+            WHERE b.facility_id = ? AND b.booking_date = ?
+            ORDER BY b.booking_date DESC, b.start_minute ASC, b.id ASC
+        ''',
+        'params': (1, '2026-01-01'),
+    },
+    {
+        'name': 'get_bookings.keyset_page',
+        'endpoint': 'GET /api/bookings?limit=&cursor=',
+        'sql': '''
+            SELECT b.id, b.booking_date, b.start_minute, b.status FROM bookings b
+            WHERE b.booking_date <= ? AND ((b.booking_date < ?) OR (b.booking_date = ? AND b.start_minute > ?)
+                  OR (b.booking_date = ? AND b.start_minute = ? AND b.id > ?))
+            ORDER BY b.booking_date DESC, b.start_minute ASC, b.id ASC
+            LIMIT ?
+        ''',
+        'params': ('2026-01-01', '2026-01-01', '2026-01-01', 360, '2026-01-01', 360, 10, 51),
+    },
+    {
+        'name': 'create_booking.user_lookup',
+        'endpoint': 'POST /api/bookings',
+        'sql': 'SELECT id, role, is_banned, ban_reason FROM users WHERE email = ?',
+        'params': ('resident@barangay.com',),
+    },
+    {
+        'name': 'create_booking.duplicate_check',
+        'endpoint': 'POST /api/bookings',
+        'sql': '''
+            SELECT id, user_id, status FROM bookings
+            WHERE facility_id = ? AND booking_date = ? AND start_time = ? AND user_id = ?
+        ''',
+        'params': (1, '2026-01-01', '6:00 AM - 8:00 AM', 1),
+    },
+    {
+        'name': 'create_booking.official_overlap',
+        'endpoint': 'POST /api/bookings',
+        'sql': '''
+            SELECT b.id FROM booking_intervals bi
+            JOIN bookings b ON b.id = bi.id
+            WHERE bi.facility_min <= ? AND bi.facility_max >= ? AND bi.day_min <= ? AND bi.day_max >= ?
+            AND bi.start_minute <= ? AND bi.end_minute >= ?
+            AND b.status IN ('pending', 'approved')
+        ''',
+        'params': (1, 1, 20454, 20454, 1439, 1),
+    },
+    {
+        'name': 'create_booking.pending_count',
+        'endpoint': 'POST /api/bookings',
+        'sql': "SELECT COUNT(*) FROM bookings WHERE user_id = ? AND status = 'pending'",
+        'params': (1,),
+    },
+    {
+        'name': 'get_available_timeslots.slots',
+        'endpoint': 'GET /api/available-timeslots',
+        'sql': 'SELECT id, start_time, end_time FROM time_slots WHERE facility_id = ? ORDER BY sort_order, id',
+        'params': (1,),
+    },
+    {
+        'name': 'get_available_timeslots.occupancy',
+        'endpoint': 'GET /api/available-timeslots',
+        'sql': 'SELECT states FROM slot_occupancy WHERE facility_id = ? AND day_key = ?',
+        'params': (1, 20454),
+    },
+    {
+        'name': 'update_booking_status.competitors',
+        'endpoint': 'PUT /api/bookings/<id>/status',
+        'sql': '''
+            SELECT b.id FROM booking_intervals bi
+            JOIN bookings b ON b.id = bi.id
+            WHERE bi.facility_min <= ? AND bi.facility_max >= ? AND bi.day_min <= ? AND bi.day_max >= ?
+            AND bi.start_minute <= ? AND bi.end_minute >= ?
+            AND b.status IN ('pending')
+        ''',
+        'params': (1, 1, 20454, 20454, 479, 361),
+    },
+    {
+        'name': 'verification_requests.keyset_page',
+        'endpoint': 'GET /api/verification-requests?limit=&cursor=',
+        'sql': '''
+            SELECT vr.id, vr.status FROM verification_requests vr
+            WHERE COALESCE(vr.created_at, '') <= ?
+            AND ((COALESCE(vr.created_at, '') < ?) OR (COALESCE(vr.created_at, '') = ? AND vr.id < ?))
+            ORDER BY COALESCE(vr.created_at, '') DESC, vr.id DESC
+            LIMIT ?
+        ''',
+        'params': ('2026-01-01 00:00:00', '2026-01-01 00:00:00', '2026-01-01 00:00:00', 10, 51),
+    },
+    {
+        'name': 'get_verification_status.pending',
+        'endpoint': 'GET /api/verification-requests/status/<user_id>',
+        'sql': "SELECT COUNT(*) FROM verification_requests WHERE user_id = ? AND status = 'pending'",
+        'params': (1,),
+    },
+]
+
+# Indexes that cover the hot queries above: name -> (table, columns)
+RECOMMENDED_INDEXES = {
+    'idx_bookings_facility_date_slot_status': ('bookings', ('facility_id', 'booking_date', 'start_time', 'status')),
+    'idx_bookings_user_status': ('bookings', ('user_id', 'status')),
+    'idx_verification_user_status': ('verification_requests', ('user_id', 'status')),
+    'idx_time_slots_facility_order': ('time_slots', ('facility_id', 'sort_order')),
+    'idx_verification_created_id': ('verification_requests', ("COALESCE(created_at, '')", 'id')),
+}
+
+
+def _existing_index_columns(conn, table):
+    """{index_name: (columns...)} for every index on table, including autoindexes"""
+    indexes = {}
+    for row in conn.execute(f'PRAGMA index_list({table})').fetchall():
+        name = row[1]
+        columns = tuple(info[2] for info in conn.execute(f'PRAGMA index_info({name})').fetchall())
+        indexes[name] = columns
+    return indexes
+
+
+def missing_indexes(conn):
+    """Recommended indexes whose column list isn't already the prefix of an existing index"""
+    missing = {}
+    for name, (table, columns) in RECOMMENDED_INDEXES.items():
+        existing = _existing_index_columns(conn, table)
+        # Expression columns have no name in PRAGMA index_info, so those indexes are matched by name
+        if name not in existing and not any(cols[:len(columns)] == columns for cols in existing.values()):
+            missing[name] = (table, columns)
+    return missing
+
+
+def create_indexes(conn, indexes=None):
+    indexes = missing_indexes(conn) if indexes is None else indexes
+    for name, (table, columns) in indexes.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table}({", ".join(columns)})')
+    conn.commit()
+    return sorted(indexes)
+
+
+def explain(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN detail strings for one query"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+
+
+def _full_scans(plan):
+    # "SCAN b" is a full table scan; "SCAN b USING INDEX ..." walks an index instead,
+    # and "SCAN bi VIRTUAL TABLE INDEX ..." is an R*Tree search
+    return [step for step in plan if step.startswith('SCAN ') and 'USING' not in step and 'VIRTUAL TABLE' not in step]
+
+
+def analyze(conn):
+    """Machine readable report of every hot query's plan"""
+    queries = []
+    for query in HOT_QUERIES:
+        try:
+            plan = explain(conn, query['sql'], query['params'])
+        except sqlite3.OperationalError as e:
+            queries.append({'name': query['name'], 'endpoint': query['endpoint'], 'status': 'error', 'error': str(e)})
+            continue
+        scans = _full_scans(plan)
+        temp_sorts = [step for step in plan if 'TEMP B-TREE' in step]
+        queries.append({
+            'name': query['name'],
+            'endpoint': query['endpoint'],
+            'status': 'full_scan' if scans else 'ok',
+            'full_scans': scans,
+            'temp_sorts': temp_sorts,
+            'plan': plan,
+        })
+    missing = missing_indexes(conn)
+    return {
+        'queries': queries,
+        'full_scan_count': sum(1 for q in queries if q['status'] == 'full_scan'),
+        'missing_indexes': [
+            {'name': name, 'table': table, 'columns': list(columns),
+             'sql': f'CREATE INDEX {name} ON {table}({", ".join(columns)})'}
+            for name, (table, columns) in sorted(missing.items())
+        ],
+    }
+
+
+def run(db_path=None, apply=False):
+    conn = sqlite3.connect(db_path or Config.DATABASE_PATH)
+    try:
+        created = create_indexes(conn) if apply else []
+        report = analyze(conn)
+        report['created_indexes'] = created
+        return report
+    finally:
+        conn.close()
+
+
+def print_report(report):
+    for name in report['created_indexes']:
+        print(f"✅ Created index: {name}")
+    for query in report['queries']:
+        if query['status'] == 'ok':
+            print(f"✅ {query['name']}")
+        elif query['status'] == 'error':
+            print(f"❌ {query['name']}: {query['error']}")
+        else:
+            print(f"⚠️  {query['name']}: full scan ({'; '.join(query['full_scans'])})")
+    for index in report['missing_indexes']:
+        print(f"💡 Recommended: {index['sql']}")
+    print(f"📊 {report['full_scan_count']} of {len(report['queries'])} hot queries do full table scans")
+
+
+if __name__ == "__main__":
+    report = run(apply='--apply' in sys.argv)
+    if '--json' in sys.argv:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Keyset Pagination for Barangay Reserve
+Pages through listings by "everything after the last row I saw" instead of
+OFFSET, so page 500 costs the same index seek as page 1
+
+A page request is ?limit=N (at most PAGE_SIZE_MAX) and/or ?cursor=<token>.
+The cursor is an opaque base64 token holding the sort key values of the last
+row returned; responses carry next_cursor (None on the last page) and, with
+?include_total=true, a COUNT(*) of every matching row.
+"""
+
+import base64
+import binascii
+import json
+from collections import namedtuple
+from config import Config
+
+# after: sort key values decoded from the cursor, None for the first page
+PageRequest = namedtuple('PageRequest', 'limit after include_total')
+
+# One component of a listing order: SQL expression, 'ASC'/'DESC', whether it can be NULL
+SortKey = namedtuple('SortKey', 'expression direction nullable')
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Sort key values from a cursor token; raises ValueError if it was not made by encode_cursor"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return tuple(values)
+
+
+def page_request(args, sort_keys):
+    """PageRequest from the query string, None when the client did not ask for pages.
+
+    Raises ValueError for a bad limit or cursor.
+    """
+    limit, cursor = args.get('limit'), args.get('cursor')
+    if limit is None and cursor is None:
+        return None
+    try:
+        limit = int(limit) if limit is not None else Config.PAGE_SIZE_DEFAULT
+    except ValueError:
+        raise ValueError('limit must be a number')
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    after = decode_cursor(cursor, len(sort_keys)) if cursor else None
+    include_total = args.get('include_total', '').lower() == 'true'
+    return PageRequest(min(limit, Config.PAGE_SIZE_MAX), after, include_total)
+
+
+def _beyond(key, value):
+    """(sql, params) for "key comes after value" in the key's direction (SQLite sorts NULL lowest)"""
+    if value is None:
+        return (f'{key.expression} IS NOT NULL', []) if key.direction == 'ASC' else ('0', [])
+    comparison = f"{key.expression} {'>' if key.direction == 'ASC' else '<'} ?"
+    if key.nullable and key.direction == 'DESC':
+        return f'({comparison} OR {key.expression} IS NULL)', [value]
+    return comparison, [value]
+
+
+def _equal(key, value):
+    return (f'{key.expression} IS NULL', []) if value is None else (f'{key.expression} = ?', [value])
+
+
+def keyset_condition(sort_keys, after):
+    """(sql, params) selecting the rows that follow `after` in sort_keys order"""
+    alternatives, params = [], []
+    for position, key in enumerate(sort_keys):
+        terms = []
+        for earlier, value in zip(sort_keys[:position], after):
+            sql, values = _equal(earlier, value)
+            terms.append(sql)
+            params.extend(values)
+        sql, values = _beyond(key, after[position])
+        terms.append(sql)
+        params.extend(values)
+        alternatives.append(' AND '.join(terms))
+    condition = '(' + ' OR '.join(f'({alternative})' for alternative in alternatives) + ')'
+    # A plain bound on the leading key lets SQLite seek the index instead of testing every row
+    leading, value = sort_keys[0], after[0]
+    if value is not None and not leading.nullable:
+        condition = f"{leading.expression} {'>=' if leading.direction == 'ASC' else '<='} ? AND {condition}"
+        params.insert(0, value)
+    return condition, params
+
+
+def order_by(sort_keys):
+    return ', '.join(f'{key.expression} {key.direction}' for key in sort_keys)
+
+
+def next_cursor(rows, limit, sort_values):
+    """Trim the extra row fetched to detect a next page; cursor for the page after rows (or None).
+
+    sort_values(row) returns the row's values for the listing's sort keys.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort_values(rows[-1]))
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Receipt Checks for Barangay Reserve
+Flags receipts that were already used on another booking, using the indexed
+receipt_hashes table instead of comparing stored images
+"""
+
+# SQLite limits the number of ? placeholders per statement
+_IN_CHUNK = 500
+
+
+def duplicate_bookings(conn, receipt_hash, exclude_booking_id=None):
+    """Ids of other bookings whose receipt has exactly the same bytes"""
+    if not receipt_hash:
+        return []
+    rows = conn.execute('SELECT booking_id FROM receipt_hashes WHERE hash = ? ORDER BY booking_id',
+                        (receipt_hash,)).fetchall()
+    return [row[0] for row in rows if row[0] != exclude_booking_id]
+
+
+def duplicates_for_hashes(conn, receipt_hashes):
+    """{hash: [booking_id, ...]} for every hash used by more than one booking"""
+    receipt_hashes = list({h for h in receipt_hashes if h})
+    found = {}
+    for start in range(0, len(receipt_hashes), _IN_CHUNK):
+        chunk = receipt_hashes[start:start + _IN_CHUNK]
+        rows = conn.execute(f'''
+            SELECT hash, booking_id FROM receipt_hashes
+            WHERE hash IN ({', '.join('?' * len(chunk))})
+            ORDER BY booking_id
+        ''', chunk).fetchall()
+        for receipt_hash, booking_id in rows:
+            found.setdefault(receipt_hash, []).append(booking_id)
+    return {h: ids for h, ids in found.items() if len(ids) > 1}
+
+
+def flag_duplicates(conn, bookings, hash_key='receipt_blob'):
+    """Add duplicate_receipt / duplicate_receipt_booking_ids to booking dicts (official views)"""
+    duplicates = duplicates_for_hashes(conn, (b.get(hash_key) for b in bookings))
+    for booking in bookings:
+        others = [i for i in duplicates.get(booking.get(hash_key), []) if i != booking.get('id')]
+        booking['duplicate_receipt'] = bool(others)
+        booking['duplicate_receipt_booking_ids'] = others
+    return bookings
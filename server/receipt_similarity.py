@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Receipt Search for Barangay Reserve
+Perceptual hashes (aHash, dHash, pHash) of every receipt, persisted in
+receipt_phashes and searched through an in-memory BK-tree
+
+Cropped, re-compressed or lightly edited copies of the same payment screenshot
+land within a few bits (Hamming distance) of each other, so an official can see
+the nearest previous receipts without comparing any images.
+
+Usage:
+    python receipt_similarity.py backfill    # hash receipts uploaded before this existed
+"""
+
+import math
+import sqlite3
+import sys
+import threading
+from collections import deque
+from config import Config
+
+try:
+    from PIL import Image
+except ImportError:  # Same optional dependency as image_derivatives.py
+    Image = None
+
+HASH_BITS = 64
+_SIGN_BIT = 1 << (HASH_BITS - 1)
+
+# Only the 8 lowest frequencies of a 32-point DCT-II are needed for pHash
+_DCT_SIZE = 32
+_DCT_KEEP = 8
+_DCT_COS = [[math.cos(math.pi * (2 * n + 1) * k / (2 * _DCT_SIZE)) for n in range(_DCT_SIZE)]
+            for k in range(_DCT_KEEP)]
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def to_signed(value):
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << HASH_BITS) if value & _SIGN_BIT else value
+
+
+def to_unsigned(value):
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+def _bits(flags):
+    value = 0
+    for flag in flags:
+        value = (value << 1) | int(flag)
+    return value
+
+
+def _grayscale(image, width, height):
+    return list(image.convert('L').resize((width, height), Image.LANCZOS).getdata())
+
+
+def average_hash(image):
+    pixels = _grayscale(image, 8, 8)
+    mean = sum(pixels) / len(pixels)
+    return _bits(p > mean for p in pixels)
+
+
+def difference_hash(image):
+    pixels = _grayscale(image, 9, 8)
+    return _bits(pixels[row * 9 + col] < pixels[row * 9 + col + 1] for row in range(8) for col in range(8))
+
+
+def perceptual_hash(image):
+    pixels = _grayscale(image, _DCT_SIZE, _DCT_SIZE)
+    rows = [pixels[r * _DCT_SIZE:(r + 1) * _DCT_SIZE] for r in range(_DCT_SIZE)]
+    # Separable 2D DCT: rows first, then the 8 kept columns
+    row_dct = [[sum(c * x for c, x in zip(cosines, row)) for cosines in _DCT_COS] for row in rows]
+    low = [sum(cosines[n] * row_dct[n][k] for n in range(_DCT_SIZE))
+           for cosines in _DCT_COS for k in range(_DCT_KEEP)]
+    median = sorted(low)[len(low) // 2]
+    return _bits(c > median for c in low)
+
+
+def compute_hashes(source_path):
+    """(ahash, dhash, phash) as unsigned 64-bit ints (runs in a worker process)"""
+    with Image.open(source_path) as image:
+        image.load()
+        return average_hash(image), difference_hash(image), perceptual_hash(image)
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes under Hamming distance"""
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, item):
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """[(distance, item)] within max_distance, nearest first"""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                found.extend((distance, item) for item in node[1])
+            # Triangle inequality: only children in [d - max, d + max] can hold matches
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+class ReceiptSimilarityIndex:
+    """BK-tree of receipt pHashes, loaded from receipt_phashes and kept current as receipts arrive"""
+
+    def __init__(self, manager, store, workers=None):
+        self.manager = manager
+        self.store = store
+        self.workers = workers  # DerivativeCache whose process pool computes the hashes
+        self._tree = BKTree()
+        self._hashes = {}  # booking_id -> phash
+        self._loaded_up_to = 0  # receipt_phashes.seq of the newest row loaded
+        self._deletes_seen = 0  # 'receipt_phashes_deleted' counter at the last refresh
+        self._backlog = deque()  # (booking_id, receipt_hash) waiting for a free worker slot
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def _refresh(self, conn):
+        """Pull rows written since the last refresh (including ones written by other processes).
+
+        Rows are found by their insertion sequence, not booking_id, because hashes finish out
+        of order. Replaced or deleted rows rebuild the tree, which has no delete operation.
+        """
+        deletes = conn.execute("SELECT value FROM change_sequence WHERE name = 'receipt_phashes_deleted'").fetchone()
+        deletes = deletes[0] if deletes else 0
+        rows = conn.execute('SELECT booking_id, phash, seq FROM receipt_phashes WHERE seq > ? ORDER BY seq',
+                            (self._loaded_up_to,)).fetchall()
+        present = None
+        if deletes != self._deletes_seen:
+            present = {row[0] for row in conn.execute('SELECT booking_id FROM receipt_phashes').fetchall()}
+        with self._lock:
+            rebuild = False
+            for booking_id, phash, seq in rows:
+                phash = to_unsigned(phash)
+                previous = self._hashes.get(booking_id)
+                self._hashes[booking_id] = phash
+                if previous is None:
+                    self._tree.add(phash, booking_id)
+                elif previous != phash:
+                    rebuild = True
+                self._loaded_up_to = max(self._loaded_up_to, seq)
+            if present is not None:
+                for booking_id in [b for b in self._hashes if b not in present]:
+                    del self._hashes[booking_id]
+                    rebuild = True
+                self._deletes_seen = deletes
+            if rebuild:
+                self._tree = BKTree()
+                for booking_id, phash in self._hashes.items():
+                    self._tree.add(phash, booking_id)
+
+    def _save(self, conn, booking_id, receipt_hash, hashes):
+        ahash, dhash, phash = hashes
+        conn.execute('''
+            INSERT OR REPLACE INTO receipt_phashes (booking_id, receipt_hash, ahash, dhash, phash)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (booking_id, receipt_hash, to_signed(ahash), to_signed(dhash), to_signed(phash)))
+
+    def schedule(self, booking_id, receipt_hash):
+        """Hash a new booking's receipt in the background; identical receipts reuse stored hashes.
+
+        When every worker slot is busy the job waits in a backlog that drains as jobs finish,
+        so every receipt is hashed eventually.
+        """
+        if not self.available or not receipt_hash or self.workers is None:
+            return False
+        with self.manager.read_connection() as conn:
+            known = conn.execute('SELECT ahash, dhash, phash FROM receipt_phashes WHERE receipt_hash = ? LIMIT 1',
+                                 (receipt_hash,)).fetchone()
+        if known:
+            with self.manager.write_connection() as conn:
+                self._save(conn, booking_id, receipt_hash, [to_unsigned(v) for v in known])
+            return True
+        with self._lock:
+            self._backlog.append((booking_id, receipt_hash))
+        self._drain()
+        return True
+
+    def _drain(self):
+        """Submit backlogged jobs, oldest first, until the worker pool is saturated"""
+        while True:
+            with self._lock:
+                if not self._backlog:
+                    return
+                job = self._backlog.popleft()
+            if not self.workers.submit(compute_hashes, self.store.path_for(job[1]),
+                                       on_done=lambda future, job=job: self._record(job, future)):
+                with self._lock:
+                    self._backlog.appendleft(job)
+                return
+
+    def _record(self, job, future):
+        booking_id, receipt_hash = job
+        try:
+            hashes = future.result()
+            with self.manager.write_connection() as conn:
+                self._save(conn, booking_id, receipt_hash, hashes)
+        except Exception as e:
+            print(f"⚠️  Could not hash receipt of booking {booking_id}: {e}")
+        finally:
+            self._drain()  # This job's worker slot is free again
+
+    def similar(self, conn, booking_id, k=5, max_distance=None):
+        """Up to k (None: all) earlier bookings whose receipt pHash is within max_distance bits,
+        nearest first. Booking ids grow with creation order, so a later copy of a receipt is
+        reported against the original but the original is never flagged as a copy of it.
+
+        Returns None when the booking's receipt hasn't been hashed (yet).
+        """
+        max_distance = Config.RECEIPT_SIMILARITY_THRESHOLD if max_distance is None else max_distance
+        self._refresh(conn)
+        with self._lock:
+            phash = self._hashes.get(booking_id)
+            if phash is None:
+                return None
+            matches = self._tree.search(phash, max_distance)
+        matches = [(distance, other) for distance, other in matches if other < booking_id]
+        return matches if k is None else matches[:k]
+
+    def stats(self):
+        with self._lock:
+            return {'available': self.available, 'indexed_receipts': len(self._hashes),
+                    'backlog': len(self._backlog)}
+
+
+def backfill(db_path=None, batch_size=100, verbose=True):
+    """Compute hashes for receipts stored before this index existed (runs inline, not in the pool)"""
+    from blob_store import get_blob_store
+    store = get_blob_store()
+    conn = sqlite3.connect(db_path or Config.DATABASE_PATH, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0)
+    done = failed = 0
+    try:
+        last_id = 0
+        while True:
+            rows = conn.execute('''
+                SELECT rh.booking_id, rh.hash FROM receipt_hashes rh
+                LEFT JOIN receipt_phashes rp ON rp.booking_id = rh.booking_id
+                WHERE rp.booking_id IS NULL AND rh.booking_id > ?
+                ORDER BY rh.booking_id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            for booking_id, receipt_hash in rows:
+                last_id = booking_id
+                try:
+                    ahash, dhash, phash = compute_hashes(store.path_for(receipt_hash))
+                except Exception as e:
+                    failed += 1
+                    if verbose:
+                        print(f"⚠️  Booking {booking_id}: {e}")
+                    continue
+                conn.execute('''
+                    INSERT OR REPLACE INTO receipt_phashes (booking_id, receipt_hash, ahash, dhash, phash)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (booking_id, receipt_hash, to_signed(ahash), to_signed(dhash), to_signed(phash)))
+                done += 1
+            conn.commit()
+    finally:
+        conn.close()
+    if verbose:
+        print(f"✅ Hashed {done} receipt(s), {failed} could not be read as images")
+    return done, failed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'backfill':
+        if Image is None:
+            print("❌ Pillow is required: pip install -r requirements.txt")
+            sys.exit(1)
+        backfill()
+    else:
+        print("Usage: python receipt_similarity.py backfill")
+        sys.exit(1)
@@ -0,0 +1,876 @@
+#!/usr/bin/env python3
+"""
+Schema Migrations for Barangay Reserve
+Numbered, idempotent migrations tracked in a schema_version table
+
+Usage:
+    python schema_migrations.py            # apply pending migrations
+    python schema_migrations.py status     # show version and schema drift
+
+Servers only call check_schema() at import, which reads one row.
+"""
+
+import sqlite3
+import sys
+from datetime import datetime
+from config import Config
+import time_model
+
+
+def _columns(cursor, table):
+    return [row[1] for row in cursor.execute(f'PRAGMA table_info({table})').fetchall()]
+
+
+def _add_column(cursor, table, column, definition):
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists"""
+    if column not in _columns(cursor, table):
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def _migration_001_baseline(cursor):
+    """Live schema used by server.py (tables are only created when missing)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE,
+            password TEXT,
+            full_name TEXT,
+            role TEXT,
+            verified BOOLEAN DEFAULT FALSE,
+            verification_type VARCHAR(20) DEFAULT NULL,
+            discount_rate REAL DEFAULT 0.0,
+            contact_number TEXT,
+            address TEXT,
+            profile_photo_url TEXT,
+            fake_booking_violations INTEGER DEFAULT 0,
+            is_banned BOOLEAN DEFAULT FALSE,
+            banned_at TIMESTAMP NULL,
+            ban_reason TEXT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS facilities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(255) NOT NULL,
+            description TEXT,
+            hourly_rate DECIMAL(10,2) NOT NULL,
+            downpayment_rate DECIMAL(3,2) DEFAULT 0.50,
+            max_capacity INTEGER,
+            amenities TEXT,
+            main_photo_url TEXT,
+            photos TEXT,
+            active BOOLEAN DEFAULT 1,
+            is_active BOOLEAN DEFAULT TRUE,
+            requires_approval BOOLEAN DEFAULT TRUE,
+            booking_window_days INTEGER DEFAULT 30,
+            operating_hours TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS time_slots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            facility_id INTEGER NOT NULL,
+            start_time TIME NOT NULL,
+            end_time TIME NOT NULL,
+            duration_minutes INTEGER NOT NULL,
+            sort_order INTEGER,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            booking_reference VARCHAR(20) UNIQUE NOT NULL,
+            user_id INTEGER NOT NULL,
+            facility_id INTEGER NOT NULL,
+            time_slot_id INTEGER NOT NULL,
+            booking_date DATE NOT NULL,
+            start_time TIME NOT NULL,
+            end_time TIME NOT NULL,
+            duration_hours DECIMAL(3,1) NOT NULL,
+            purpose TEXT NOT NULL,
+            expected_attendees INTEGER DEFAULT 1,
+            special_requirements TEXT,
+            contact_number VARCHAR(20),
+            contact_address TEXT,
+            base_rate DECIMAL(10,2) NOT NULL,
+            discount_rate DECIMAL(3,2) DEFAULT 0.00,
+            discount_amount DECIMAL(10,2) DEFAULT 0.00,
+            downpayment_amount DECIMAL(10,2) NOT NULL,
+            total_amount DECIMAL(10,2) NOT NULL,
+            receipt_base64 TEXT,
+            receipt_filename VARCHAR(255),
+            receipt_uploaded_at DATETIME,
+            status VARCHAR(20) DEFAULT 'pending',
+            priority_level INTEGER DEFAULT 0,
+            approved_by INTEGER,
+            approved_at DATETIME,
+            rejection_reason TEXT,
+            rejection_type VARCHAR(50) NULL,
+            is_competitive BOOLEAN DEFAULT FALSE,
+            competing_booking_ids TEXT,
+            competition_resolved BOOLEAN DEFAULT FALSE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (facility_id) REFERENCES facilities(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS verification_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_reference VARCHAR(20) NOT NULL,
+            user_id INTEGER NOT NULL,
+            verification_type VARCHAR(20) NOT NULL,
+            requested_discount_rate DECIMAL(3,2) NOT NULL,
+            user_photo_base64 TEXT,
+            user_photo_filename VARCHAR(255),
+            valid_id_base64 TEXT,
+            valid_id_filename VARCHAR(255),
+            proof_of_residency_base64 TEXT,
+            proof_of_residency_filename VARCHAR(255),
+            additional_documents TEXT,
+            residential_address TEXT,
+            years_of_residence INTEGER,
+            status VARCHAR(30) DEFAULT 'pending',
+            reviewed_by INTEGER,
+            reviewed_at DATETIME,
+            approval_notes TEXT,
+            rejection_reason TEXT,
+            additional_info_requested TEXT,
+            additional_info_provided TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+
+def _migration_002_legacy_columns(cursor):
+    """Columns older databases picked up from migrate_database() and migrate_violation_tracking.py"""
+    _add_column(cursor, 'facilities', 'active', 'BOOLEAN DEFAULT 1')
+    _add_column(cursor, 'facilities', 'amenities', 'TEXT')
+    _add_column(cursor, 'facilities', 'downpayment', 'REAL')
+    _add_column(cursor, 'facilities', 'updated_at', 'TIMESTAMP DEFAULT NULL')
+
+    _add_column(cursor, 'users', 'verification_type', 'VARCHAR(20) DEFAULT NULL')
+    _add_column(cursor, 'users', 'profile_photo_url', 'TEXT')
+    _add_column(cursor, 'users', 'updated_at', 'TIMESTAMP DEFAULT NULL')
+    _add_column(cursor, 'users', 'fake_booking_violations', 'INTEGER DEFAULT 0')
+    _add_column(cursor, 'users', 'is_banned', 'BOOLEAN DEFAULT FALSE')
+    _add_column(cursor, 'users', 'banned_at', 'TIMESTAMP NULL')
+    _add_column(cursor, 'users', 'ban_reason', 'TEXT NULL')
+
+    _add_column(cursor, 'time_slots', 'sort_order', 'INTEGER')
+    _add_column(cursor, 'bookings', 'rejection_type', 'VARCHAR(50) NULL')
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_violations ON users(fake_booking_violations, is_banned)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_rejection_type ON bookings(rejection_type)')
+
+
+def _migration_003_hot_query_indexes(cursor):
+    """Indexes for the booking, availability and verification hot paths (see index_advisor.py)"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_facility_date_slot_status ON bookings(facility_id, booking_date, start_time, status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_user_status ON bookings(user_id, status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_verification_user_status ON verification_requests(user_id, status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_time_slots_facility_order ON time_slots(facility_id, sort_order)')
+
+
+def _migration_004_blob_store(cursor):
+    """Reference-counted blobs table and hash columns that replace inline base64 documents"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mime_type TEXT,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    _add_column(cursor, 'bookings', 'receipt_blob', 'TEXT NULL')
+    _add_column(cursor, 'verification_requests', 'user_photo_blob', 'TEXT NULL')
+    _add_column(cursor, 'verification_requests', 'valid_id_blob', 'TEXT NULL')
+    _add_column(cursor, 'verification_requests', 'proof_of_residency_blob', 'TEXT NULL')
+    _add_column(cursor, 'users', 'profile_photo_blob', 'TEXT NULL')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_blobs_refcount ON blobs(refcount)')
+
+
+def _migration_005_image_derivatives(cursor):
+    """Thumbnails and previews generated from blobs (each derivative is a blob of its own)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS blob_derivatives (
+            source_hash TEXT NOT NULL,
+            variant TEXT NOT NULL,
+            derived_hash TEXT NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source_hash, variant)
+        )
+    ''')
+
+
+def _migration_006_receipt_hashes(cursor):
+    """Indexed receipt hash per booking so reused receipts are found with one lookup.
+
+    Triggers keep it in step with bookings.receipt_blob, whichever code path sets it
+    (create_booking, uploads or `python blob_store.py migrate`).
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS receipt_hashes (
+            booking_id INTEGER PRIMARY KEY,
+            hash TEXT NOT NULL,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_receipt_hashes_hash ON receipt_hashes(hash)')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_receipt_hashes_insert AFTER INSERT ON bookings
+        WHEN NEW.receipt_blob IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO receipt_hashes (booking_id, hash, user_id) VALUES (NEW.id, NEW.receipt_blob, NEW.user_id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_receipt_hashes_update AFTER UPDATE OF receipt_blob ON bookings
+        BEGIN
+            DELETE FROM receipt_hashes WHERE booking_id = OLD.id;
+            INSERT INTO receipt_hashes (booking_id, hash, user_id)
+            SELECT NEW.id, NEW.receipt_blob, NEW.user_id WHERE NEW.receipt_blob IS NOT NULL;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_receipt_hashes_delete AFTER DELETE ON bookings
+        BEGIN
+            DELETE FROM receipt_hashes WHERE booking_id = OLD.id;
+        END
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO receipt_hashes (booking_id, hash, user_id, created_at)
+        SELECT id, receipt_blob, user_id, created_at FROM bookings WHERE receipt_blob IS NOT NULL
+    ''')
+
+
+def _migration_007_receipt_phashes(cursor):
+    """Perceptual hashes of receipts for near-duplicate search (see receipt_similarity.py)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS receipt_phashes (
+            booking_id INTEGER PRIMARY KEY,
+            receipt_hash TEXT NOT NULL,
+            ahash INTEGER NOT NULL,
+            dhash INTEGER NOT NULL,
+            phash INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_receipt_phashes_receipt_hash ON receipt_phashes(receipt_hash)')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_receipt_phashes_delete AFTER DELETE ON bookings
+        BEGIN
+            DELETE FROM receipt_phashes WHERE booking_id = OLD.id;
+        END
+    ''')
+
+
+def _migration_008_integer_time_model(cursor):
+    """Integer day/minute columns next to the display strings, so overlap checks are range scans"""
+    _add_column(cursor, 'bookings', 'day_key', 'INTEGER')
+    _add_column(cursor, 'bookings', 'start_minute', 'INTEGER')
+    _add_column(cursor, 'bookings', 'end_minute', 'INTEGER')
+    time_model.backfill_booking_times(cursor)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_facility_day_minutes ON bookings(facility_id, day_key, start_minute, end_minute, status)')
+
+
+def _migration_009_booking_intervals(cursor):
+    """R*Tree of active booking time ranges for overlap checks (see booking_intervals.py)"""
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS booking_intervals USING rtree(
+                id, facility_min, facility_max, day_min, day_max, start_minute, end_minute
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"⚠️  SQLite has no R*Tree module ({e}), overlap checks will use the minutes index")
+        return
+    indexable = '''NEW.status IN ('pending', 'approved') AND NEW.day_key IS NOT NULL
+                   AND NEW.start_minute IS NOT NULL AND NEW.end_minute >= NEW.start_minute'''
+    insert = '''INSERT INTO booking_intervals (id, facility_min, facility_max, day_min, day_max, start_minute, end_minute)
+                SELECT NEW.id, NEW.facility_id, NEW.facility_id, NEW.day_key, NEW.day_key, NEW.start_minute, NEW.end_minute'''
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_booking_intervals_insert AFTER INSERT ON bookings
+        WHEN {indexable}
+        BEGIN
+            {insert};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_booking_intervals_update
+        AFTER UPDATE OF status, facility_id, day_key, start_minute, end_minute ON bookings
+        BEGIN
+            DELETE FROM booking_intervals WHERE id = OLD.id;
+            {insert} WHERE {indexable};
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_booking_intervals_delete AFTER DELETE ON bookings
+        BEGIN
+            DELETE FROM booking_intervals WHERE id = OLD.id;
+        END
+    ''')
+    cursor.execute('''
+        INSERT INTO booking_intervals (id, facility_min, facility_max, day_min, day_max, start_minute, end_minute)
+        SELECT id, facility_id, facility_id, day_key, day_key, start_minute, end_minute FROM bookings
+        WHERE status IN ('pending', 'approved') AND day_key IS NOT NULL
+        AND start_minute IS NOT NULL AND end_minute >= start_minute
+    ''')
+
+
+def _migration_010_slot_occupancy(cursor):
+    """Materialized per facility/day slot states (see slot_occupancy.py), invalidated by triggers"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS slot_occupancy (
+            facility_id INTEGER NOT NULL,
+            day_key INTEGER NOT NULL,
+            states TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (facility_id, day_key)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_slot_occupancy_booking_insert AFTER INSERT ON bookings
+        BEGIN
+            DELETE FROM slot_occupancy WHERE facility_id = NEW.facility_id AND day_key = NEW.day_key;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_slot_occupancy_booking_update
+        AFTER UPDATE OF status, user_id, facility_id, day_key, start_minute, end_minute ON bookings
+        BEGIN
+            DELETE FROM slot_occupancy WHERE facility_id = OLD.facility_id AND day_key = OLD.day_key;
+            DELETE FROM slot_occupancy WHERE facility_id = NEW.facility_id AND day_key = NEW.day_key;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_slot_occupancy_booking_delete AFTER DELETE ON bookings
+        BEGIN
+            DELETE FROM slot_occupancy WHERE facility_id = OLD.facility_id AND day_key = OLD.day_key;
+        END
+    ''')
+    # Official vs resident bookings have different states
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_slot_occupancy_user_role AFTER UPDATE OF role ON users
+        BEGIN
+            DELETE FROM slot_occupancy WHERE (facility_id, day_key) IN
+                (SELECT facility_id, day_key FROM bookings WHERE user_id = NEW.id);
+        END
+    ''')
+    for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_slot_occupancy_time_slots_{event.lower()} AFTER {event} ON time_slots
+            BEGIN
+                DELETE FROM slot_occupancy WHERE facility_id = {row}.facility_id;
+            END
+        ''')
+
+
+def _migration_011_calendar_versions(cursor):
+    """Change counters per facility/day for the masked calendar cache (see calendar_cache.py)
+
+    (facility_id, day_key) counts booking writes on that day, (0, 0) counts every
+    booking write and (-1, 0) counts user/facility edits that show up in any calendar.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS calendar_versions (
+            facility_id INTEGER NOT NULL,
+            day_key INTEGER NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (facility_id, day_key)
+        )
+    ''')
+
+    def bump(facility_id, day_key):
+        return f'''INSERT INTO calendar_versions (facility_id, day_key, version) VALUES ({facility_id}, {day_key}, 1)
+            ON CONFLICT (facility_id, day_key) DO UPDATE SET version = version + 1;'''
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_calendar_versions_booking_insert AFTER INSERT ON bookings
+        BEGIN
+            {bump('NEW.facility_id', 'COALESCE(NEW.day_key, -1)')}
+            {bump(0, 0)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_calendar_versions_booking_update AFTER UPDATE ON bookings
+        BEGIN
+            {bump('OLD.facility_id', 'COALESCE(OLD.day_key, -1)')}
+            {bump('NEW.facility_id', 'COALESCE(NEW.day_key, -1)')}
+            {bump(0, 0)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_calendar_versions_booking_delete AFTER DELETE ON bookings
+        BEGIN
+            {bump('OLD.facility_id', 'COALESCE(OLD.day_key, -1)')}
+            {bump(0, 0)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_calendar_versions_user_update
+        AFTER UPDATE OF email, full_name, role, verified, discount_rate ON users
+        BEGIN
+            {bump(-1, 0)}
+            {bump(0, 0)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_calendar_versions_facility_update AFTER UPDATE OF name ON facilities
+        BEGIN
+            {bump(-1, 0)}
+            {bump(0, 0)}
+        END
+    ''')
+
+
+
+def _migration_012_listing_sort_keys(cursor):
+    """Indexes in listing order, so keyset pages seek straight to their first row (see pagination.py)"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_listing_order ON bookings(booking_date DESC, start_minute, id)')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_verification_created_id ON verification_requests(COALESCE(created_at, ''), id)")
+
+
+def _migration_013_booking_changes(cursor):
+    """Change sequence and tombstones for GET /api/bookings/changes (see booking_changes.py)
+
+    change_sequence holds named counters; every booking write bumps 'bookings' and
+    stamps the booking's row in booking_changes with it. Deletes move the booking
+    to booking_tombstones. User and facility edits that show up in listings
+    re-stamp the affected bookings.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_sequence (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS booking_changes (
+            booking_id INTEGER PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_booking_changes_seq ON booking_changes(seq)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS booking_tombstones (
+            booking_id INTEGER PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_booking_tombstones_seq ON booking_tombstones(seq)')
+
+    # Existing bookings all count as change 1
+    has_bookings = cursor.execute('SELECT EXISTS (SELECT 1 FROM bookings)').fetchone()[0]
+    cursor.execute("INSERT OR IGNORE INTO change_sequence (name, value) VALUES ('bookings', ?)", (has_bookings,))
+    cursor.execute("INSERT OR IGNORE INTO change_sequence (name, value) VALUES ('bookings_pruned', 0)")
+    cursor.execute('INSERT OR IGNORE INTO booking_changes (booking_id, seq) SELECT id, 1 FROM bookings')
+
+    bump = "UPDATE change_sequence SET value = value + 1 WHERE name = 'bookings';"
+    current = "(SELECT value FROM change_sequence WHERE name = 'bookings')"
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_booking_changes_insert AFTER INSERT ON bookings
+        BEGIN
+            {bump}
+            INSERT OR REPLACE INTO booking_changes (booking_id, seq) VALUES (NEW.id, {current});
+            DELETE FROM booking_tombstones WHERE booking_id = NEW.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_booking_changes_update AFTER UPDATE ON bookings
+        BEGIN
+            {bump}
+            INSERT OR REPLACE INTO booking_changes (booking_id, seq) VALUES (NEW.id, {current});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_booking_changes_delete AFTER DELETE ON bookings
+        BEGIN
+            {bump}
+            DELETE FROM booking_changes WHERE booking_id = OLD.id;
+            INSERT OR REPLACE INTO booking_tombstones (booking_id, seq) VALUES (OLD.id, {current});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_booking_changes_user_update
+        AFTER UPDATE OF email, full_name, role, verified, discount_rate ON users
+        BEGIN
+            {bump}
+            UPDATE booking_changes SET seq = {current}
+            WHERE booking_id IN (SELECT id FROM bookings WHERE user_id = NEW.id);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_booking_changes_facility_update AFTER UPDATE OF name ON facilities
+        BEGIN
+            {bump}
+            UPDATE booking_changes SET seq = {current}
+            WHERE booking_id IN (SELECT id FROM bookings WHERE facility_id = NEW.id);
+        END
+    ''')
+
+
+# Tables whose writes are counted for conditional GETs; bookings is counted by migration 013
+VERSIONED_TABLES = ('facilities', 'users', 'time_slots', 'verification_requests')
+
+
+def _migration_014_table_versions(cursor):
+    """Per-table change counters for ETags (see conditional_get.py)"""
+    # Random per database, so a recreated database never repeats an old ETag
+    cursor.execute("INSERT OR IGNORE INTO change_sequence (name, value) VALUES ('epoch', abs(random()))")
+    for table in VERSIONED_TABLES:
+        cursor.execute("INSERT OR IGNORE INTO change_sequence (name, value) VALUES (?, 0)", (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE change_sequence SET value = value + 1 WHERE name = '{table}';
+                END
+            ''')
+
+
+def _migration_015_session_auth(cursor):
+    """Token sessions, account status and booking length limits used by server_updated.py"""
+    _add_column(cursor, 'users', 'password_hash', 'VARCHAR(255)')
+    _add_column(cursor, 'users', 'is_active', 'BOOLEAN DEFAULT TRUE')
+    _add_column(cursor, 'users', 'last_login', 'DATETIME')
+    _add_column(cursor, 'facilities', 'min_booking_hours', 'INTEGER DEFAULT 1')
+    _add_column(cursor, 'facilities', 'max_booking_hours', 'INTEGER DEFAULT 4')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            session_token VARCHAR(255) UNIQUE NOT NULL,
+            device_id VARCHAR(255),
+            device_type VARCHAR(20) DEFAULT 'mobile',
+            is_active BOOLEAN DEFAULT TRUE,
+            expires_at DATETIME NOT NULL,
+            ip_address VARCHAR(45),
+            user_agent TEXT,
+            last_activity DATETIME DEFAULT CURRENT_TIMESTAMP,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user_active ON user_sessions(user_id, is_active)')
+
+    # server.py stores the same SHA-256 hex digest in users.password; keep both logins working
+    if 'password' not in _columns(cursor, 'users'):
+        return
+    cursor.execute('UPDATE users SET password_hash = password WHERE password_hash IS NULL')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_password_hash_insert AFTER INSERT ON users
+        WHEN NEW.password_hash IS NULL AND NEW.password IS NOT NULL
+        BEGIN
+            UPDATE users SET password_hash = NEW.password WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_password_hash_update AFTER UPDATE OF password ON users
+        WHEN NEW.password IS NOT NULL
+        BEGIN
+            UPDATE users SET password_hash = NEW.password WHERE id = NEW.id;
+        END
+    ''')
+
+
+def _migration_016_receipt_phash_sequence(cursor):
+    """Commit-order sequence on receipt_phashes so the in-memory index can refresh incrementally.
+
+    Hashes finish out of booking_id order in the worker pool, so booking_id can't be the
+    watermark. Every insert (INSERT OR REPLACE included) takes the next 'receipt_phashes'
+    value; deletes bump 'receipt_phashes_deleted' so readers know to drop rows.
+    """
+    _add_column(cursor, 'receipt_phashes', 'seq', 'INTEGER')
+    cursor.execute('UPDATE receipt_phashes SET seq = booking_id WHERE seq IS NULL')
+    cursor.execute('''
+        INSERT OR IGNORE INTO change_sequence (name, value)
+        SELECT 'receipt_phashes', COALESCE(MAX(seq), 0) FROM receipt_phashes
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO change_sequence (name, value) VALUES ('receipt_phashes_deleted', 0)")
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_receipt_phashes_seq ON receipt_phashes(seq)')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_receipt_phashes_seq AFTER INSERT ON receipt_phashes
+        BEGIN
+            UPDATE change_sequence SET value = value + 1 WHERE name = 'receipt_phashes';
+            UPDATE receipt_phashes SET seq = (SELECT value FROM change_sequence WHERE name = 'receipt_phashes')
+            WHERE booking_id = NEW.booking_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_receipt_phashes_deleted AFTER DELETE ON receipt_phashes
+        BEGIN
+            UPDATE change_sequence SET value = value + 1 WHERE name = 'receipt_phashes_deleted';
+        END
+    ''')
+
+
+def _migration_017_booking_time_triggers(cursor):
+    """Fill day_key/start_minute/end_minute in the database, whoever writes the booking.
+
+    Only server.py computed them, so rows from server_updated.py, migrate_database.py and
+    the seed scripts had NULLs and dropped out of availability, conflict checks and
+    auto-rejection. The UPDATE below fires the interval, occupancy and calendar triggers.
+    """
+    fields = time_model.sql_booking_time_fields('NEW.booking_date', 'NEW.start_time', 'NEW.end_time')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_time_fields_insert AFTER INSERT ON bookings
+        WHEN NEW.day_key IS NULL OR NEW.start_minute IS NULL OR NEW.end_minute IS NULL
+        BEGIN
+            UPDATE bookings SET (day_key, start_minute, end_minute) = ({fields}) WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_time_fields_update
+        AFTER UPDATE OF booking_date, start_time, end_time ON bookings
+        BEGIN
+            UPDATE bookings SET (day_key, start_minute, end_minute) = ({fields}) WHERE id = NEW.id;
+        END
+    ''')
+    # Rows written since 008 without the columns, and server_updated.py rows that 008 read as
+    # zero-length because it only looked at start_time
+    fields = time_model.sql_booking_time_fields('b.booking_date', 'b.start_time', 'b.end_time')
+    cursor.execute(f'''
+        UPDATE bookings AS b SET (day_key, start_minute, end_minute) = ({fields})
+        WHERE NOT EXISTS (SELECT 1 FROM ({fields}) AS t WHERE t.day_key IS b.day_key
+                          AND t.start_minute IS b.start_minute AND t.end_minute IS b.end_minute)
+    ''')
+
+
+def _migration_018_barangay_events(cursor):
+    """Events organised by officials; server_updated.py numbers them from this table"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS barangay_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_reference VARCHAR(20) UNIQUE NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            description TEXT,
+            event_type VARCHAR(20) DEFAULT 'other',
+            facility_id INTEGER NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            start_time TIME NOT NULL,
+            end_time TIME NOT NULL,
+            is_recurring BOOLEAN DEFAULT FALSE,
+            recurring_pattern TEXT,
+            max_attendees INTEGER,
+            is_public BOOLEAN DEFAULT TRUE,
+            requires_registration BOOLEAN DEFAULT FALSE,
+            organizer_id INTEGER NOT NULL,
+            status VARCHAR(20) DEFAULT 'scheduled',
+            event_photo_url TEXT,
+            event_documents TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (facility_id) REFERENCES facilities(id),
+            FOREIGN KEY (organizer_id) REFERENCES users(id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_facility_dates ON barangay_events(facility_id, start_date, end_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_status ON barangay_events(status)')
+
+
+
+def _migration_019_slot_occupancy_locked_state(cursor):
+    """Drop slot_occupancy rows that stored cancelled, completed and no-show bookings as approved;
+    they are computed again by reads and stored by the next booking write"""
+    cursor.execute('DELETE FROM slot_occupancy')
+
+# (version, name, function) - append only, never renumber
+MIGRATIONS = [
+    (1, 'baseline schema', _migration_001_baseline),
+    (2, 'legacy facility, user and violation columns', _migration_002_legacy_columns),
+    (3, 'hot query indexes', _migration_003_hot_query_indexes),
+    (4, 'content-addressed blob store', _migration_004_blob_store),
+    (5, 'image derivatives', _migration_005_image_derivatives),
+    (6, 'receipt hash index', _migration_006_receipt_hashes),
+    (7, 'receipt perceptual hashes', _migration_007_receipt_phashes),
+    (8, 'integer time model', _migration_008_integer_time_model),
+    (9, 'booking interval index', _migration_009_booking_intervals),
+    (10, 'slot occupancy', _migration_010_slot_occupancy),
+    (11, 'calendar cache versions', _migration_011_calendar_versions),
+    (12, 'listing sort key indexes', _migration_012_listing_sort_keys),
+    (13, 'booking change sequence and tombstones', _migration_013_booking_changes),
+    (14, 'table versions for conditional GET', _migration_014_table_versions),
+    (15, 'session auth and booking length columns', _migration_015_session_auth),
+    (16, 'receipt phash insertion sequence', _migration_016_receipt_phash_sequence),
+    (17, 'booking time field triggers', _migration_017_booking_time_triggers),
+    (18, 'barangay events', _migration_018_barangay_events),
+    (19, 'slot occupancy locked state', _migration_019_slot_occupancy_locked_state),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    ''')
+
+
+def get_schema_version(conn):
+    """Highest applied migration, 0 for an unmanaged database"""
+    try:
+        row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def migrate(db_path=None, target=None, verbose=True):
+    """Apply every pending migration (each in its own transaction). Safe to run repeatedly."""
+    db_path = db_path or Config.DATABASE_PATH
+    target = target or LATEST_VERSION
+    conn = sqlite3.connect(db_path, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0, isolation_level=None)
+    applied = []
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        _ensure_version_table(conn)
+        for version, name, migration in MIGRATIONS:
+            if version > target:
+                break
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Re-check inside the write lock so concurrent runners don't double-apply
+                if version <= get_schema_version(conn):
+                    conn.execute('ROLLBACK')
+                    continue
+                migration(conn.cursor())
+                conn.execute('INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)',
+                             (version, name, datetime.now().isoformat()))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            applied.append(version)
+            if verbose:
+                print(f"✅ Applied migration {version:03d}: {name}")
+        if verbose and not applied:
+            print(f"ℹ️  Schema is up to date (version {get_schema_version(conn)})")
+        return applied
+    finally:
+        conn.close()
+
+
+def expected_schema():
+    """{table: [columns]} produced by running every migration on an empty database"""
+    conn = sqlite3.connect(':memory:')
+    try:
+        cursor = conn.cursor()
+        for _, _, migration in MIGRATIONS:
+            migration(cursor)
+        tables = [row[0] for row in cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        return {table: _columns(cursor, table) for table in tables}
+    finally:
+        conn.close()
+
+
+def schema_drift(conn, expected=None):
+    """Columns that the migrations expect but the database lacks, and vice versa"""
+    expected = expected or expected_schema()
+    cursor = conn.cursor()
+    drift = {}
+    for table, columns in expected.items():
+        actual = _columns(cursor, table)
+        missing = [c for c in columns if c not in actual]
+        extra = [c for c in actual if c not in columns]
+        if missing or extra or not actual:
+            drift[table] = {'missing_table': not actual, 'missing_columns': missing, 'extra_columns': extra}
+    return drift
+
+
+def check_schema(db_path=None, required_columns=None):
+    """Cheap startup check: compare the stored version (and optionally required columns).
+
+    required_columns is {table: [column, ...]} for servers that rely on columns the
+    migrations don't create, so schema drift shows up at startup instead of as a 500.
+    """
+    db_path = db_path or Config.DATABASE_PATH
+    conn = sqlite3.connect(db_path)
+    try:
+        version = get_schema_version(conn)
+        missing = {}
+        for table, columns in (required_columns or {}).items():
+            actual = _columns(conn.cursor(), table)
+            absent = [c for c in columns if c not in actual]
+            if absent:
+                missing[table] = absent
+    finally:
+        conn.close()
+
+    if version < LATEST_VERSION:
+        print(f"⚠️  Database schema is at version {version}, latest is {LATEST_VERSION}. "
+              f"Run: python schema_migrations.py")
+    elif version > LATEST_VERSION:
+        print(f"⚠️  Database schema version {version} is newer than this server ({LATEST_VERSION})")
+    for table, columns in missing.items():
+        print(f"⚠️  Schema drift: {table} is missing column(s) {', '.join(columns)}")
+
+    return {
+        'version': version,
+        'latest_version': LATEST_VERSION,
+        'up_to_date': version == LATEST_VERSION and not missing,
+        'missing_columns': missing,
+    }
+
+
+def print_status(db_path=None):
+    db_path = db_path or Config.DATABASE_PATH
+    conn = sqlite3.connect(db_path)
+    try:
+        version = get_schema_version(conn)
+        print(f"📊 Database: {db_path}")
+        print(f"🔢 Schema version: {version} (latest {LATEST_VERSION})")
+        for number, name, _ in MIGRATIONS:
+            marker = '✅' if number <= version else '⏳'
+            print(f"   {marker} {number:03d} {name}")
+        drift = schema_drift(conn)
+    finally:
+        conn.close()
+    if not drift:
+        print("✅ No schema drift")
+    for table, info in drift.items():
+        if info['missing_table']:
+            print(f"❌ {table}: table missing")
+            continue
+        if info['missing_columns']:
+            print(f"❌ {table}: missing {', '.join(info['missing_columns'])}")
+        if info['extra_columns']:
+            print(f"ℹ️  {table}: extra {', '.join(info['extra_columns'])}")
+    return drift
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'migrate'
+    if command == 'status':
+        print_status()
+    elif command == 'migrate':
+        migrate()
+    else:
+        print("Usage: python schema_migrations.py [migrate|status]")
+        sys.exit(1)
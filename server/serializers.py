@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Row Serializers for Barangay Reserve
+Turns query rows into API JSON without building dicts one field at a time
+
+A RowSerializer describes how a query's columns map onto the response
+(renames, 0/1 -> bool, JSON text columns decoded). For each distinct column
+list it compiles one mapper function, a single dict literal indexing a plain
+tuple, and reuses it for every row. json_response() encodes straight to bytes
+with orjson when it is installed, otherwise with the standard library.
+
+Large listings can be streamed instead (?stream=true for a JSON array,
+Accept: application/x-ndjson for one object per line): rows are fetched with
+fetchmany and encoded batch by batch, so memory does not grow with the result.
+
+Usage:
+    python serializers.py [rows]    # benchmark: 50k bookings, old path vs compiled path
+"""
+
+import json
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Response, stream_with_context
+from config import Config
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library encoder is used instead
+    orjson = None
+
+
+def _as_bool(value):
+    # NULL stays None so "unknown" is not reported as False
+    return None if value is None else bool(value)
+
+
+def _decode_json(value, default):
+    if not value:
+        return default.copy()
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return default.copy()
+
+
+def compile_mapper(columns, rename=None, booleans=(), json_columns=None):
+    """row tuple -> dict function for this column list.
+
+    rename maps a column to its response key (None drops it), booleans are
+    returned as True/False, json_columns maps a column to the default used
+    when its text is empty or invalid ([] or {}).
+    """
+    rename = rename or {}
+    json_columns = json_columns or {}
+    namespace = {'_as_bool': _as_bool, '_decode_json': _decode_json}
+    items = []
+    for index, column in enumerate(columns):
+        key = rename.get(column, column)
+        if key is None:
+            continue
+        value = f'row[{index}]'
+        if column in booleans:
+            value = f'_as_bool({value})'
+        elif column in json_columns:
+            namespace[f'_default_{index}'] = json_columns[column]
+            value = f'_decode_json({value}, _default_{index})'
+        items.append(f'{key!r}: {value}')
+    source = f"def mapper(row):\n    return {{{', '.join(items)}}}\n"
+    exec(compile(source, f'<mapper {",".join(columns)}>', 'exec'), namespace)
+    return namespace['mapper']
+
+
+class RowSerializer:
+    """Output shape for one kind of query; mappers are compiled per column list and cached"""
+
+    def __init__(self, rename=None, booleans=(), json_columns=None):
+        self.rename = dict(rename or {})
+        self.booleans = frozenset(booleans)
+        self.json_columns = dict(json_columns or {})
+        self._mappers = {}
+
+    def mapper(self, columns):
+        columns = tuple(columns)
+        mapper = self._mappers.get(columns)
+        if mapper is None:
+            mapper = self._mappers[columns] = compile_mapper(columns, self.rename, self.booleans, self.json_columns)
+        return mapper
+
+    def all(self, cursor):
+        """Every remaining row of an executed cursor as response dicts"""
+        cursor.row_factory = None  # Plain tuples: index access without sqlite3.Row overhead
+        mapper = self.mapper(column[0] for column in cursor.description)
+        return [mapper(row) for row in cursor.fetchall()]
+
+    def batches(self, cursor, batch_size=None):
+        """Rows of an executed cursor as lists of response dicts, fetchmany() at a time"""
+        cursor.row_factory = None
+        mapper = self.mapper(column[0] for column in cursor.description)
+        batch_size = batch_size or Config.STREAM_BATCH_SIZE
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [mapper(row) for row in rows]
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return None  # Raw blobs are never part of a response
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _stdlib_dumps(payload):
+    return json.dumps(payload, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+ENCODERS = {'json': _stdlib_dumps}
+if orjson is not None:
+    ENCODERS['orjson'] = lambda payload: orjson.dumps(payload, default=_default)
+
+
+def register_encoder(name, dumps):
+    """Add an encoder (payload -> UTF-8 bytes) selectable with JSON_ENCODER"""
+    ENCODERS[name] = dumps
+
+
+def get_encoder(name=None):
+    name = name or Config.JSON_ENCODER
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in ENCODERS else 'json'
+    if name not in ENCODERS:
+        print(f"⚠️  JSON encoder '{name}' is not available, using json")
+        name = 'json'
+    return ENCODERS[name]
+
+
+def dumps(payload, encoder=None):
+    return get_encoder(encoder)(payload)
+
+
+def json_response(payload, status=200):
+    """Like jsonify() for large list payloads: encoded once, straight to bytes"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def stream_format(request):
+    """'ndjson' or 'json' when the client asked for a streamed listing, None otherwise"""
+    if request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+        return 'ndjson'
+    if request.args.get('stream', '').lower() == 'true':
+        return 'json'
+    return None
+
+
+def stream_response(batches, ndjson=False, encoder=None):
+    """Stream lists of rows as {"success": true, "data": [...]} or as NDJSON.
+
+    batches is consumed while the response is sent, so a generator that opens
+    its own connection keeps at most one batch in memory.
+    """
+    dumps = get_encoder(encoder)
+
+    def generate():
+        try:
+            if ndjson:
+                for batch in batches:
+                    yield b''.join(dumps(row) + b'\n' for row in batch)
+                return
+            yield b'{"success":true,"data":['
+            separator = b''
+            for batch in batches:
+                if batch:
+                    yield separator + b','.join(dumps(row) for row in batch)
+                    separator = b','
+            yield b']}'
+        except Exception as e:
+            # Headers are already sent: the client sees a truncated body
+            print(f"❌ Streaming response failed: {e}")
+            raise
+
+    mimetype = NDJSON_MIMETYPE if ndjson else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+def _benchmark(rows=50000):
+    import os
+    import sqlite3
+    import tempfile
+    from flask import Flask, jsonify
+    from schema_migrations import migrate
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (1, 'res@x.com', 'Resident', 'resident')")
+    conn.executemany('''
+        INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                              end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount,
+                              contact_number, contact_address, status)
+        VALUES (?, 1, 1, 0, '2026-03-10', '6:00 AM - 8:00 AM', '6:00 AM - 8:00 AM', 2, 'Birthday party',
+                500, 250, 1000, '09171234567', 'Purok 1', 'approved')
+    ''', [(f'BR{i}',) for i in range(rows)])
+    conn.commit()
+    sql = 'SELECT b.*, u.full_name, u.email AS user_email, u.verified FROM bookings b LEFT JOIN users u ON b.user_id = u.id'
+    app = Flask(__name__)
+
+    def old_path():
+        conn.row_factory = sqlite3.Row
+        result = []
+        for row in conn.execute(sql).fetchall():
+            column_names = row.keys()
+            booking = {}
+            for name in column_names:
+                booking[name] = row[name]
+            booking['verified'] = bool(booking['verified'])
+            result.append(booking)
+        with app.app_context():
+            return jsonify({'success': True, 'data': result}).get_data()
+
+    serializer = RowSerializer(booleans=('verified',))
+
+    def compiled_path(encoder):
+        return dumps({'success': True, 'data': serializer.all(conn.execute(sql))}, encoder)
+
+    paths = [('dict per field + jsonify', old_path), ('compiled mapper + json', lambda: compiled_path('json'))]
+    if 'orjson' in ENCODERS:
+        paths.append(('compiled mapper + orjson', lambda: compiled_path('orjson')))
+    print(f"📊 Serializing {rows} bookings")
+    for label, path in paths:
+        best = min(_timed(path) for _ in range(3))
+        print(f"   {label:<28} {rows / best:>10,.0f} rows/sec ({best * 1000:.0f} ms)")
+    conn.close()
+
+
+def _timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
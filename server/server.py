@@ -4,153 +4,164 @@ Barangay Reserve Server
 Free, self-hosted solution for students
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, send_file, redirect
 from flask_cors import CORS
 import sqlite3
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import wraps
 import os
+import io
+import hashlib
+import mimetypes
+from urllib.parse import urlencode
 from config import Config
+from db_pool import get_pool
+from database_manager import db_manager, WriteRollback
+from group_commit import GroupCommitWriter
+from image_derivatives import VARIANTS, DerivativeCache
+import receipt_checks
+import time_model
+import booking_intervals
+import slot_occupancy
+import calendar_cache
+import booking_projection
+import serializers
+import pagination
+import booking_changes
+import conditional_get
+from receipt_similarity import ReceiptSimilarityIndex
+from blob_store import ALLOWED_MIME_TYPES, DOCUMENT_COLUMNS, UploadTooLarge, decode_document, get_blob_store, is_inline_document
+from schema_migrations import check_schema, migrate
+import index_advisor
 
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH  # Oversized bodies get a 413 before they are read
 # Dynamic CORS configuration for DuckDNS
 CORS(app, origins=Config.get_cors_origins())
 
-# Database setup
-def init_db():
-    import sqlite3
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Create tables
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE,
-            password TEXT,
-            full_name TEXT,
-            role TEXT,
-            verified BOOLEAN DEFAULT FALSE,
-            discount_rate REAL DEFAULT 0.0,
-            contact_number TEXT,
-            address TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS facilities (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            description TEXT,
-            price REAL,
-            image_url TEXT,
-            active BOOLEAN DEFAULT 1,
-            amenities TEXT,
-            downpayment REAL,
-            capacity INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS bookings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            facility_id INTEGER,
-            user_email TEXT,
-            date TEXT,
-            timeslot TEXT,
-            purpose TEXT,
-            status TEXT DEFAULT 'pending',
-            payment_details TEXT,
-            receipt_base64 TEXT,
-            contact_number TEXT,
-            address TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (facility_id) REFERENCES facilities (id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS verification_requests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            request_reference VARCHAR(20) NOT NULL,
-            user_id INTEGER NOT NULL,
-            verification_type VARCHAR(20) NOT NULL,
-            requested_discount_rate DECIMAL(3,2) NOT NULL,
-            user_photo_base64 TEXT,
-            user_photo_filename VARCHAR(255),
-            valid_id_base64 TEXT,
-            valid_id_filename VARCHAR(255),
-            proof_of_residency_base64 TEXT,
-            proof_of_residency_filename VARCHAR(255),
-            additional_documents TEXT,
-            residential_address TEXT,
-            years_of_residence INTEGER,
-            status VARCHAR(30) DEFAULT 'pending',
-            reviewed_by INTEGER,
-            reviewed_at DATETIME,
-            approval_notes TEXT,
-            rejection_reason TEXT,
-            additional_info_requested TEXT,
-            additional_info_provided TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+# Schema is managed by schema_migrations.py; pending migrations are applied at import, so WSGI
+# servers and test clients never start against an old schema (a no-op once up to date)
+migrate()
 
-# Initialize database on startup
-init_db()
-
-# Helper function to get database connection
+# Helper function to get database connection (borrowed from the pool, close() returns it)
 def get_db_connection():
-    print(f"🔍 DEBUG: Connecting to database at: {Config.DATABASE_PATH}")
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool().acquire()
 
 # Alias for backward compatibility
 def get_db():
     return get_db_connection()
 
-# Add missing columns to existing database
-def migrate_database():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Add missing columns to facilities table if they don't exist
-    try:
-        cursor.execute('ALTER TABLE facilities ADD COLUMN active BOOLEAN DEFAULT 1')
-    except:
-        pass  # Column might already exist
-    
-    try:
-        cursor.execute('ALTER TABLE facilities ADD COLUMN amenities TEXT')
-    except:
-        pass  # Column might already exist
-    
-    try:
-        cursor.execute('ALTER TABLE facilities ADD COLUMN downpayment REAL')
-    except:
-        pass  # Column might already exist
+# Booking writes go through the group-commit queue when enabled, otherwise straight to the writer
+group_writer = GroupCommitWriter(db_manager) if Config.GROUP_COMMIT_ENABLED else None
+
+def run_write(operation, *args):
+    if group_writer is not None:
+        # On timeout the queued write is cancelled, so a client retry can't create a duplicate
+        return group_writer.run(operation, *args, timeout=Config.GROUP_COMMIT_TIMEOUT)
+    return db_manager.run_write(operation, *args)
+
+# Thumbnails/previews are rendered off the request threads in a small process pool
+derivatives = DerivativeCache(db_manager, get_blob_store())
+# Perceptual hashes of receipts (computed in the same pool) for near-duplicate search
+receipt_similarity = ReceiptSimilarityIndex(db_manager, get_blob_store(), derivatives)
+# Pre-masked booking lists shared by every resident (own bookings merged per request)
+masked_calendar = calendar_cache.MaskedCalendarCache()
+
+# Document downloads: blob URLs carry the content hash, so they never change and can be cached forever
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'private, no-cache'
+DOCUMENT_ACCESS_PARAMS = ('user_role', 'user_email', 'excludeUserRole')
+
+def _document_url(path, blob_hash=None, variant=None):
+    """Absolute download URL that keeps the caller's access parameters and pins the content hash"""
+    params = {key: request.args[key] for key in DOCUMENT_ACCESS_PARAMS if request.args.get(key)}
+    if blob_hash:
+        params['v'] = blob_hash
+    if variant:
+        params['variant'] = variant
+    query = f'?{urlencode(params)}' if params else ''
+    return f"{request.host_url.rstrip('/')}{path}{query}"
+
+def _lookup_variant(conn, blob_hash, mime_type, variant):
+    """Ready thumbnail/preview for ?variant=, or None (then it is scheduled and the original is served)"""
+    if not variant or not blob_hash:
+        return None
+    derived_hash = derivatives.lookup(conn, blob_hash, variant)
+    if derived_hash is None:
+        derivatives.schedule(blob_hash, mime_type=mime_type)
+    return derived_hash
+
+def _send_document(blob_hash, inline_value, mime_type, download_name, derived_hash=None):
+    """Stream a document with a strong ETag; send_file handles If-None-Match (304) and Range (206)"""
+    if blob_hash:
+        # Only URLs pinned to this hash (?v=) are safe to cache forever - but not when a
+        # requested thumbnail isn't ready yet and the original is served in its place
+        cacheable = request.args.get('v') == blob_hash and (derived_hash or not request.args.get('variant'))
+        if derived_hash:
+            blob_hash, mime_type = derived_hash, 'image/jpeg'
+            download_name += f"-{request.args['variant']}"
+        download_name += mimetypes.guess_extension(mime_type or '') or ''
+        path = get_blob_store().path_for(blob_hash)
+        if not os.path.exists(path):
+            return jsonify({'success': False, 'message': 'Document file is missing'}), 404
+        response = send_file(path, mimetype=mime_type, conditional=True, etag=blob_hash,
+                             download_name=download_name, max_age=31536000)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if cacheable else REVALIDATE_CACHE_CONTROL
+        return response
     
-    try:
-        cursor.execute('ALTER TABLE facilities ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
-    except:
-        pass  # Column might already exist
+    if inline_value and not is_inline_document(inline_value):
+        return redirect(inline_value)  # Documents stored as external links
     
-    conn.commit()
-    conn.close()
-    print("Database migration completed")
+    # Rows not yet moved by `python blob_store.py migrate` are decoded from the inline base64
+    decoded = decode_document(inline_value)
+    if decoded is None:
+        return jsonify({'success': False, 'message': 'Document not found'}), 404
+    data, mime_type = decoded
+    download_name += mimetypes.guess_extension(mime_type) or ''
+    response = send_file(io.BytesIO(data), mimetype=mime_type, conditional=True,
+                         etag=hashlib.sha256(data).hexdigest(), download_name=download_name)
+    response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
+
+# Sessions: login/register store the token they hand out, admin routes look it up
+SESSION_LIFETIME = timedelta(days=7)
+
+def _create_session(conn, user_id):
+    """Store a new session for the user and return its token (runs inside a write transaction)"""
+    import uuid
+    session_token = str(uuid.uuid4())
+    conn.execute('''
+        INSERT INTO user_sessions (user_id, session_token, expires_at)
+        VALUES (?, ?, ?)
+    ''', (user_id, session_token, datetime.now() + SESSION_LIFETIME))
+    return session_token
 
-# Run migration
-migrate_database()
+def _bearer_token():
+    token = request.headers.get('Authorization', '')
+    return token[7:] if token.startswith('Bearer ') else token
+
+def official_required(f):
+    """401 without a valid session token, 403 unless the session belongs to an official"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = _bearer_token()
+        if not token:
+            return jsonify({'success': False, 'message': 'Token is missing'}), 401
+        with db_manager.read_connection() as conn:
+            session = conn.execute('''
+                SELECT s.user_id, u.email, u.role
+                FROM user_sessions s
+                JOIN users u ON s.user_id = u.id
+                WHERE s.session_token = ? AND s.is_active = TRUE AND s.expires_at > ?
+            ''', (token, datetime.now())).fetchone()
+        if not session:
+            return jsonify({'success': False, 'message': 'Invalid token'}), 401
+        if session[2] != 'official':
+            return jsonify({'success': False, 'message': 'Access denied'}), 403
+        request.current_user = {'user_id': session[0], 'email': session[1], 'role': session[2]}
+        return f(*args, **kwargs)
+    return decorated
 
 # API Routes
 
@@ -162,6 +173,95 @@ def home():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/admin/db-pool', methods=['GET'])
+@official_required
+def get_db_pool_stats():
+    return jsonify({
+        'success': True,
+        'data': get_pool().stats()
+    })
+
+@app.route('/api/admin/db-stats', methods=['GET'])
+@official_required
+def get_db_stats():
+    stats = db_manager.stats()
+    if group_writer is not None:
+        stats['group_commit'] = group_writer.stats()
+    stats['masked_calendar'] = masked_calendar.stats()
+    return jsonify({
+        'success': True,
+        'data': stats
+    })
+
+@app.route('/api/admin/schema', methods=['GET'])
+@official_required
+def get_schema_status():
+    return jsonify({
+        'success': True,
+        'data': check_schema()
+    })
+
+@app.route('/api/admin/index-report', methods=['GET'])
+@official_required
+def get_index_report():
+    with get_pool().connection() as conn:
+        report = index_advisor.analyze(conn)
+    return jsonify({
+        'success': True,
+        'data': report
+    })
+
+@app.route('/api/admin/blob-stats', methods=['GET'])
+@official_required
+def get_blob_stats():
+    with db_manager.read_connection() as conn:
+        stats = get_blob_store().stats(conn)
+        stats['derivatives'] = conn.execute('SELECT COUNT(*) FROM blob_derivatives').fetchone()[0]
+    stats['derivative_jobs'] = derivatives.stats()
+    stats['receipt_similarity'] = receipt_similarity.stats()
+    return jsonify({
+        'success': True,
+        'data': stats
+    })
+
+def _stream_receipt_upload():
+    """Write the request's receipt to the blob store in chunks (multipart 'receipt'/'file' field or raw body).
+
+    Returns (info, None) on success or (None, (response, status)) on failure.
+    """
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('receipt') or request.files.get('file')
+        if upload is None:
+            return None, (jsonify({'success': False, 'message': 'Missing receipt file field'}), 400)
+        stream = upload.stream
+    else:
+        if request.content_length is None:
+            return None, (jsonify({'success': False, 'message': 'Content-Length is required'}), 411)
+        stream = request.stream
+    
+    try:
+        blob_hash, size, mime_type = get_blob_store().write_stream(stream, Config.MAX_UPLOAD_BYTES)
+    except UploadTooLarge as e:
+        return None, (jsonify({'success': False, 'message': str(e)}), 413)
+    if size == 0:
+        return None, (jsonify({'success': False, 'message': 'Receipt file is empty'}), 400)
+    if mime_type not in ALLOWED_MIME_TYPES:
+        return None, (jsonify({'success': False, 'message': 'Receipt must be a JPEG, PNG, GIF, WebP or PDF file'}), 415)
+    
+    with db_manager.write_connection() as conn:
+        get_blob_store().register_upload(conn, blob_hash, size, mime_type)
+    print(f"✅ RECEIPT UPLOADED: {blob_hash[:12]} ({size} bytes, {mime_type})")
+    derivatives.schedule(blob_hash, mime_type=mime_type)
+    return {'receipt_hash': blob_hash, 'size': size, 'mime_type': mime_type}, None
+
+@app.route('/api/uploads/receipt', methods=['POST'])
+def upload_receipt():
+    """Stream a receipt to disk; pass the returned receipt_hash to POST /api/bookings"""
+    info, error = _stream_receipt_upload()
+    if error:
+        return error
+    return jsonify({'success': True, 'data': info})
+
 @app.route('/api/me', methods=['GET'])
 def get_current_user():
     # This is a simplified version - in production, you'd validate the JWT token
@@ -202,16 +302,17 @@ def get_current_user():
     else:
         return jsonify({'success': False, 'error': 'User not found'})
 
+FACILITY_ROWS = serializers.RowSerializer()
+
 @app.route('/api/facilities', methods=['GET'])
+@conditional_get.depends_on('facilities')
 def get_facilities():
     try:
         conn = get_db()
-        facilities = conn.execute('SELECT * FROM facilities').fetchall()
+        facilities_list = FACILITY_ROWS.all(conn.execute('SELECT * FROM facilities'))
         conn.close()
         
-        facilities_list = [dict(facility) for facility in facilities]
-        
-        return jsonify({
+        return serializers.json_response({
             'success': True,
             'data': facilities_list
         })
@@ -222,6 +323,61 @@ def get_facilities():
             'error': str(e)
         }), 500
 
+# Fields _add_receipt_fields fills in
+RECEIPT_FIELDS = ('receipt_hash', 'receipt_url', 'receipt_thumbnail_url', 'receipt_base64')
+
+def _add_receipt_fields(bookings):
+    """Receipts are served by /api/bookings/<id>/receipt; inline base64 only on request for older clients"""
+    include_documents = request.args.get('include_documents', '').lower() == 'true'
+    blob_store = get_blob_store()
+    for booking_dict in bookings:
+        blob_hash = booking_dict.pop('receipt_blob', None)
+        has_receipt = blob_hash or booking_dict.get('receipt_base64') or booking_dict.pop('has_inline_receipt', None)
+        booking_dict['receipt_hash'] = blob_hash
+        booking_dict['receipt_url'] = _document_url(f"/api/bookings/{booking_dict['id']}/receipt", blob_hash) if has_receipt else None
+        booking_dict['receipt_thumbnail_url'] = _document_url(f"/api/bookings/{booking_dict['id']}/receipt", blob_hash, 'thumb') if blob_hash else booking_dict['receipt_url']
+        if include_documents:
+            if blob_hash:
+                booking_dict['receipt_base64'] = blob_store.data_url(blob_hash)
+        else:
+            booking_dict['receipt_base64'] = None
+    return bookings
+
+def _official_booking_batches(conn, conditions, params, fields, limit=None):
+    """Unmasked bookings with duplicate-receipt flags and receipt links, one fetchmany() batch at a time"""
+    query, query_params = booking_projection.listing_query(conn, conditions, params, fields=fields, limit=limit)
+    flag_duplicates = booking_projection.wants(fields, 'duplicate_receipt', 'duplicate_receipt_booking_ids')
+    add_receipts = booking_projection.wants(fields, *RECEIPT_FIELDS)
+    for bookings in booking_projection.ROWS.batches(conn.execute(query, query_params)):
+        # Officials see which receipts were already used on other bookings
+        if flag_duplicates:
+            receipt_checks.flag_duplicates(conn, bookings)
+        if add_receipts:
+            _add_receipt_fields(bookings)
+        yield booking_projection.project(bookings, fields)
+
+def _stream_official_bookings(conditions, params, fields):
+    with db_manager.read_connection() as conn:
+        yield from _official_booking_batches(conn, conditions, params, fields)
+
+def _official_booking_page(conn, conditions, params, fields, page):
+    """One keyset page of the official listing, with next_cursor (and total when asked for)"""
+    body = {'success': True}
+    if page.include_total:
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        body['total'] = conn.execute(f'SELECT COUNT(*) FROM bookings b{where}', params).fetchone()[0]
+    if page.after is not None:
+        keyset, keyset_params = pagination.keyset_condition(booking_projection.SORT_KEYS, page.after)
+        conditions, params = conditions + [keyset], params + keyset_params
+    # The sort keys are needed for the cursor even when ?fields= leaves them out
+    query_fields = fields and tuple(dict.fromkeys(fields + booking_projection.SORT_FIELDS))
+    # One extra row tells whether there is a next page
+    bookings = [booking for batch in _official_booking_batches(conn, conditions, params, query_fields, page.limit + 1)
+                for booking in batch]
+    bookings, body['next_cursor'] = pagination.next_cursor(bookings, page.limit, booking_projection.sort_values)
+    body['data'] = booking_projection.project(bookings, fields)
+    return body
+
 @app.route('/api/bookings', methods=['GET'])
 def get_bookings():
     print("🔍 BOOKINGS ENDPOINT CALLED!")  # Simple debug test
@@ -233,430 +389,373 @@ def get_bookings():
     
     print(f"🔍 DEBUG: Parameters - facility_id={facility_id}, date={date}, user_role={user_role}, user_email={user_email}")
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    try:
-        if exclude_user_role:
-            # Return ALL bookings without any user role filtering (for official use)
-            print("🔍 Returning ALL bookings (excludeUserRole=true)")
-            
-            # Build query with optional facility and date filtering
-            query = '''
-                SELECT b.id, b.booking_reference, b.user_id, b.facility_id, b.time_slot_id, 
-                       b.booking_date, b.start_time, b.end_time, b.duration_hours,
-                       b.purpose, b.expected_attendees, b.special_requirements,
-                       b.contact_number, b.contact_address, b.base_rate, b.discount_rate,
-                       b.discount_amount, b.downpayment_amount, b.total_amount,
-                       b.receipt_base64, b.receipt_filename, b.receipt_uploaded_at,
-                       b.status, b.priority_level, b.approved_by, b.approved_at,
-                       b.rejection_reason, b.is_competitive, b.competing_booking_ids,
-                       b.competition_resolved, b.created_at, b.updated_at,
-                       f.name as facility_name, u.full_name, u.email as user_email, u.verified, u.discount_rate, u.role as user_role
-                FROM bookings b
-                LEFT JOIN facilities f ON b.facility_id = f.id
-                LEFT JOIN users u ON b.user_id = u.id
-            '''
-            
-            params = []
+    with db_manager.read_connection() as conn:
+        try:
+            # ?fields=a,b or ?view=calendar|list|detail: only what the client renders is read and returned;
+            # ?limit=&cursor= pages the official listing
+            try:
+                fields = booking_projection.resolve_fields(conn, request.args.get('fields'), request.args.get('view'))
+                page = pagination.page_request(request.args, booking_projection.SORT_KEYS)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            
+            # Optional facility and date filtering, shared by every branch
             conditions = []
-            
-            if facility_id:
-                conditions.append('b.facility_id = ?')
-                params.append(facility_id)
-            
-            if date:
-                conditions.append('b.booking_date = ?')
-                params.append(date)
-            
-            if conditions:
-                query += ' WHERE ' + ' AND '.join(conditions)
-            
-            query += ' ORDER BY b.booking_date DESC, b.start_time ASC'
-            
-            print(f"🔍 DEBUG: Query: {query}")
-            print(f"🔍 DEBUG: Params: {params}")
-            
-            bookings = cursor.execute(query, params).fetchall()
-            
-            # Create dictionary manually with proper column names
-            result = []
-            column_names = [
-                'id', 'booking_reference', 'user_id', 'facility_id', 'time_slot_id',
-                'booking_date', 'start_time', 'end_time', 'duration_hours',
-                'purpose', 'expected_attendees', 'special_requirements',
-                'contact_number', 'contact_address', 'base_rate', 'discount_rate',
-                'discount_amount', 'downpayment_amount', 'total_amount',
-                'receipt_base64', 'receipt_filename', 'receipt_uploaded_at',
-                'status', 'priority_level', 'approved_by', 'approved_at',
-                'rejection_reason', 'is_competitive', 'competing_booking_ids',
-                'competition_resolved', 'created_at', 'updated_at',
-                'facility_name', 'full_name', 'user_email', 'verified', 'discount_rate', 'user_role'
-            ]
-            
-            for booking in bookings:
-                booking_dict = {}
-                for i, col_name in enumerate(column_names):
-                    if i < len(booking):
-                        booking_dict[col_name] = booking[i]
-                result.append(booking_dict)
-        elif user_role == 'resident' and user_email:
-            # Residents can see filtered bookings for calendar (but without sensitive details)
-            print("🔍 Returning filtered bookings for resident")
-            
-            # Build query with optional facility and date filtering
-            query = '''
-                SELECT b.*, f.name as facility_name, u.full_name, u.email as user_email, u.verified, u.discount_rate, u.role as user_role
-                FROM bookings b
-                LEFT JOIN facilities f ON b.facility_id = f.id
-                LEFT JOIN users u ON b.user_id = u.id
-            '''
-            
             params = []
-            conditions = []
-            
             if facility_id:
                 conditions.append('b.facility_id = ?')
                 params.append(facility_id)
-            
             if date:
                 conditions.append('b.booking_date = ?')
                 params.append(date)
             
-            if conditions:
-                query += ' WHERE ' + ' AND '.join(conditions)
-            
-            query += ' ORDER BY b.booking_date DESC, b.start_time ASC'
-            
-            print(f"🔍 DEBUG: Resident Query: {query}")
-            print(f"🔍 DEBUG: Resident Params: {params}")
-            
-            bookings = cursor.execute(query, params).fetchall()
-            
-            # For residents, return only essential booking info (privacy protection)
-            result = []
-            for booking in bookings:
-                booking_dict = dict(booking)
+            # ?stream=true or Accept: application/x-ndjson streams the listing instead
+            stream = serializers.stream_format(request)
+            
+            if exclude_user_role or user_role == 'official':
+                # Officials (and excludeUserRole=true) see every booking unmasked
+                print(f"🔍 Returning ALL bookings for official (excludeUserRole={exclude_user_role})")
+                if page:
+                    return serializers.json_response(_official_booking_page(conn, conditions, params, fields, page))
+                if stream:
+                    # The stream borrows its own connection and holds one fetchmany() batch at a time
+                    return serializers.stream_response(_stream_official_bookings(conditions, params, fields),
+                                                       ndjson=stream == 'ndjson')
+                result = [booking for batch in _official_booking_batches(conn, conditions, params, fields)
+                          for booking in batch]
+            elif user_role == 'resident' and user_email:
+                # Residents can see filtered bookings for calendar (but without sensitive details)
+                print("🔍 Returning filtered bookings for resident")
                 
-                # Debug logging for privacy check
-                print(f"🔍 PRIVACY CHECK: booking_email='{booking_dict['user_email']}' vs user_email='{user_email}'")
+                def build_calendar(conn):
+                    # Every booking masked in SQL: other people's contacts and receipts are never read
+                    query, query_params = booking_projection.listing_query(conn, conditions, params, masked=True,
+                                                                           fields=fields)
+                    return booking_projection.fetch(conn, query, query_params)
                 
-                # Remove sensitive information for residents (but keep email for official detection)
-                if booking_dict['user_email'] and user_email and booking_dict['user_email'].lower().strip() != user_email.lower().strip():
-                    # Store original email for official detection
-                    original_email = booking_dict['user_email']
-                    
-                    # Remove sensitive details for other users' bookings
-                    booking_dict['full_name'] = 'Reserved'
-                    booking_dict['user_email'] = 'private'
-                    booking_dict['contact_number'] = 'private'
-                    booking_dict['contact_address'] = 'private'
-                    booking_dict['receipt_base64'] = None
-                    booking_dict['purpose'] = 'Private Booking'
-                    
-                    # Add a flag for official detection (preserves original email logic)
-                    booking_dict['is_official_booking'] = (
-                        original_email and (
-                            'official' in original_email or 
-                            'barangay' in original_email or 
-                            'admin' in original_email
-                        )
-                    )
-                    
-                    print(f"🔍 PRIVACY APPLIED: Masked booking for user {original_email}")
-                else:
-                    print(f"🔍 PRIVACY NOT APPLIED: User can see full booking details")
+                # Everyone else's bookings come pre-masked from the shared cache (privacy protection)
+                masked = masked_calendar.get(conn, facility_id, date, build_calendar, fields)
                 
-                result.append(booking_dict)
+                # The caller's own bookings, unmasked by the same projection, from the (user_id, status) index
+                query, query_params = booking_projection.listing_query(
+                    conn, conditions + ['b.user_id IN (SELECT id FROM users WHERE lower(email) = ?)'],
+                    params + [user_email.lower().strip()], viewer_email=user_email, masked=True, fields=fields)
+                own = booking_projection.fetch(conn, query, query_params)
+                if booking_projection.wants(fields, *RECEIPT_FIELDS):
+                    _add_receipt_fields(own)
                 
-        elif user_role == 'official':
-            # Officials can see filtered bookings
-            print("🔍 Returning filtered bookings for official")
-            
-            # Build query with optional facility and date filtering
-            query = '''
-                SELECT b.*, f.name as facility_name, u.full_name, u.email as user_email, u.verified, u.discount_rate, u.role as user_role
-                FROM bookings b
-                LEFT JOIN facilities f ON b.facility_id = f.id
-                LEFT JOIN users u ON b.user_id = u.id
-            '''
+                result = booking_projection.project(calendar_cache.merge_own(masked, own), fields)
+                print(f"🔍 PRIVACY APPLIED: {len(result) - len(own)} masked booking(s), {len(own)} own")
+            else:
+                result = []
             
-            params = []
-            conditions = []
+            if stream:
+                return serializers.stream_response([result], ndjson=stream == 'ndjson')
+            return serializers.json_response({
+                'success': True,
+                'data': result
+            })
             
+        except Exception as e:
+            print(f"❌ Error in bookings endpoint: {e}")
+            return jsonify({'success': False, 'message': 'Error fetching bookings'}), 500
+
+@app.route('/api/bookings/changes', methods=['GET'])
+def get_booking_changes():
+    """Bookings inserted or changed, and ids deleted, since ?since=<cursor> (0 or missing: every booking)"""
+    user_email = request.args.get('user_email')
+    user_role = request.args.get('user_role', 'resident')
+    facility_id = request.args.get('facility_id')
+    exclude_user_role = request.args.get('excludeUserRole', '').lower() == 'true'
+    
+    try:
+        since = booking_changes.parse_since(request.args.get('since'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'since must be the cursor from a previous response'}), 400
+    
+    with db_manager.read_connection() as conn:
+        try:
+            try:
+                fields = booking_projection.resolve_fields(conn, request.args.get('fields'), request.args.get('view'))
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            
+            # Read the cursor first: a write landing mid-request is sent again next time, never lost
+            cursor = booking_changes.current_cursor(conn)
+            reset = booking_changes.needs_reset(conn, since)
+            if reset:
+                since = 0  # Deletions the client missed were pruned: send everything, client starts over
+            
+            conditions, params = [booking_changes.CHANGED_SINCE], [since]
             if facility_id:
                 conditions.append('b.facility_id = ?')
                 params.append(facility_id)
             
-            if date:
-                conditions.append('b.booking_date = ?')
-                params.append(date)
-            
-            if conditions:
-                query += ' WHERE ' + ' AND '.join(conditions)
-            
-            query += ' ORDER BY b.booking_date DESC, b.start_time ASC'
-            
-            print(f"🔍 DEBUG: Official Query: {query}")
-            print(f"🔍 DEBUG: Official Params: {params}")
-            
-            bookings = cursor.execute(query, params).fetchall()
-            result = [dict(booking) for booking in bookings]
-        else:
-            result = []
-            
-        return jsonify({
-            'success': True,
-            'data': result
-        })
+            # Same visibility as GET /api/bookings
+            if exclude_user_role or user_role == 'official':
+                changed = [booking for batch in _official_booking_batches(conn, conditions, params, fields)
+                           for booking in batch]
+            elif user_role == 'resident' and user_email:
+                query, query_params = booking_projection.listing_query(
+                    conn, conditions, params, viewer_email=user_email, masked=True, fields=fields)
+                changed = booking_projection.fetch(conn, query, query_params)
+                if booking_projection.wants(fields, *RECEIPT_FIELDS):
+                    _add_receipt_fields(changed)
+                changed = booking_projection.project(changed, fields)
+            else:
+                changed = []
             
-    except Exception as e:
-        print(f"❌ Error in bookings endpoint: {e}")
-        return jsonify({'success': False, 'message': 'Error fetching bookings'}), 500
-    finally:
-        conn.close()
-
-@app.route('/api/bookings/<int:booking_id>/status', methods=['PUT'])
-def update_booking_status(booking_id):
-    try:
-        data = request.get_json()
-        new_status = data.get('status')
-        rejection_reason = data.get('rejection_reason')
-        rejection_type = data.get('rejection_type')  # NEW: 'incorrect_downpayment' or 'fake_receipt'
-        
-        if new_status not in ['pending', 'approved', 'rejected']:
-            return jsonify({'success': False, 'message': 'Invalid status'}), 400
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Get the booking details before updating
-        cursor.execute('''
-            SELECT facility_id, booking_date, start_time, user_id, status 
-            FROM bookings WHERE id = ?
-        ''', (booking_id,))
-        
-        booking = cursor.fetchone()
-        if not booking:
-            conn.close()
-            return jsonify({'success': False, 'message': 'Booking not found'}), 404
+            deleted = booking_changes.deleted_since(conn, since) if since else []
+            print(f"🔄 Booking changes since {since}: {len(changed)} changed, {len(deleted)} deleted (cursor {cursor})")
+            return serializers.json_response({
+                'success': True,
+                'data': changed,
+                'deleted': deleted,
+                'cursor': cursor,
+                'reset': reset
+            })
         
-        facility_id, date, timeslot, user_id, current_status = booking
+        except Exception as e:
+            print(f"❌ Error in booking changes endpoint: {e}")
+            return jsonify({'success': False, 'message': 'Error fetching booking changes'}), 500
+
+def _update_booking_status_tx(conn, booking_id, data):
+    """Apply a booking status change (violations, competitor rejection) in one write transaction"""
+    new_status = data.get('status')
+    rejection_reason = data.get('rejection_reason')
+    rejection_type = data.get('rejection_type')  # NEW: 'incorrect_downpayment' or 'fake_receipt'
+    
+    cursor = conn.cursor()
+    
+    # Get the booking details before updating
+    cursor.execute('''
+        SELECT facility_id, booking_date, start_time, user_id, status, day_key, start_minute, end_minute
+        FROM bookings WHERE id = ?
+    ''', (booking_id,))
+    
+    booking = cursor.fetchone()
+    if not booking:
+        raise WriteRollback(({'success': False, 'message': 'Booking not found'}, 404))
+    
+    facility_id, date, timeslot, user_id, current_status, day_key, start_minute, end_minute = booking
+    
+    print(f"🔍 DEBUG: Updating booking {booking_id} from {current_status} to {new_status}")
+    if rejection_reason:
+        print(f"🔍 DEBUG: Rejection reason: {rejection_reason}")
+    if rejection_type:
+        print(f"🔍 DEBUG: Rejection type: {rejection_type}")
+    else:
+        print(f"🔍 DEBUG: Rejection type is NULL or missing")
+    
+    # NEW: Handle violation tracking for fake receipt rejections
+    if new_status == 'rejected' and rejection_type == 'fake_receipt':
+        print(f"🚨 VIOLATION DETECTED: Fake receipt rejection for user {user_id}")
         
-        print(f"🔍 DEBUG: Updating booking {booking_id} from {current_status} to {new_status}")
-        if rejection_reason:
-            print(f"🔍 DEBUG: Rejection reason: {rejection_reason}")
-        if rejection_type:
-            print(f"🔍 DEBUG: Rejection type: {rejection_type}")
-        else:
-            print(f"🔍 DEBUG: Rejection type is NULL or missing")
+        # Get current violation count
+        cursor.execute('SELECT fake_booking_violations, is_banned FROM users WHERE id = ?', (user_id,))
+        user_violations = cursor.fetchone()
         
-        # NEW: Handle violation tracking for fake receipt rejections
-        if new_status == 'rejected' and rejection_type == 'fake_receipt':
-            print(f"🚨 VIOLATION DETECTED: Fake receipt rejection for user {user_id}")
+        if user_violations:
+            current_violations, is_banned = user_violations
             
-            # Get current violation count
-            cursor.execute('SELECT fake_booking_violations, is_banned FROM users WHERE id = ?', (user_id,))
-            user_violations = cursor.fetchone()
+            if is_banned:
+                raise WriteRollback(({'success': False, 'message': 'User is already banned'}, 400))
             
-            if user_violations:
-                current_violations, is_banned = user_violations
+            new_violations = current_violations + 1
+            print(f"🔢 VIOLATION COUNT: {current_violations} -> {new_violations}")
+            
+            # Check if this is the 3rd violation (permanent ban)
+            if new_violations >= 3:
+                print(f"🚫 PERMANENT BAN: User {user_id} reached 3 violations")
                 
-                if is_banned:
-                    conn.close()
-                    return jsonify({'success': False, 'message': 'User is already banned'}), 400
+                # Update user to banned status
+                cursor.execute('''
+                    UPDATE users 
+                    SET fake_booking_violations = ?, 
+                        is_banned = TRUE, 
+                        banned_at = CURRENT_TIMESTAMP,
+                        ban_reason = 'Permanent ban after 3 fake receipt violations'
+                    WHERE id = ?
+                ''', (new_violations, user_id))
                 
-                new_violations = current_violations + 1
-                print(f"🔢 VIOLATION COUNT: {current_violations} -> {new_violations}")
+                ban_reason = "Your payment receipt is fake or shown no payment in our payment history/records, ⚠️ know that this violation will be recorded and you will only have three chances before getting your account banned! This is your 3rd violation - your account has been permanently banned."
                 
-                # Check if this is the 3rd violation (permanent ban)
-                if new_violations >= 3:
-                    print(f"🚫 PERMANENT BAN: User {user_id} reached 3 violations")
-                    
-                    # Update user to banned status
-                    cursor.execute('''
-                        UPDATE users 
-                        SET fake_booking_violations = ?, 
-                            is_banned = TRUE, 
-                            banned_at = CURRENT_TIMESTAMP,
-                            ban_reason = 'Permanent ban after 3 fake receipt violations'
-                        WHERE id = ?
-                    ''', (new_violations, user_id))
-                    
-                    ban_reason = "Your payment receipt is fake or shown no payment in our payment history/records, ⚠️ know that this violation will be recorded and you will only have three chances before getting your account banned! This is your 3rd violation - your account has been permanently banned."
-                    
-                else:
-                    print(f"⚠️ WARNING: User {user_id} now has {new_violations}/3 violations")
-                    
-                    # Update violation count
-                    cursor.execute('''
-                        UPDATE users 
-                        SET fake_booking_violations = ?
-                        WHERE id = ?
-                    ''', (new_violations, user_id))
-                    
-                    remaining_chances = 3 - new_violations
-                    ban_reason = f"Your payment receipt is fake or shown no payment in our payment history/records, ⚠️ know that this violation will be recorded and you will only have {remaining_chances} chance{'s' if remaining_chances > 1 else ''} remaining before getting your account banned!"
+            else:
+                print(f"⚠️ WARNING: User {user_id} now has {new_violations}/3 violations")
                 
-                # Update rejection reason with violation warning
-                rejection_reason = ban_reason
+                # Update violation count
+                cursor.execute('''
+                    UPDATE users 
+                    SET fake_booking_violations = ?
+                    WHERE id = ?
+                ''', (new_violations, user_id))
                 
-                print(f"📝 Updated rejection reason with violation warning")
-        else:
-            print(f"🔍 DEBUG: Skipping violation tracking - status: {new_status}, type: {rejection_type}")
-        
-        # Update the booking status and rejection reason
-        if rejection_reason and new_status == 'rejected':
-            cursor.execute('''
+                remaining_chances = 3 - new_violations
+                ban_reason = f"Your payment receipt is fake or shown no payment in our payment history/records, ⚠️ know that this violation will be recorded and you will only have {remaining_chances} chance{'s' if remaining_chances > 1 else ''} remaining before getting your account banned!"
+            
+            # Update rejection reason with violation warning
+            rejection_reason = ban_reason
+            
+            print(f"📝 Updated rejection reason with violation warning")
+    else:
+        print(f"🔍 DEBUG: Skipping violation tracking - status: {new_status}, type: {rejection_type}")
+    
+    # Update the booking status and rejection reason
+    if rejection_reason and new_status == 'rejected':
+        cursor.execute('''
+            UPDATE bookings 
+            SET status = ?, rejection_reason = ?, rejection_type = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (new_status, rejection_reason, rejection_type, booking_id))
+        print(f"🔍 DEBUG: Updated booking {booking_id} with rejection reason and type")
+    else:
+        cursor.execute('''
+            UPDATE bookings 
+            SET status = ?, rejection_type = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (new_status, rejection_type, booking_id))
+        print(f"🔍 DEBUG: Updated booking {booking_id} status and type")
+    
+    # If approving, automatically reject other pending bookings for the same time slot
+    if new_status == 'approved' and current_status == 'pending':
+        print(f"🏆 Approving booking {booking_id} and rejecting competitors for {facility_id} {date} {timeslot}")
+        
+        if start_minute is not None:
+            # Pending bookings that overlap at all lose, not only ones with the same timeslot string
+            competitor_ids = booking_intervals.find_conflicts(
+                conn, facility_id, day_key, start_minute, end_minute, statuses=('pending',),
+                exclude_booking_id=booking_id)
+            cursor.execute(f'''
                 UPDATE bookings 
-                SET status = ?, rejection_reason = ?, rejection_type = ?
-                WHERE id = ?
-            ''', (new_status, rejection_reason, rejection_type, booking_id))
-            print(f"🔍 DEBUG: Updated booking {booking_id} with rejection reason and type")
+                SET status = 'rejected', updated_at = CURRENT_TIMESTAMP
+                WHERE id IN ({', '.join('?' * len(competitor_ids))}) AND user_id != ?
+            ''', (*competitor_ids, user_id))
         else:
             cursor.execute('''
                 UPDATE bookings 
-                SET status = ?, rejection_type = ?
-                WHERE id = ?
-            ''', (new_status, rejection_type, booking_id))
-            print(f"🔍 DEBUG: Updated booking {booking_id} status and type")
-        
-        # If approving, automatically reject other pending bookings for the same time slot
-        if new_status == 'approved' and current_status == 'pending':
-            print(f"🏆 Approving booking {booking_id} and rejecting competitors for {facility_id} {date} {timeslot}")
-            
-            cursor.execute('''
-                UPDATE bookings 
-                SET status = 'rejected'
+                SET status = 'rejected', updated_at = CURRENT_TIMESTAMP
                 WHERE facility_id = ? AND booking_date = ? AND start_time = ? 
                 AND user_id != ? AND status = 'pending'
             ''', (facility_id, date, timeslot, user_id))
-            
-            rejected_count = cursor.rowcount
-            print(f"🚫 Auto-rejected {rejected_count} competing bookings")
         
-        conn.commit()
-        conn.close()
+        rejected_count = cursor.rowcount
+        print(f"🚫 Auto-rejected {rejected_count} competing bookings")
+    
+    # Re-materialize the day's slot states in the same transaction
+    slot_occupancy.refresh(conn, facility_id, day_key)
+    
+    return {'success': True, 'message': f'Booking {new_status} successfully'}, 200
+
+@app.route('/api/bookings/<int:booking_id>/status', methods=['PUT'])
+def update_booking_status(booking_id):
+    try:
+        data = request.get_json()
+        new_status = data.get('status')
+        
+        if new_status not in ['pending', 'approved', 'rejected']:
+            return jsonify({'success': False, 'message': 'Invalid status'}), 400
         
-        return jsonify({'success': True, 'message': f'Booking {new_status} successfully'})
+        result, status_code = run_write(_update_booking_status_tx, booking_id, data)
+        return jsonify(result), status_code
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/bookings', methods=['POST'])
-def create_booking():
-    data = request.json
-    print(f"🔍 DEBUG: create_booking called with data: {data}")
-    print(f"🔍 DEBUG: receipt_base64 in data: {'receipt_base64' in data}")
-    if 'receipt_base64' in data:
-        print(f"🔍 DEBUG: receipt_base64 length: {len(str(data['receipt_base64']))}")
-        print(f"🔍 DEBUG: receipt_base64 starts with data:image: {str(data['receipt_base64']).startswith('data:image')}")
+def _create_booking_tx(conn, data):
+    """Create a booking (and auto-reject residents for official bookings) in one write transaction"""
+    cursor = conn.cursor()
     
-    # Validate required fields
-    required_fields = ['facility_id', 'user_email', 'date', 'timeslot']
-    for field in required_fields:
-        if field not in data:
-            return jsonify({'success': False, 'message': f'Missing required field: {field}'}), 400
+    # Get user_id from email
+    cursor.execute('SELECT id, role, is_banned, ban_reason FROM users WHERE email = ?', (data['user_email'],))
+    user_result = cursor.fetchone()
     
-    conn = get_db()
-    cursor = conn.cursor()
+    if not user_result:
+        raise WriteRollback(({'success': False, 'message': 'User not found'}, 404))
     
-    try:
-        print(f"🔍 DEBUG: Database path: {Config.DATABASE_PATH}")
-        
-        # Get user_id from email
-        cursor.execute('SELECT id, role, is_banned, ban_reason FROM users WHERE email = ?', (data['user_email'],))
-        user_result = cursor.fetchone()
-        
-        if not user_result:
-            return jsonify({'success': False, 'message': 'User not found'}), 404
-        
-        user_id = user_result[0]
-        user_role = user_result[1]
-        is_banned = user_result[2]
-        ban_reason = user_result[3]
-        
-        # 🔒 BAN VALIDATION: Check if user is banned
-        if is_banned:
-            print(f"🚨 BANNED USER ATTEMPTED BOOKING: {data['user_email']} - Reason: {ban_reason}")
-            return jsonify({
-                'success': False, 
-                'message': 'Account is banned. Cannot create bookings.',
-                'error_type': 'user_banned',
-                'ban_reason': ban_reason or 'Account has been banned by administrator.'
-            }), 403
-        
-        print(f"🔍 DEBUG: Found user_id: {user_id}, role: {user_role}, banned: {is_banned} for email: {data['user_email']}")
-        
-        # Check if this is an official booking
-        is_official_booking = user_role == 'official'
-        print(f"🔍 DEBUG: Is official booking: {is_official_booking}")
-        print(f"🔍 DEBUG: User role: {user_role}")
-        print(f"🔍 DEBUG: User email: {data['user_email']}")
-        print(f"🔍 DEBUG: Timeslot: {data['timeslot']}")
-        
-        # Check if USER already has this exact time slot (prevent duplicate user bookings)
-        cursor.execute('''
-            SELECT id, user_id, status FROM bookings 
-            WHERE facility_id = ? AND booking_date = ? AND start_time = ? AND user_id = ?
-        ''', (data['facility_id'], data['date'], data['timeslot'], user_id))
-        
-        user_existing_booking = cursor.fetchone()
-        
-        # If user already has this exact time slot, block it
-        if user_existing_booking:
-            return jsonify({
-                'success': False, 
-                'message': 'You already have a booking for this time slot. Please choose a different time.',
-                'error_type': 'duplicate_user_booking'
-            }), 409
-        
-        # AUTO-REJECTION LOGIC FOR OFFICIAL BOOKINGS
-        rejected_resident_bookings = []
-        if is_official_booking:
-            print(f"🏆 OFFICIAL BOOKING DETECTED - Checking for resident bookings (pending + approved) for time slot {data['timeslot']}...")
-            print(f"🔍 DEBUG: Auto-rejection logic triggered for timeslot: {data['timeslot']}")
-            
-            # Find resident bookings (pending AND approved) that overlap with this time slot
-            print(f"🔍 DEBUG: Timeslot value: '{data['timeslot']}' (type: {type(data['timeslot'])})")
-            print(f"🔍 DEBUG: Timeslot == 'ALL DAY': {data['timeslot'] == 'ALL DAY'}")
-            
-            # Check if this is an ALL DAY booking (handle potential string concatenation issues)
-            is_all_day = data['timeslot'] == 'ALL DAY' or data['timeslot'].startswith('ALL DAY')
-            print(f"🔍 DEBUG: is_all_day: {is_all_day}")
-            
-            if is_all_day:
-                # For ALL DAY bookings, find ALL resident bookings on this date
-                print(f"🔍 DEBUG: ALL DAY query - facility_id: {data['facility_id']}, date: {data['date']}, user_id: {user_id}")
-                cursor.execute('''
-                    SELECT b.id, b.user_id, b.start_time, b.end_time, b.status, u.email as user_email, u.full_name
-                    FROM bookings b
-                    LEFT JOIN users u ON b.user_id = u.id
-                    WHERE b.facility_id = ? 
-                    AND b.booking_date = ? 
-                    AND (b.status = 'pending' OR b.status = 'approved')
-                    AND (u.role = 'resident' OR u.role = '0' OR u.role IS NULL OR u.role LIKE '0.%')
-                    AND b.user_id != ?
-                ''', (data['facility_id'], data['date'], user_id))
-            else:
-                # For specific time slots, find exact matches
-                cursor.execute('''
-                    SELECT b.id, b.user_id, b.start_time, b.end_time, b.status, u.email as user_email, u.full_name
-                    FROM bookings b
-                    LEFT JOIN users u ON b.user_id = u.id
-                    WHERE b.facility_id = ? 
-                    AND b.booking_date = ? 
-                    AND b.start_time = ?
-                    AND (b.status = 'pending' OR b.status = 'approved')
-                    AND (u.role = 'resident' OR u.role = '0' OR u.role IS NULL OR u.role LIKE '0.%')
-                    AND b.user_id != ?
-                ''', (data['facility_id'], data['date'], data['timeslot'], user_id))
-            
-            overlapping_bookings = cursor.fetchall()
-            print(f"🔍 DEBUG: Found {len(overlapping_bookings)} overlapping resident bookings")
-            
-            # Auto-reject overlapping resident bookings with apology message
-            apology_message = """Dear Resident,
+    user_id = user_result[0]
+    user_role = user_result[1]
+    is_banned = user_result[2]
+    ban_reason = user_result[3]
+    
+    # 🔒 BAN VALIDATION: Check if user is banned
+    if is_banned:
+        print(f"🚨 BANNED USER ATTEMPTED BOOKING: {data['user_email']} - Reason: {ban_reason}")
+        raise WriteRollback(({
+            'success': False, 
+            'message': 'Account is banned. Cannot create bookings.',
+            'error_type': 'user_banned',
+            'ban_reason': ban_reason or 'Account has been banned by administrator.'
+        }, 403))
+    
+    print(f"🔍 DEBUG: Found user_id: {user_id}, role: {user_role}, banned: {is_banned} for email: {data['user_email']}")
+    
+    # Check if this is an official booking
+    is_official_booking = user_role == 'official'
+    print(f"🔍 DEBUG: Is official booking: {is_official_booking}")
+    print(f"🔍 DEBUG: User role: {user_role}")
+    print(f"🔍 DEBUG: User email: {data['user_email']}")
+    print(f"🔍 DEBUG: Timeslot: {data['timeslot']}")
+    
+    # Check if USER already has this exact time slot (prevent duplicate user bookings)
+    cursor.execute('''
+        SELECT id, user_id, status FROM bookings 
+        WHERE facility_id = ? AND booking_date = ? AND start_time = ? AND user_id = ?
+    ''', (data['facility_id'], data['date'], data['timeslot'], user_id))
+    
+    user_existing_booking = cursor.fetchone()
+    
+    # If user already has this exact time slot, block it
+    if user_existing_booking:
+        raise WriteRollback(({
+            'success': False, 
+            'message': 'You already have a booking for this time slot. Please choose a different time.',
+            'error_type': 'duplicate_user_booking'
+        }, 409))
+    
+    # AUTO-REJECTION LOGIC FOR OFFICIAL BOOKINGS
+    rejected_resident_bookings = []
+    if is_official_booking:
+        print(f"🏆 OFFICIAL BOOKING DETECTED - Checking for resident bookings (pending + approved) for time slot {data['timeslot']}...")
+        print(f"🔍 DEBUG: Auto-rejection logic triggered for timeslot: {data['timeslot']}")
+        
+        # Find resident bookings (pending AND approved) that overlap with this time slot
+        print(f"🔍 DEBUG: Timeslot value: '{data['timeslot']}' (type: {type(data['timeslot'])})")
+        print(f"🔍 DEBUG: Timeslot == 'ALL DAY': {data['timeslot'] == 'ALL DAY'}")
+        
+        # Any active resident booking whose time range overlaps this one (ALL DAY overlaps the whole day)
+        times = time_model.booking_time_fields(data['date'], data['timeslot'])
+        overlapping_ids = booking_intervals.find_conflicts(
+            conn, data['facility_id'], times['day_key'], times['start_minute'], times['end_minute'])
+        print(f"🔍 DEBUG: Interval index found {len(overlapping_ids)} overlapping booking(s)")
+        
+        if times['start_minute'] is not None:
+            cursor.execute(f'''
+                SELECT b.id, b.user_id, b.start_time, b.end_time, b.status, u.email as user_email, u.full_name
+                FROM bookings b
+                LEFT JOIN users u ON b.user_id = u.id
+                WHERE b.id IN ({', '.join('?' * len(overlapping_ids))})
+                AND (u.role = 'resident' OR u.role = '0' OR u.role IS NULL OR u.role LIKE '0.%')
+                AND b.user_id != ?
+            ''', (*overlapping_ids, user_id))
+        else:
+            # Timeslot we can't parse: only an identical string counts as a clash
+            cursor.execute('''
+                SELECT b.id, b.user_id, b.start_time, b.end_time, b.status, u.email as user_email, u.full_name
+                FROM bookings b
+                LEFT JOIN users u ON b.user_id = u.id
+                WHERE b.facility_id = ? 
+                AND b.booking_date = ? 
+                AND b.start_time = ?
+                AND (b.status = 'pending' OR b.status = 'approved')
+                AND (u.role = 'resident' OR u.role = '0' OR u.role IS NULL OR u.role LIKE '0.%')
+                AND b.user_id != ?
+            ''', (data['facility_id'], data['date'], data['timeslot'], user_id))
+        
+        overlapping_bookings = cursor.fetchall()
+        print(f"🔍 DEBUG: Found {len(overlapping_bookings)} overlapping resident bookings")
+        
+        # Auto-reject overlapping resident bookings with apology message
+        apology_message = """Dear Resident,
 
 We apologize but your booking has been automatically cancelled due to an official Barangay Event.
 
@@ -667,110 +766,260 @@ Please check your SMS and Email for more Updates.
 Thank you for your understanding and cooperation.
 
 Barangay Management"""
+        
+        for booking in overlapping_bookings:
+            # Extract resident booking info
+            booking_id = booking[0]
+            resident_email = booking[5] if booking[5] else 'Unknown'
+            resident_name = booking[6] if booking[6] else 'Resident'
+            resident_timeslot = booking[2]  # Use just the start_time (already contains full timeslot)
+            resident_status = booking[4]  # Get original status (pending/approved)
             
-            for booking in overlapping_bookings:
-                # Extract resident booking info
-                booking_id = booking[0]
-                resident_email = booking[5] if booking[5] else 'Unknown'
-                resident_name = booking[6] if booking[6] else 'Resident'
-                resident_timeslot = booking[2]  # Use just the start_time (already contains full timeslot)
-                resident_status = booking[4]  # Get original status (pending/approved)
-                
-                print(f"🚫 AUTO-REJECTING {resident_status.upper()} booking {booking_id} for {resident_name} ({resident_email}) - Time: {resident_timeslot}")
-                
-                # Update resident booking to rejected with apology
-                cursor.execute('''
-                    UPDATE bookings 
-                    SET status = 'rejected', 
-                        rejection_reason = ?,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (apology_message, booking_id))
-                
-                rejected_resident_bookings.append({
-                    'booking_id': booking_id,
-                    'resident_name': resident_name,
-                    'resident_email': resident_email,
-                    'timeslot': resident_timeslot  # Use resident's actual time slot
-                })
+            print(f"🚫 AUTO-REJECTING {resident_status.upper()} booking {booking_id} for {resident_name} ({resident_email}) - Time: {resident_timeslot}")
             
-            if rejected_resident_bookings:
-                print(f"✅ Auto-rejected {len(rejected_resident_bookings)} resident bookings")
-        
-        # Check if user has too many pending bookings (optional limit)
-        cursor.execute('''
-            SELECT COUNT(*) FROM bookings 
-            WHERE user_id = ? AND status = 'pending'
-        ''', (user_id,))
-        
-        pending_count = cursor.fetchone()[0]
-        if pending_count >= 5:  # Limit to 5 pending bookings per user
-            return jsonify({
-                'success': False, 
-                'message': 'You have too many pending bookings. Please wait for approval or cancel some bookings.',
-                'error_type': 'too_many_pending'
-            }), 429
-        
-        # ALLOW multiple users to book same time slot (competitive booking)
-        # No need to check if other users have this slot - that's the point!
-        
-        # Create booking
-        booking_status = 'approved' if is_official_booking else data.get('status', 'pending')
-        print(f"🔍 DEBUG: Setting booking status to: {booking_status}")
-        
-        cursor.execute('''
-            INSERT INTO bookings (facility_id, user_id, booking_date, start_time, end_time, status, purpose, total_amount, contact_number, contact_address, booking_reference, time_slot_id, duration_hours, base_rate, downpayment_amount, receipt_base64)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            data['facility_id'],
-            user_id,
-            data['date'],
-            data['timeslot'],  # start_time
-            data['timeslot'],  # end_time (same as start for all-day)
-            booking_status,
-            data.get('purpose', ''),
-            data.get('total_amount', 0),
-            data.get('contact_number', ''),
-            data.get('address', ''),
-            f'BR{datetime.now().strftime("%Y%m%d%H%M%S")}{user_id}',  # Generate booking reference
-            0,  # Default time_slot_id for all-day bookings
-            24.0,  # Duration hours for all-day booking
-            0.0,  # Base rate (free for officials)
-            0.0,   # Downpayment amount (free for officials)
-            data.get('receipt_base64', None)  # Add receipt_base64 field
-        ))
-        
-        booking_id = cursor.lastrowid
-        conn.commit()
-        
-        # Debug: Check if receipt was saved
-        if data.get('receipt_base64'):
-            print(f"✅ RECEIPT SAVED: receipt_base64 length = {len(str(data['receipt_base64']))} for booking {booking_id}")
-        else:
-            print(f"⚠️ NO RECEIPT: receipt_base64 is null for booking {booking_id}")
-        
-        # Prepare response message
-        response_message = 'Booking submitted successfully!' if not is_official_booking else 'Official booking created successfully!'
-        
-        if is_official_booking and rejected_resident_bookings:
-            response_message += f' Auto-rejected {len(rejected_resident_bookings)} resident booking(s).'
-        
-        return jsonify({
-            'success': True, 
-            'message': response_message,
-            'booking_id': booking_id,
-            'status': booking_status,
-            'rejected_resident_bookings': rejected_resident_bookings,
-            'note': 'Multiple users may book the same time slot. First approved booking wins!' if not is_official_booking else 'Official bookings take priority over resident bookings.'
-        })
+            # Update resident booking to rejected with apology
+            cursor.execute('''
+                UPDATE bookings 
+                SET status = 'rejected', 
+                    rejection_reason = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (apology_message, booking_id))
+            
+            rejected_resident_bookings.append({
+                'booking_id': booking_id,
+                'resident_name': resident_name,
+                'resident_email': resident_email,
+                'timeslot': resident_timeslot  # Use resident's actual time slot
+            })
         
+        if rejected_resident_bookings:
+            print(f"✅ Auto-rejected {len(rejected_resident_bookings)} resident bookings")
+    
+    # Check if user has too many pending bookings (optional limit)
+    cursor.execute('''
+        SELECT COUNT(*) FROM bookings 
+        WHERE user_id = ? AND status = 'pending'
+    ''', (user_id,))
+    
+    pending_count = cursor.fetchone()[0]
+    if pending_count >= 5:  # Limit to 5 pending bookings per user
+        raise WriteRollback(({
+            'success': False, 
+            'message': 'You have too many pending bookings. Please wait for approval or cancel some bookings.',
+            'error_type': 'too_many_pending'
+        }, 429))
+    
+    # ALLOW multiple users to book same time slot (competitive booking)
+    # No need to check if other users have this slot - that's the point!
+    
+    # Create booking
+    booking_status = 'approved' if is_official_booking else data.get('status', 'pending')
+    print(f"🔍 DEBUG: Setting booking status to: {booking_status}")
+    
+    # Receipt bytes go to the blob store; the row only keeps the hash
+    if data.get('receipt_hash'):
+        receipt_blob = data['receipt_hash']
+        if not get_blob_store().attach(conn, receipt_blob):
+            raise WriteRollback(({'success': False, 'message': 'Unknown receipt_hash, upload the receipt first'}, 400))
+    else:
+        receipt_blob = get_blob_store().store_document(conn, data.get('receipt_base64'))
+    
+    # Same receipt bytes already attached to another booking? One indexed lookup in receipt_hashes
+    duplicate_of = receipt_checks.duplicate_bookings(conn, receipt_blob)
+    if duplicate_of:
+        print(f"🚨 DUPLICATE RECEIPT: {data['user_email']} reused the receipt of booking(s) {duplicate_of}")
+    
+    # Integer copies of the date/timeslot for range queries; the strings stay what the app displays
+    times = time_model.booking_time_fields(data['date'], data['timeslot'])
+    time_slot_id = 0  # ALL DAY and custom ranges have no time_slots row
+    if times['start_minute'] is not None:
+        time_slot_id = time_model.resolve_time_slot_id(conn, data['facility_id'], times['start_minute'], times['end_minute'])
+    
+    cursor.execute('''
+        INSERT INTO bookings (facility_id, user_id, booking_date, start_time, end_time, status, purpose, total_amount, contact_number, contact_address, booking_reference, time_slot_id, duration_hours, base_rate, downpayment_amount, receipt_base64, receipt_blob, day_key, start_minute, end_minute)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        data['facility_id'],
+        user_id,
+        data['date'],
+        data['timeslot'],  # start_time
+        data['timeslot'],  # end_time (same as start for all-day)
+        booking_status,
+        data.get('purpose', ''),
+        data.get('total_amount', 0),
+        data.get('contact_number', ''),
+        data.get('address', ''),
+        f'BR{datetime.now().strftime("%Y%m%d%H%M%S")}{user_id}',  # Generate booking reference
+        time_slot_id,
+        24.0,  # Duration hours for all-day booking
+        0.0,  # Base rate (free for officials)
+        0.0,   # Downpayment amount (free for officials)
+        None if receipt_blob else data.get('receipt_base64', None),  # Only non-base64 values stay inline
+        receipt_blob,
+        times['day_key'],
+        times['start_minute'],
+        times['end_minute']
+    ))
+    
+    booking_id = cursor.lastrowid
+    slot_occupancy.refresh(conn, data['facility_id'], times['day_key'])
+    
+    # Debug: Check if receipt was saved
+    if receipt_blob:
+        print(f"✅ RECEIPT SAVED: blob {receipt_blob[:12]} for booking {booking_id}")
+    elif data.get('receipt_base64'):
+        print(f"✅ RECEIPT SAVED: inline receipt for booking {booking_id}")
+    else:
+        print(f"⚠️ NO RECEIPT: receipt_base64 is null for booking {booking_id}")
+    
+    # Prepare response message
+    response_message = 'Booking submitted successfully!' if not is_official_booking else 'Official booking created successfully!'
+    
+    if is_official_booking and rejected_resident_bookings:
+        response_message += f' Auto-rejected {len(rejected_resident_bookings)} resident booking(s).'
+    
+    return {
+        'success': True, 
+        'message': response_message,
+        'booking_id': booking_id,
+        'receipt_hash': receipt_blob,
+        'duplicate_receipt': bool(duplicate_of),
+        'status': booking_status,
+        'rejected_resident_bookings': rejected_resident_bookings,
+        'note': 'Multiple users may book the same time slot. First approved booking wins!' if not is_official_booking else 'Official bookings take priority over resident bookings.'
+    }, 200
+
+@app.route('/api/bookings', methods=['POST'])
+def create_booking():
+    if request.mimetype == 'multipart/form-data':
+        # Booking fields as form data plus the receipt file, streamed straight to the blob store
+        data = request.form.to_dict()
+        if request.files:
+            info, error = _stream_receipt_upload()
+            if error:
+                return error
+            data['receipt_hash'] = info['receipt_hash']
+    else:
+        data = request.json  # Older clients send the receipt inline as receipt_base64
+    print(f"🔍 DEBUG: create_booking called for {data.get('user_email')} "
+          f"(facility {data.get('facility_id')}, {data.get('date')} {data.get('timeslot')}, "
+          f"receipt: {'hash' if data.get('receipt_hash') else 'base64' if data.get('receipt_base64') else 'none'})")
+    
+    # Validate required fields
+    required_fields = ['facility_id', 'user_email', 'date', 'timeslot']
+    for field in required_fields:
+        if field not in data:
+            return jsonify({'success': False, 'message': f'Missing required field: {field}'}), 400
+    
+    try:
+        result, status_code = run_write(_create_booking_tx, data)
+        if status_code == 409:
+            result['suggestions'] = _conflict_suggestions(data)
+        if result.get('receipt_hash'):
+            derivatives.schedule(result['receipt_hash'])  # Thumbnail ready before officials open the queue
+            receipt_similarity.schedule(result['booking_id'], result['receipt_hash'])
+        return jsonify(result), status_code
     except Exception as e:
-        conn.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        conn.close()
+
+def _conflict_suggestions(data):
+    """Next free slots of the same length to offer with a 409 (never fails the response)"""
+    try:
+        minutes = time_model.parse_timeslot(data['timeslot'])
+        duration = minutes[1] - minutes[0] if minutes and minutes[1] - minutes[0] < time_model.MINUTES_PER_DAY else None
+        with db_manager.read_connection() as conn:
+            return _next_available(conn, int(data['facility_id']), data['date'], duration, CONFLICT_SUGGESTIONS)
+    except Exception as e:
+        print(f"⚠️  Could not compute booking suggestions: {e}")
+        return []
+
+@app.route('/api/bookings/<int:booking_id>/receipt', methods=['GET'])
+def get_booking_receipt(booking_id):
+    """Download a booking's receipt (same privacy rules as GET /api/bookings)"""
+    user_email = request.args.get('user_email')
+    user_role = request.args.get('user_role', 'resident')
+    exclude_user_role = request.args.get('excludeUserRole', '').lower() == 'true'
+    variant = request.args.get('variant')  # thumb / preview, full image when omitted
+    if variant and variant not in VARIANTS:
+        return jsonify({'success': False, 'message': f'Unknown variant: {variant}'}), 400
+    
+    with db_manager.read_connection() as conn:
+        booking = conn.execute('''
+            SELECT b.receipt_blob, b.receipt_base64, bl.mime_type, u.email as user_email
+            FROM bookings b
+            LEFT JOIN blobs bl ON bl.hash = b.receipt_blob
+            LEFT JOIN users u ON b.user_id = u.id
+            WHERE b.id = ?
+        ''', (booking_id,)).fetchone()
+        derived_hash = _lookup_variant(conn, booking['receipt_blob'], booking['mime_type'], variant) if booking else None
+    
+    if not booking:
+        return jsonify({'success': False, 'message': 'Booking not found'}), 404
+    
+    if not exclude_user_role and user_role != 'official':
+        owner_email = (booking['user_email'] or '').lower().strip()
+        if not user_email or owner_email != user_email.lower().strip():
+            return jsonify({'success': False, 'message': 'Not allowed to view this receipt'}), 403
+    
+    return _send_document(booking['receipt_blob'], booking['receipt_base64'], booking['mime_type'],
+                          f'receipt-{booking_id}', derived_hash)
+
+@app.route('/api/bookings/<int:booking_id>/similar-receipts', methods=['GET'])
+def get_similar_receipts(booking_id):
+    """Nearest earlier receipts by perceptual hash, for officials reviewing a booking"""
+    try:
+        k = min(int(request.args.get('k', 5)), 50)
+        max_distance = int(request.args.get('max_distance', Config.RECEIPT_SIMILARITY_THRESHOLD))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'k and max_distance must be integers'}), 400
+    
+    # Matches name other residents, so only officials may compare receipts (same gate as /receipt)
+    user_role = request.args.get('user_role', 'resident')
+    exclude_user_role = request.args.get('excludeUserRole', '').lower() == 'true'
+    if not exclude_user_role and user_role != 'official':
+        return jsonify({'success': False, 'message': 'Only officials can compare receipts'}), 403
+    
+    with db_manager.read_connection() as conn:
+        # Every match within max_distance, so bookings deleted since indexing can't shrink the page below k
+        matches = receipt_similarity.similar(conn, booking_id, k=None, max_distance=max_distance)
+        if matches is None:
+            return jsonify({
+                'success': True,
+                'indexed': False,
+                'message': 'Receipt not indexed (no image receipt, or hashing still in progress)',
+                'data': []
+            })
+        
+        similar = []
+        for distance, other_id in matches:
+            if len(similar) == k:
+                break
+            other = conn.execute('''
+                SELECT b.id, b.user_id, b.booking_date, b.start_time, b.status, b.rejection_type, b.receipt_blob,
+                       u.email as user_email, u.full_name
+                FROM bookings b
+                LEFT JOIN users u ON b.user_id = u.id
+                WHERE b.id = ?
+            ''', (other_id,)).fetchone()
+            if other is None:
+                continue  # Booking deleted since it was indexed
+            other = dict(other)
+            receipt_blob = other.pop('receipt_blob')
+            other['distance'] = distance
+            other['receipt_url'] = _document_url(f'/api/bookings/{other_id}/receipt', receipt_blob)
+            other['receipt_thumbnail_url'] = _document_url(f'/api/bookings/{other_id}/receipt', receipt_blob, 'thumb')
+            similar.append(other)
+    
+    return jsonify({
+        'success': True,
+        'indexed': True,
+        'max_distance': max_distance,
+        'data': similar
+    })
 
 @app.route('/api/available-timeslots', methods=['GET'])
+@conditional_get.depends_on('bookings', 'time_slots')
 def get_available_timeslots():
     """Get available time slots for a specific facility and date (competitive booking)"""
     facility_id = request.args.get('facility_id')
@@ -782,75 +1031,26 @@ def get_available_timeslots():
     if not facility_id or not date:
         return jsonify({'success': False, 'message': 'facility_id and date are required'}), 400
     
-    conn = get_db()
+    day_key = time_model.day_key(date)
+    if day_key is None:
+        return jsonify({'success': False, 'message': 'date must be YYYY-MM-DD'}), 400
     
     try:
-        # Get all time slots from database for this facility
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT start_time, end_time FROM time_slots 
-            WHERE facility_id = ? 
-            ORDER BY sort_order
-        ''', (facility_id,))
-        
-        time_slots_db = cursor.fetchall()
-        
-        # Convert to format expected by frontend
-        all_timeslots = []
-        for start_time, end_time in time_slots_db:
-            # Just use the format "6:00 AM - 8:00 AM" as is
-            timeslot_str = f"{start_time} - {end_time}"
-            all_timeslots.append(timeslot_str)
-        
-        print(f"🔍 DEBUG: Found {len(all_timeslots)} time slots for facility {facility_id}")
-        
-        # Get all bookings for this facility and date (excluding rejected)
-        cursor.execute('''
-            SELECT start_time, user_id, status FROM bookings 
-            WHERE facility_id = ? AND booking_date = ? AND status != 'rejected'
-        ''', (facility_id, date))
-        
-        all_bookings = cursor.fetchall()
-        print(f"🔍 DEBUG: Found {len(all_bookings)} bookings for this facility/date")
-        for booking in all_bookings:
-            print(f"🔍 DEBUG: Booking - timeslot: {booking[0]}, user: {booking[1]}, status: {booking[2]}")
-        
-        # Categorize time slots for competitive booking
-        available_slots = []
-        user_booked_slots = []
-        competitive_slots = []  # Slots with multiple bookings
+        # Slot states come from the materialized slot_occupancy row, not from scanning bookings
+        with db_manager.read_connection() as conn:
+            slots = time_model.facility_slots(conn, facility_id)
+            # A missing row is computed here, not stored: booking writes rebuild it
+            states = slot_occupancy.current(conn, facility_id, day_key, slots)
+        
+        # Convert to format expected by frontend ("6:00 AM - 8:00 AM")
+        all_timeslots = [label for _, _, _, label in slots]
+        
+        # Time slots are locked when any booking that isn't rejected overlaps them
+        available_slots = [label for label, state in zip(all_timeslots, states) if state == slot_occupancy.FREE]
+        user_booked_slots = [label for label, state in zip(all_timeslots, states) if state != slot_occupancy.FREE]
+        competitive_slots = []  # Slots with multiple bookings (locked instead since first-come booking)
         approved_slots = []      # Slots that are already taken (approved)
         
-        for timeslot in all_timeslots:
-            bookings_for_slot = [b for b in all_bookings if b[0] == timeslot]
-            
-            if not bookings_for_slot:
-                # No bookings for this slot
-                available_slots.append(timeslot)
-                print(f"🔍 DEBUG: {timeslot} -> available (no bookings)")
-            else:
-                # NEW LOGIC: Check if ANY resident has booking (pending or approved)
-                has_any_booking = any(b[2] in ['approved', 'pending'] for b in bookings_for_slot)
-                
-                if has_any_booking:
-                    # Lock timeslot if any resident has booking (prevents competitive booking)
-                    user_booked_slots.append(timeslot)
-                    print(f"🔍 DEBUG: {timeslot} -> locked (resident has booking)")
-                elif len(bookings_for_slot) > 1:
-                    # Multiple pending bookings - competitive!
-                    competitive_slots.append(timeslot)
-                    print(f"🔍 DEBUG: {timeslot} -> competitive (multiple pending)")
-                else:
-                    # Single booking - put in user_booked_slots regardless of user (prevents competitive booking)
-                    user_booked_slots.append(timeslot)
-                    print(f"🔍 DEBUG: {timeslot} -> user booked (any resident)")
-                    
-                    # Optional: Still track if it's current user for UI purposes
-                    if user_email and bookings_for_slot[0][1] == user_email:
-                        print(f"🔍 DEBUG: {timeslot} -> current user's booking")
-                    else:
-                        print(f"🔍 DEBUG: {timeslot} -> other resident's booking")
-        
         print(f"🔍 DEBUG: Final counts - available: {len(available_slots)}, user_booked: {len(user_booked_slots)}, competitive: {len(competitive_slots)}, approved: {len(approved_slots)}")
         
         return jsonify({
@@ -860,24 +1060,157 @@ def get_available_timeslots():
             'user_booked_timeslots': user_booked_slots,
             'competitive_timeslots': competitive_slots,  # Slots with any resident booking
             'approved_timeslots': approved_slots,        # Already taken slots
+            'slot_states': [slot_occupancy.STATE_NAMES[state] for state in states],  # Same order as default_timeslots
             'total_available': len(available_slots),
             'competitive_count': len(competitive_slots),
             'date': date,
             'facility_id': facility_id,
             'note': 'Time slots are locked when any resident has a booking. First resident to book gets the slot!'
         })
-        
+    
     except Exception as e:
         print(f"❌ Error in get_available_timeslots: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        conn.close()
+
+@app.route('/api/available-timeslots/range', methods=['GET'])
+def get_available_timeslots_range():
+    """Per-day availability summary for calendar month views (one request instead of one per day)"""
+    facility_id = request.args.get('facility_id')
+    first_day = time_model.day_key(request.args.get('from'))
+    last_day = time_model.day_key(request.args.get('to'))
+    
+    if not facility_id or first_day is None or last_day is None:
+        return jsonify({'success': False, 'message': 'facility_id, from and to (YYYY-MM-DD) are required'}), 400
+    if last_day < first_day:
+        return jsonify({'success': False, 'message': 'to must not be before from'}), 400
+    if last_day - first_day + 1 > Config.AVAILABILITY_RANGE_MAX_DAYS:
+        return jsonify({'success': False, 'message': f'Range is limited to {Config.AVAILABILITY_RANGE_MAX_DAYS} days'}), 400
+    
+    try:
+        with db_manager.read_connection() as conn:
+            slots = time_model.facility_slots(conn, facility_id)
+            # Stored rows, plus missing days computed from one bookings query (nothing written)
+            by_day = slot_occupancy.states_between(conn, facility_id, slots, first_day, last_day)
+        
+        days = []
+        for day in range(first_day, last_day + 1):
+            states = by_day[day]
+            days.append({
+                'date': time_model.day_from_key(day),
+                'status': slot_occupancy.summarize(states),
+                'free_count': states.count(slot_occupancy.FREE),
+                'states': ''.join(map(str, states)),  # One digit per default_timeslots entry
+            })
+        
+        return jsonify({
+            'success': True,
+            'facility_id': facility_id,
+            'from': time_model.day_from_key(first_day),
+            'to': time_model.day_from_key(last_day),
+            'default_timeslots': [label for _, _, _, label in slots],
+            'state_names': list(slot_occupancy.STATE_NAMES),  # Digit -> name
+            'days': days
+        })
+    
+    except Exception as e:
+        print(f"❌ Error in get_available_timeslots_range: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/availability/grid', methods=['GET'])
+def get_availability_grid():
+    """Facilities x slots occupancy for a date (or a few days) for the official dashboard"""
+    first_day = time_model.day_key(request.args.get('date') or request.args.get('from'))
+    last_day = time_model.day_key(request.args.get('to')) if request.args.get('to') else first_day
+    facility_filter = request.args.get('facility_ids')  # Optional: "1,2,3"
+    
+    if first_day is None or last_day is None:
+        return jsonify({'success': False, 'message': 'date (or from/to) must be YYYY-MM-DD'}), 400
+    if last_day < first_day:
+        return jsonify({'success': False, 'message': 'to must not be before from'}), 400
+    if last_day - first_day + 1 > Config.AVAILABILITY_GRID_MAX_DAYS:
+        return jsonify({'success': False, 'message': f'Grid is limited to {Config.AVAILABILITY_GRID_MAX_DAYS} days'}), 400
+    try:
+        facility_ids = [int(f) for f in facility_filter.split(',') if f.strip()] if facility_filter else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'facility_ids must be comma separated ids'}), 400
+    
+    try:
+        with db_manager.read_connection() as conn:
+            if facility_ids is None:
+                facilities = conn.execute('SELECT id, name FROM facilities ORDER BY id').fetchall()
+            else:
+                facilities = conn.execute(f'''
+                    SELECT id, name FROM facilities WHERE id IN ({', '.join('?' * len(facility_ids))}) ORDER BY id
+                ''', facility_ids).fetchall() if facility_ids else []
+            slots = time_model.slots_by_facility(conn, [facility[0] for facility in facilities])
+            cells = slot_occupancy.grid_states(conn, slots, first_day, last_day)
+        
+        return jsonify({
+            'success': True,
+            'from': time_model.day_from_key(first_day),
+            'to': time_model.day_from_key(last_day),
+            'state_names': list(slot_occupancy.STATE_NAMES),  # Code -> name
+            'facilities': [
+                {'id': facility_id, 'name': name, 'timeslots': [label for _, _, _, label in slots[facility_id]]}
+                for facility_id, name in facilities
+            ],
+            # days[i].states[j][k]: state code of facilities[j].timeslots[k]
+            'days': [
+                {'date': time_model.day_from_key(day),
+                 'states': [cells[(facility_id, day)] for facility_id, _ in facilities]}
+                for day in range(first_day, last_day + 1)
+            ]
+        })
+    
+    except Exception as e:
+        print(f"❌ Error in get_availability_grid: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+NEXT_AVAILABLE_MAX_RESULTS = 20
+CONFLICT_SUGGESTIONS = 3
+
+def _next_available(conn, facility_id=None, after=None, duration=None, limit=5):
+    """Earliest free slots from `after` (default today) within each facility's booking window"""
+    now = datetime.now()
+    today = time_model.day_key(now.date().isoformat())
+    first_day = max(time_model.day_key(after) if after else today, today)
+    if facility_id is None:
+        facilities = conn.execute('SELECT id, booking_window_days FROM facilities ORDER BY id').fetchall()
+    else:
+        facilities = conn.execute('SELECT id, booking_window_days FROM facilities WHERE id = ?', (facility_id,)).fetchall()
+    windows = {row[0]: today + (row[1] or 30) for row in facilities}
+    not_before = now.hour * 60 + now.minute if first_day == today else None
+    return slot_occupancy.next_available(conn, windows, first_day, duration, limit, not_before)
+
+@app.route('/api/availability/next', methods=['GET'])
+def get_next_available():
+    """Earliest free slots for one facility (or all of them), so residents don't click through dates"""
+    facility_id = request.args.get('facility_id')
+    after = request.args.get('after')  # YYYY-MM-DD, defaults to today
+    try:
+        duration = int(request.args['duration']) if request.args.get('duration') else None  # Minutes
+        limit = min(int(request.args.get('limit', 5)), NEXT_AVAILABLE_MAX_RESULTS)
+        facility_id = int(facility_id) if facility_id else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'facility_id, duration and limit must be integers'}), 400
+    if after and time_model.day_key(after) is None:
+        return jsonify({'success': False, 'message': 'after must be YYYY-MM-DD'}), 400
+    
+    try:
+        with db_manager.read_connection() as conn:
+            suggestions = _next_available(conn, facility_id, after, duration, limit)
+        return jsonify({'success': True, 'data': suggestions})
+    except Exception as e:
+        print(f"❌ Error in get_next_available: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/auth/logout', methods=['POST'])
 def logout():
     try:
-        # In a real app, you would invalidate the session/token here
-        # For now, just return success
+        token = _bearer_token()
+        if token:
+            with db_manager.write_connection() as conn:
+                conn.execute('UPDATE user_sessions SET is_active = FALSE WHERE session_token = ?', (token,))
         return jsonify({
             'success': True,
             'message': 'Logged out successfully'
@@ -943,12 +1276,11 @@ def login():
             password_hash = hashlib.sha256(data['password'].encode()).hexdigest()
             
             if user_dict['password'] == password_hash:
-                # Generate a simple session token (in production, use JWT)
-                import uuid
-                session_token = str(uuid.uuid4())
-                
                 conn.close()
                 
+                # The token is stored so that official-only routes can check it
+                session_token = db_manager.run_write(_create_session, user_dict['id'])
+                
                 return jsonify({
                     'success': True,
                     'user': {
@@ -988,75 +1320,70 @@ def login():
 
 @app.route('/api/auth/register', methods=['POST'])
 def register():
-    data = request.json
-    
-    # DEBUG: Log incoming registration data
-    print(f"🔍 DEBUG: Registration data received: {data}")
-    print(f"🔍 DEBUG: Name field: '{data.get('name')}'")
-    print(f"🔍 DEBUG: Email field: '{data.get('email')}'")
-    print(f"🔍 DEBUG: Contact field: '{data.get('contact_number')}'")
-    print(f"🔍 DEBUG: Address field: '{data.get('address')}'")
-    
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    try:
-        # NEW: Check if email is banned before allowing registration
-        # Skip ban check since columns don't exist yet
-        # cursor.execute('SELECT is_banned, ban_reason FROM users WHERE email = ?', (data['email'],))
-        # banned_user = cursor.fetchone()
-        # 
-        # if banned_user and banned_user[0]:  # is_banned is True
-        #     conn.close()
-        #     return jsonify({
-        #         'success': False,
-        #         'message': 'This email has been banned permanently'
-        #     }), 403
-        
-        # Check if user already exists
-        cursor.execute('SELECT id FROM users WHERE email = ?', (data['email'],))
-        existing_user = cursor.fetchone()
-        
-        if existing_user:
-            conn.close()
-            return jsonify({
-                'success': False,
-                'message': 'User with this email already exists'
-            }), 400
-        
-        # Hash the password
-        import hashlib
-        password_hash = hashlib.sha256(data['password'].encode()).hexdigest()
-        
-        # DEBUG: Log what will be inserted
-        print(f"🔍 DEBUG: About to insert into database:")
-        print(f"🔍 DEBUG: Email: '{data['email']}'")
-        print(f"🔍 DEBUG: Name: '{data['name']}'")
-        print(f"🔍 DEBUG: Role: '{data['role']}'")
-        print(f"🔍 DEBUG: Contact: '{data.get('contact_number')}'")
-        print(f"🔍 DEBUG: Address: '{data.get('address')}'")
-        
-        cursor.execute('''
-            INSERT INTO users (email, password, full_name, role, contact_number, address)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (data['email'], password_hash, data['name'], data['role'], 
-              data.get('contact_number'), data.get('address')))
-        
-        print("🔍 DEBUG: Database insertion completed")
-        
-        # Get the newly created user
-        cursor.execute('SELECT * FROM users WHERE email = ?', (data['email'],))
-        user = cursor.fetchone()
-        
-        print(f"🔍 DEBUG: Retrieved user from database: {user}")
-        print(f"🔍 DEBUG: Full name from database: '{user[3] if user else 'Not found'}'")
-        
-        conn.commit()
-        conn.close()
-        
-        # Generate session token for automatic login after registration
-        import uuid
-        session_token = str(uuid.uuid4())
+    data = request.json
+    
+    # DEBUG: Log incoming registration data
+    print(f"🔍 DEBUG: Registration data received: {data}")
+    print(f"🔍 DEBUG: Name field: '{data.get('name')}'")
+    print(f"🔍 DEBUG: Email field: '{data.get('email')}'")
+    print(f"🔍 DEBUG: Contact field: '{data.get('contact_number')}'")
+    print(f"🔍 DEBUG: Address field: '{data.get('address')}'")
+    
+    try:
+        with db_manager.write_connection() as conn:
+            cursor = conn.cursor()
+            
+            # NEW: Check if email is banned before allowing registration
+            # Skip ban check since columns don't exist yet
+            # cursor.execute('SELECT is_banned, ban_reason FROM users WHERE email = ?', (data['email'],))
+            # banned_user = cursor.fetchone()
+            # 
+            # if banned_user and banned_user[0]:  # is_banned is True
+            #     conn.close()
+            #     return jsonify({
+            #         'success': False,
+            #         'message': 'This email has been banned permanently'
+            #     }), 403
+            
+            # Check if user already exists
+            cursor.execute('SELECT id FROM users WHERE email = ?', (data['email'],))
+            existing_user = cursor.fetchone()
+            
+            if existing_user:
+                return jsonify({
+                    'success': False,
+                    'message': 'User with this email already exists'
+                }), 400
+            
+            # Hash the password
+            import hashlib
+            password_hash = hashlib.sha256(data['password'].encode()).hexdigest()
+            
+            # DEBUG: Log what will be inserted
+            print(f"🔍 DEBUG: About to insert into database:")
+            print(f"🔍 DEBUG: Email: '{data['email']}'")
+            print(f"🔍 DEBUG: Name: '{data['name']}'")
+            print(f"🔍 DEBUG: Role: '{data['role']}'")
+            print(f"🔍 DEBUG: Contact: '{data.get('contact_number')}'")
+            print(f"🔍 DEBUG: Address: '{data.get('address')}'")
+            
+            cursor.execute('''
+                INSERT INTO users (email, password, full_name, role, contact_number, address)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (data['email'], password_hash, data['name'], data['role'], 
+                  data.get('contact_number'), data.get('address')))
+            
+            print("🔍 DEBUG: Database insertion completed")
+            
+            # Get the newly created user
+            cursor.execute('SELECT * FROM users WHERE email = ?', (data['email'],))
+            user = cursor.fetchone()
+            
+            print(f"🔍 DEBUG: Retrieved user from database: {user}")
+            print(f"🔍 DEBUG: Full name from database: '{user[3] if user else 'Not found'}'")
+            
+            # Session token for automatic login after registration, in the same transaction
+            session_token = _create_session(conn, user[0])
         
         return jsonify({
             'success': True, 
@@ -1076,85 +1403,80 @@ def register():
                 'is_authenticated': True  # CRITICAL: Mark as authenticated
             }
         })
+    except sqlite3.IntegrityError:
+        return jsonify({
+            'success': False,
+            'message': 'Email already exists'
+        }), 400
     except Exception as e:
         print(f"❌ Registration error: {e}")
-        conn.close()
         return jsonify({
             'success': False,
             'message': f'Registration failed: {str(e)}'
         }), 500
-    except sqlite3.IntegrityError:
-        conn.close()
-        return jsonify({
-            'success': False,
-            'message': 'Email already exists'
-        }), 400
 
 # Add sample data
 @app.route('/api/setup-sample-data', methods=['POST'])
 def setup_sample_data():
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Add sample facilities
-    facilities = [
-        ('Community Hall', 'Spacious hall for events and meetings', 1000.0, '', 0.5, 100, 'Tables, chairs, sound system', '8:00 AM - 10:00 PM'),
-        ('Basketball Court', 'Full-size basketball court with lighting', 500.0, '', 0.3, 50, 'Basketball hoops, lighting, scoreboard', '6:00 AM - 10:00 PM'),
-        ('Swimming Pool', 'Olympic-size swimming pool with facilities', 1500.0, '', 0.4, 200, 'Showers, lockers, lifeguard on duty', '6:00 AM - 9:00 PM'),
-        ('Shooting Range', 'Indoor shooting range with safety equipment', 2000.0, '', 0.5, 30, 'Safety gear, targets, instructor available', '8:00 AM - 6:00 PM')
-    ]
-    
-    cursor.executemany('''
-        INSERT OR IGNORE INTO facilities (name, description, hourly_rate, main_photo_url, downpayment_rate, max_capacity, amenities, operating_hours)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', facilities)
-    
-    # Add sample users
-    import hashlib
-    users = [
-        ('resident@barangay.com', hashlib.sha256('password123'.encode()).hexdigest(), 'Juan Dela Cruz', 'resident'),
-        ('official@barangay.com', hashlib.sha256('password123'.encode()).hexdigest(), 'Maria Santos', 'official')
-    ]
-    
-    cursor.executemany('''
-        INSERT OR IGNORE INTO users (email, password, full_name, role)
-        VALUES (?, ?, ?, ?)
-    ''', users)
-    
-    # Add time slots for each facility
-    time_slots = []
-    
-    # Community Hall (Facility ID 1)
-    for hour in range(8, 22):  # 8 AM to 9 PM
-        start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
-        end_time = f"{(hour + 1) % 12 or 12}:00 {'AM' if hour + 1 < 12 else 'PM'}"
-        time_slots.append((1, start_time, end_time))
-    
-    # Basketball Court (Facility ID 2)
-    for hour in range(6, 22):  # 6 AM to 9 PM
-        start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
-        end_time = f"{(hour + 1) % 12 or 12}:00 {'AM' if hour + 1 < 12 else 'PM'}"
-        time_slots.append((2, start_time, end_time))
-    
-    # Swimming Pool (Facility ID 3)
-    for hour in range(6, 21):  # 6 AM to 8 PM
-        start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
-        end_time = f"{(hour + 1) % 12 or 12}:00 {'AM' if hour + 1 < 12 else 'PM'}"
-        time_slots.append((3, start_time, end_time))
-    
-    # Shooting Range (Facility ID 4)
-    for hour in range(8, 18):  # 8 AM to 5 PM
-        start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
-        end_time = f"{(hour + 1) % 12 or 12}:00 {'AM' if hour + 1 < 12 else 'PM'}"
-        time_slots.append((4, start_time, end_time))
-    
-    cursor.executemany('''
-        INSERT OR IGNORE INTO time_slots (facility_id, start_time, end_time)
-        VALUES (?, ?, ?)
-    ''', time_slots)
-    
-    conn.commit()
-    conn.close()
+    with db_manager.write_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Add sample facilities
+        facilities = [
+            ('Community Hall', 'Spacious hall for events and meetings', 1000.0, '', 0.5, 100, 'Tables, chairs, sound system', '8:00 AM - 10:00 PM'),
+            ('Basketball Court', 'Full-size basketball court with lighting', 500.0, '', 0.3, 50, 'Basketball hoops, lighting, scoreboard', '6:00 AM - 10:00 PM'),
+            ('Swimming Pool', 'Olympic-size swimming pool with facilities', 1500.0, '', 0.4, 200, 'Showers, lockers, lifeguard on duty', '6:00 AM - 9:00 PM'),
+            ('Shooting Range', 'Indoor shooting range with safety equipment', 2000.0, '', 0.5, 30, 'Safety gear, targets, instructor available', '8:00 AM - 6:00 PM')
+        ]
+        
+        cursor.executemany('''
+            INSERT OR IGNORE INTO facilities (name, description, hourly_rate, main_photo_url, downpayment_rate, max_capacity, amenities, operating_hours)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', facilities)
+        
+        # Add sample users
+        import hashlib
+        users = [
+            ('resident@barangay.com', hashlib.sha256('password123'.encode()).hexdigest(), 'Juan Dela Cruz', 'resident'),
+            ('official@barangay.com', hashlib.sha256('password123'.encode()).hexdigest(), 'Maria Santos', 'official')
+        ]
+        
+        cursor.executemany('''
+            INSERT OR IGNORE INTO users (email, password, full_name, role)
+            VALUES (?, ?, ?, ?)
+        ''', users)
+        
+        # Add time slots for each facility
+        time_slots = []
+        
+        # Community Hall (Facility ID 1)
+        for hour in range(8, 22):  # 8 AM to 9 PM
+            start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
+            end_time = f"{(hour + 1) % 12 or 12}:00 {'AM' if hour + 1 < 12 else 'PM'}"
+            time_slots.append((1, start_time, end_time))
+        
+        # Basketball Court (Facility ID 2)
+        for hour in range(6, 22):  # 6 AM to 9 PM
+            start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
+            end_time = f"{(hour + 1) % 12 or 12}:00 {'AM' if hour + 1 < 12 else 'PM'}"
+            time_slots.append((2, start_time, end_time))
+        
+        # Swimming Pool (Facility ID 3)
+        for hour in range(6, 21):  # 6 AM to 8 PM
+            start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
+            end_time = f"{(hour + 1) % 12 or 12}:00 {'AM' if hour + 1 < 12 else 'PM'}"
+            time_slots.append((3, start_time, end_time))
+        
+        # Shooting Range (Facility ID 4)
+        for hour in range(8, 18):  # 8 AM to 5 PM
+            start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
+            end_time = f"{(hour + 1) % 12 or 12}:00 {'AM' if hour + 1 < 12 else 'PM'}"
+            time_slots.append((4, start_time, end_time))
+        
+        cursor.executemany('''
+            INSERT OR IGNORE INTO time_slots (facility_id, start_time, end_time)
+            VALUES (?, ?, ?)
+        ''', time_slots)
     
     return jsonify({'success': True, 'message': 'Sample data added'})
 
@@ -1168,65 +1490,62 @@ def create_facility():
         if not data.get('name') or not data.get('price'):
             return jsonify({'success': False, 'message': 'Name and hourly rate are required'})
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Insert new facility
-        cursor.execute('''
-            INSERT INTO facilities (name, description, hourly_rate, main_photo_url, active, amenities, downpayment_rate, max_capacity)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            data['name'],
-            data.get('description', ''),
-            float(data['price']),  # Map price to hourly_rate
-            data.get('image_url', ''),  # Map image_url to main_photo_url
-            data.get('active', True),
-            data.get('amenities', ''),
-            float(data.get('downpayment', 0)),  # Map downpayment to downpayment_rate
-            int(data.get('capacity', 0))  # Map capacity to max_capacity
-        ))
-        
-        facility_id = cursor.lastrowid
-        print(f"🔍 Created facility {facility_id}: {data['name']}")
-        
-        # Generate default time slots for the new facility
-        # Default operating hours: 8:00 AM to 9:00 PM (can be customized per facility type)
-        operating_hours = data.get('operating_hours', '8:00 AM - 9:00 PM')
-        
-        # Parse operating hours or use defaults
-        start_hour = 8  # Default 8 AM
-        end_hour = 21   # Default 9 PM (last slot starts at 8 PM)
-        
-        # Adjust hours based on facility type if specified
-        facility_name = data['name'].lower()
-        if 'basketball' in facility_name or 'court' in facility_name:
-            start_hour, end_hour = 6, 22  # 6 AM to 9 PM
-        elif 'swimming' in facility_name or 'pool' in facility_name:
-            start_hour, end_hour = 6, 21  # 6 AM to 8 PM
-        elif 'shooting' in facility_name or 'range' in facility_name:
-            start_hour, end_hour = 8, 18  # 8 AM to 5 PM
-        
-        print(f"🔍 Generating time slots for facility {facility_id}: {start_hour}:00 to {end_hour}:00")
-        
-        # Generate time slots (2-hour slots for better management)
-        time_slots = []
-        for i, hour in enumerate(range(start_hour, end_hour, 2)):  # Increment by 2 hours
-            start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
-            end_time = f"{(hour + 2) % 12 or 12}:00 {'AM' if hour + 2 < 12 else 'PM'}"
-            duration_minutes = 120  # 2 hour slots
-            sort_order = i + 1  # Chronological order
-            time_slots.append((facility_id, start_time, end_time, duration_minutes, sort_order))
-        
-        # Insert time slots
-        cursor.executemany('''
-            INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order)
-            VALUES (?, ?, ?, ?, ?)
-        ''', time_slots)
-        
-        print(f"🔍 Created {len(time_slots)} time slots for facility {facility_id}")
-        
-        conn.commit()
-        conn.close()
+        with db_manager.write_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Insert new facility
+            cursor.execute('''
+                INSERT INTO facilities (name, description, hourly_rate, main_photo_url, active, amenities, downpayment_rate, max_capacity)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                data['name'],
+                data.get('description', ''),
+                float(data['price']),  # Map price to hourly_rate
+                data.get('image_url', ''),  # Map image_url to main_photo_url
+                data.get('active', True),
+                data.get('amenities', ''),
+                float(data.get('downpayment', 0)),  # Map downpayment to downpayment_rate
+                int(data.get('capacity', 0))  # Map capacity to max_capacity
+            ))
+            
+            facility_id = cursor.lastrowid
+            print(f"🔍 Created facility {facility_id}: {data['name']}")
+            
+            # Generate default time slots for the new facility
+            # Default operating hours: 8:00 AM to 9:00 PM (can be customized per facility type)
+            operating_hours = data.get('operating_hours', '8:00 AM - 9:00 PM')
+            
+            # Parse operating hours or use defaults
+            start_hour = 8  # Default 8 AM
+            end_hour = 21   # Default 9 PM (last slot starts at 8 PM)
+            
+            # Adjust hours based on facility type if specified
+            facility_name = data['name'].lower()
+            if 'basketball' in facility_name or 'court' in facility_name:
+                start_hour, end_hour = 6, 22  # 6 AM to 9 PM
+            elif 'swimming' in facility_name or 'pool' in facility_name:
+                start_hour, end_hour = 6, 21  # 6 AM to 8 PM
+            elif 'shooting' in facility_name or 'range' in facility_name:
+                start_hour, end_hour = 8, 18  # 8 AM to 5 PM
+            
+            print(f"🔍 Generating time slots for facility {facility_id}: {start_hour}:00 to {end_hour}:00")
+            
+            # Generate time slots (2-hour slots for better management)
+            time_slots = []
+            for i, hour in enumerate(range(start_hour, end_hour, 2)):  # Increment by 2 hours
+                start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
+                end_time = f"{(hour + 2) % 12 or 12}:00 {'AM' if hour + 2 < 12 else 'PM'}"
+                duration_minutes = 120  # 2 hour slots
+                sort_order = i + 1  # Chronological order
+                time_slots.append((facility_id, start_time, end_time, duration_minutes, sort_order))
+            
+            # Insert time slots
+            cursor.executemany('''
+                INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order)
+                VALUES (?, ?, ?, ?, ?)
+            ''', time_slots)
+            
+            print(f"🔍 Created {len(time_slots)} time slots for facility {facility_id}")
         
         return jsonify({
             'success': True, 
@@ -1234,7 +1553,7 @@ def create_facility():
             'facility_id': facility_id,
             'time_slots_created': len(time_slots)
         })
-        
+    
     except Exception as e:
         print(f"❌ create_facility error: {e}")
         return jsonify({'success': False, 'message': str(e)})
@@ -1243,54 +1562,51 @@ def create_facility():
 def regenerate_facility_timeslots(facility_id):
     """Regenerate time slots for an existing facility"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get facility info
-        cursor.execute('SELECT name FROM facilities WHERE id = ?', (facility_id,))
-        facility = cursor.fetchone()
-        
-        if not facility:
-            return jsonify({'success': False, 'message': 'Facility not found'}), 404
-        
-        facility_name = facility[0]
-        print(f"🔍 Regenerating time slots for facility {facility_id}: {facility_name}")
-        
-        # Delete existing time slots for this facility
-        cursor.execute('DELETE FROM time_slots WHERE facility_id = ?', (facility_id,))
-        deleted_count = cursor.rowcount
-        print(f"🔍 Deleted {deleted_count} existing time slots")
-        
-        # Determine operating hours based on facility type
-        facility_name_lower = facility_name.lower()
-        if 'basketball' in facility_name_lower or 'court' in facility_name_lower:
-            start_hour, end_hour = 6, 22  # 6 AM to 9 PM
-        elif 'swimming' in facility_name_lower or 'pool' in facility_name_lower:
-            start_hour, end_hour = 6, 21  # 6 AM to 8 PM
-        elif 'shooting' in facility_name_lower or 'range' in facility_name_lower:
-            start_hour, end_hour = 8, 18  # 8 AM to 5 PM
-        else:
-            start_hour, end_hour = 6, 21  # Default 6 AM to 8 PM
-        
-        # Generate new time slots (2-hour slots for better management)
-        time_slots = []
-        for i, hour in enumerate(range(start_hour, end_hour, 2)):  # Increment by 2 hours
-            start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
-            end_time = f"{(hour + 2) % 12 or 12}:00 {'AM' if hour + 2 < 12 else 'PM'}"
-            duration_minutes = 120  # 2 hour slots
-            sort_order = i + 1  # Chronological order
-            time_slots.append((facility_id, start_time, end_time, duration_minutes, sort_order))
-        
-        # Insert new time slots
-        cursor.executemany('''
-            INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order)
-            VALUES (?, ?, ?, ?, ?)
-        ''', time_slots)
-        
-        print(f"🔍 Created {len(time_slots)} new time slots for facility {facility_id}")
-        
-        conn.commit()
-        conn.close()
+        with db_manager.write_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Get facility info
+            cursor.execute('SELECT name FROM facilities WHERE id = ?', (facility_id,))
+            facility = cursor.fetchone()
+            
+            if not facility:
+                return jsonify({'success': False, 'message': 'Facility not found'}), 404
+            
+            facility_name = facility[0]
+            print(f"🔍 Regenerating time slots for facility {facility_id}: {facility_name}")
+            
+            # Delete existing time slots for this facility
+            cursor.execute('DELETE FROM time_slots WHERE facility_id = ?', (facility_id,))
+            deleted_count = cursor.rowcount
+            print(f"🔍 Deleted {deleted_count} existing time slots")
+            
+            # Determine operating hours based on facility type
+            facility_name_lower = facility_name.lower()
+            if 'basketball' in facility_name_lower or 'court' in facility_name_lower:
+                start_hour, end_hour = 6, 22  # 6 AM to 9 PM
+            elif 'swimming' in facility_name_lower or 'pool' in facility_name_lower:
+                start_hour, end_hour = 6, 21  # 6 AM to 8 PM
+            elif 'shooting' in facility_name_lower or 'range' in facility_name_lower:
+                start_hour, end_hour = 8, 18  # 8 AM to 5 PM
+            else:
+                start_hour, end_hour = 6, 21  # Default 6 AM to 8 PM
+            
+            # Generate new time slots (2-hour slots for better management)
+            time_slots = []
+            for i, hour in enumerate(range(start_hour, end_hour, 2)):  # Increment by 2 hours
+                start_time = f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
+                end_time = f"{(hour + 2) % 12 or 12}:00 {'AM' if hour + 2 < 12 else 'PM'}"
+                duration_minutes = 120  # 2 hour slots
+                sort_order = i + 1  # Chronological order
+                time_slots.append((facility_id, start_time, end_time, duration_minutes, sort_order))
+            
+            # Insert new time slots
+            cursor.executemany('''
+                INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order)
+                VALUES (?, ?, ?, ?, ?)
+            ''', time_slots)
+            
+            print(f"🔍 Created {len(time_slots)} new time slots for facility {facility_id}")
         
         return jsonify({
             'success': True,
@@ -1298,7 +1614,7 @@ def regenerate_facility_timeslots(facility_id):
             'time_slots_created': len(time_slots),
             'deleted_slots': deleted_count
         })
-        
+    
     except Exception as e:
         print(f"❌ regenerate_timeslots error: {e}")
         return jsonify({'success': False, 'message': str(e)})
@@ -1307,52 +1623,62 @@ def regenerate_facility_timeslots(facility_id):
 def update_facility(facility_id):
     try:
         data = request.get_json()
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Update facility
-        cursor.execute('''
-            UPDATE facilities 
-            SET name = ?, description = ?, hourly_rate = ?, main_photo_url = ?, active = ?, amenities = ?, downpayment_rate = ?, max_capacity = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (
-            data.get('name'),
-            data.get('description', ''),
-            float(data.get('price', 0)),  # Map price to hourly_rate
-            data.get('image_url', ''),  # Map image_url to main_photo_url
-            data.get('active', True),
-            data.get('amenities', ''),
-            float(data.get('downpayment', 0)),  # Map downpayment to downpayment_rate
-            int(data.get('capacity', 0)),  # Map capacity to max_capacity
-            facility_id
-        ))
-        
-        conn.commit()
-        conn.close()
+
+        with db_manager.write_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Update facility
+            cursor.execute('''
+                UPDATE facilities 
+                SET name = ?, description = ?, hourly_rate = ?, main_photo_url = ?, active = ?, amenities = ?, downpayment_rate = ?, max_capacity = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (
+                data.get('name'),
+                data.get('description', ''),
+                float(data.get('price', 0)),  # Map price to hourly_rate
+                data.get('image_url', ''),  # Map image_url to main_photo_url
+                data.get('active', True),
+                data.get('amenities', ''),
+                float(data.get('downpayment', 0)),  # Map downpayment to downpayment_rate
+                int(data.get('capacity', 0)),  # Map capacity to max_capacity
+                facility_id
+            ))
         
         return jsonify({'success': True, 'message': 'Facility updated successfully'})
-        
+    
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/api/facilities/<int:facility_id>', methods=['DELETE'])
 def delete_facility(facility_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Delete facility
-        cursor.execute('DELETE FROM facilities WHERE id = ?', (facility_id,))
-        
-        conn.commit()
-        conn.close()
+        with db_manager.write_connection() as conn:
+            cursor = conn.cursor()
+
+            # Delete facility
+            cursor.execute('DELETE FROM facilities WHERE id = ?', (facility_id,))
         
         return jsonify({'success': True, 'message': 'Facility deleted successfully'})
-        
+    
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+def _set_profile_photo(conn, where, param, photo, photo_blob=None):
+    """Point a user's profile photo at a blob (new upload or shared), releasing the previous one"""
+    blob_store = get_blob_store()
+    if photo_blob:
+        blob_store.incref(conn, photo_blob)
+    else:
+        photo_blob = blob_store.store_document(conn, photo)
+    old = conn.execute(f'SELECT profile_photo_blob FROM users WHERE {where}', (param,)).fetchone()
+    if old:
+        blob_store.release(conn, old[0])
+    conn.execute(f'''
+        UPDATE users 
+        SET profile_photo_url = ?, profile_photo_blob = ?
+        WHERE {where}
+    ''', (None if photo_blob else photo, photo_blob, param))
+
 # User Profile Management
 @app.route('/api/users/<int:user_id>', methods=['GET'])
 def get_user_by_id(user_id):
@@ -1377,7 +1703,8 @@ def get_user_by_id(user_id):
                     'verified': user[7],
                     'discount_rate': user[8],
                     'address': user[9],
-                    'profile_photo_url': user[10],
+                    'profile_photo_url': user[10] or (
+                        get_blob_store().data_url(user['profile_photo_blob']) if user['profile_photo_blob'] else None),
                     'is_authenticated': True
                 }
             })
@@ -1394,64 +1721,58 @@ def update_user_profile():
     try:
         data = request.get_json()
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Build dynamic update query to only update provided fields
-        update_fields = []
-        update_values = []
-        
-        if 'full_name' in data and data['full_name'] is not None:
-            update_fields.append('full_name = ?')
-            update_values.append(data['full_name'])
-        
-        if 'contact_number' in data and data['contact_number'] is not None:
-            update_fields.append('contact_number = ?')
-            update_values.append(data['contact_number'])
-        
-        if 'address' in data and data['address'] is not None:
-            update_fields.append('address = ?')
-            update_values.append(data['address'])
-        
-        if update_fields:
-            update_fields.append('updated_at = CURRENT_TIMESTAMP')
-            update_values.append(data['email'])
+        with db_manager.write_connection() as conn:
+            cursor = conn.cursor()
             
-            cursor.execute(f'''
-                UPDATE users 
-                SET {', '.join(update_fields)}
-                WHERE email = ?
-            ''', update_values)
+            # Build dynamic update query to only update provided fields
+            update_fields = []
+            update_values = []
             
-            print(f"✅ Updated profile for user: {data['email']}")
-            print(f"🔍 Updated fields: {', '.join([field.split(' = ')[0] for field in update_fields[:-1]])}")
-        else:
-            print(f"🔍 No fields to update for user: {data['email']}")
-        
-        # Update profile photo if provided
-        if 'profile_photo_url' in data and data['profile_photo_url']:
-            cursor.execute('''
-                UPDATE users 
-                SET profile_photo_url = ?
-                WHERE email = ?
-            ''', (data['profile_photo_url'], data['email']))
-            print(f"✅ Updated profile photo for user: {data['email']}")
-        
-        conn.commit()
-        conn.close()
+            if 'full_name' in data and data['full_name'] is not None:
+                update_fields.append('full_name = ?')
+                update_values.append(data['full_name'])
+            
+            if 'contact_number' in data and data['contact_number'] is not None:
+                update_fields.append('contact_number = ?')
+                update_values.append(data['contact_number'])
+            
+            if 'address' in data and data['address'] is not None:
+                update_fields.append('address = ?')
+                update_values.append(data['address'])
+            
+            if update_fields:
+                update_fields.append('updated_at = CURRENT_TIMESTAMP')
+                update_values.append(data['email'])
+                
+                cursor.execute(f'''
+                    UPDATE users 
+                    SET {', '.join(update_fields)}
+                    WHERE email = ?
+                ''', update_values)
+                
+                print(f"✅ Updated profile for user: {data['email']}")
+                print(f"🔍 Updated fields: {', '.join([field.split(' = ')[0] for field in update_fields[:-1]])}")
+            else:
+                print(f"🔍 No fields to update for user: {data['email']}")
+            
+            # Update profile photo if provided
+            if 'profile_photo_url' in data and data['profile_photo_url']:
+                _set_profile_photo(conn, 'email = ?', data['email'], data['profile_photo_url'])
+                print(f"✅ Updated profile photo for user: {data['email']}")
         
         return jsonify({'success': True, 'message': 'Profile updated successfully'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/users/profile/<email>', methods=['GET'])
+@conditional_get.depends_on('users')
 def get_user_profile(email):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT id, email, full_name, role, verified, verification_type, discount_rate, contact_number, address, profile_photo_url, created_at, fake_booking_violations, is_banned, banned_at, ban_reason
+            SELECT id, email, full_name, role, verified, verification_type, discount_rate, contact_number, address, profile_photo_url, created_at, fake_booking_violations, is_banned, banned_at, ban_reason, profile_photo_blob
             FROM users 
             WHERE email = ?
         ''', (email,))
@@ -1472,7 +1793,7 @@ def get_user_profile(email):
                     'discount_rate': user[6],
                     'contact_number': user[7],
                     'address': user[8],
-                    'profile_photo_url': user[9],
+                    'profile_photo_url': user[9] or (get_blob_store().data_url(user[15]) if user[15] else None),
                     'created_at': user[10],
                     'fake_booking_violations': user[11] if len(user) > 11 else 0,
                     'is_banned': user[12] if len(user) > 12 else False,
@@ -1487,6 +1808,7 @@ def get_user_profile(email):
 
 # Get officials for customer service
 @app.route('/api/officials', methods=['GET'])
+@conditional_get.depends_on('users')
 def get_officials():
     try:
         conn = get_db_connection()
@@ -1612,6 +1934,7 @@ def get_user_status(email):
 
 # Verification Status Check - New endpoint for form locking
 @app.route('/api/verification-requests/status/<int:user_id>', methods=['GET'])
+@conditional_get.depends_on('users', 'verification_requests')
 def get_verification_status(user_id):
     try:
         conn = get_db_connection()
@@ -1682,61 +2005,115 @@ def get_verification_status(user_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 # Verification Requests
+# Column -> key the app expects for verification requests
+VERIFICATION_REQUEST_ROWS = serializers.RowSerializer(rename={
+    'user_id': 'residentId',
+    'verification_type': 'verificationType',
+    'requested_discount_rate': 'discountRate',
+    'user_photo_base64': 'userPhotoUrl',  # Replaced by a document URL below
+    'valid_id_base64': 'validIdUrl',
+    'user_photo_blob': 'userPhotoHash',
+    'valid_id_blob': 'validIdHash',
+    'residential_address': 'address',
+    'created_at': 'submittedAt',
+    'updated_at': 'updatedAt',
+    'full_name': 'fullName',
+    'contact_number': 'contactNumber',
+})
+
+def _add_verification_document_urls(requests_list):
+    """Photos are served by /api/verification-requests/<id>/documents/<kind>; inline only on request"""
+    include_documents = request.args.get('include_documents', '').lower() == 'true'
+    blob_store = get_blob_store()
+    for req in requests_list:
+        for kind, key in (('user_photo', 'userPhoto'), ('valid_id', 'validId')):
+            inline_value, blob_hash = req[f'{key}Url'], req[f'{key}Hash']
+            if include_documents:
+                url = blob_store.data_url(blob_hash) if blob_hash else inline_value
+            elif blob_hash or is_inline_document(inline_value):
+                url = _document_url(f"/api/verification-requests/{req['id']}/documents/{kind}", blob_hash)
+            else:
+                url = inline_value or None  # Plain URLs are passed through
+            req[f'{key}Url'] = url
+            req[f'{key}ThumbnailUrl'] = (
+                _document_url(f"/api/verification-requests/{req['id']}/documents/{kind}", blob_hash, 'thumb')
+                if blob_hash else url)
+    return requests_list
+
+# Newest first; id breaks ties between requests submitted in the same second. COALESCE (indexed as is,
+# migration 012) keeps the leading key non-NULL so every page seeks straight to its first row
+VERIFICATION_SORT_KEYS = [
+    pagination.SortKey("COALESCE(vr.created_at, '')", 'DESC', False),
+    pagination.SortKey('vr.id', 'DESC', False),
+]
+
+def _verification_sort_values(req):
+    return req['submittedAt'] or '', req['id']
+
+def _verification_request_batches(after=None, limit=None):
+    """Every verification request (not just pending, for filtering), one fetchmany() batch at a time"""
+    where, params = '', []
+    if after is not None:
+        keyset, params = pagination.keyset_condition(VERIFICATION_SORT_KEYS, after)
+        where = f'WHERE {keyset}'
+    if limit is not None:
+        params.append(limit)
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(f'''
+            SELECT vr.id, vr.user_id, vr.verification_type, vr.requested_discount_rate, 
+                   vr.user_photo_base64, vr.valid_id_base64, vr.status, 
+                   vr.residential_address, vr.created_at, vr.updated_at, u.email, u.full_name, u.contact_number,
+                   vr.user_photo_blob, vr.valid_id_blob
+            FROM verification_requests vr
+            LEFT JOIN users u ON vr.user_id = u.id
+            {where}
+            ORDER BY {pagination.order_by(VERIFICATION_SORT_KEYS)}
+            {'LIMIT ?' if limit is not None else ''}
+        ''', params)
+        for batch in VERIFICATION_REQUEST_ROWS.batches(cursor):
+            yield _add_verification_document_urls(batch)
+    finally:
+        conn.close()
+
 @app.route('/api/verification-requests', methods=['GET', 'POST'])
 def verification_requests():
     if request.method == 'GET':
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Get all verification requests (not just pending) for filtering
-            cursor.execute('''
-                SELECT vr.id, vr.user_id, vr.verification_type, vr.requested_discount_rate, 
-                       vr.user_photo_base64, vr.valid_id_base64, vr.status, 
-                       vr.residential_address, vr.created_at, vr.updated_at, u.email, u.full_name, u.contact_number
-                FROM verification_requests vr
-                LEFT JOIN users u ON vr.user_id = u.id
-                ORDER BY vr.created_at DESC
-            ''')
-            
-            requests = cursor.fetchall()
-            conn.close()
-            
-            requests_list = []
-            for req in requests:
-                requests_list.append({
-                    'id': req[0],
-                    'residentId': req[1],  # user_id from database - frontend expects this
-                    'verificationType': req[2],
-                    'discountRate': req[3],
-                    'userPhotoUrl': req[4],  # user_photo_base64 - frontend expects this
-                    'validIdUrl': req[5],    # valid_id_base64 - frontend expects this
-                    'status': req[6],
-                    'address': req[7],      # residential_address - frontend expects this
-                    'submittedAt': req[8],  # created_at - frontend expects this
-                    'updatedAt': req[9],     # updated_at
-                    'email': req[10],
-                    'fullName': req[11],    # from users table
-                    'contactNumber': req[12] # from users table
-                })
-            
-            return jsonify({
+            try:
+                page = pagination.page_request(request.args, VERIFICATION_SORT_KEYS)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            
+            # ?limit=&cursor= returns one keyset page
+            if page:
+                body = {'success': True}
+                if page.include_total:
+                    conn = get_db_connection()
+                    try:
+                        body['total'] = conn.execute('SELECT COUNT(*) FROM verification_requests').fetchone()[0]
+                    finally:
+                        conn.close()
+                requests_list = [req for batch in _verification_request_batches(page.after, page.limit + 1) for req in batch]
+                body['data'], body['next_cursor'] = pagination.next_cursor(requests_list, page.limit, _verification_sort_values)
+                return serializers.json_response(body)
+            
+            # ?stream=true or Accept: application/x-ndjson streams the listing instead
+            stream = serializers.stream_format(request)
+            if stream:
+                return serializers.stream_response(_verification_request_batches(), ndjson=stream == 'ndjson')
+            
+            requests_list = [req for batch in _verification_request_batches() for req in batch]
+            return serializers.json_response({
                 'success': True,
                 'data': requests_list
             })
-            
+        
         except Exception as e:
             print(f"❌ Error fetching verification requests: {e}")
-            # Ensure database connection is closed on error
-            if 'conn' in locals():
-                try:
-                    conn.close()
-                except:
-                    pass
             return jsonify({'success': False, 'message': str(e)}), 500
     
     elif request.method == 'POST':
-        conn = None
         try:
             data = request.get_json()
             print(f"🔍 Received verification request data: {data}")
@@ -1747,112 +2124,150 @@ def verification_requests():
                 return jsonify({'success': False, 'message': 'User ID and verification type are required'})
             
             print(f"🔍 DEBUG: About to connect to database...")
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            print(f"🔍 DEBUG: Database connection established")
-            
-            # 🔒 VERIFICATION STATUS VALIDATION: Check if user can submit new request
-            print(f"🔍 DEBUG: About to check user verification status...")
-            cursor.execute('SELECT verified FROM users WHERE id = ?', (data.get('residentId'),))
-            user_verification = cursor.fetchone()
-            print(f"🔍 DEBUG: User verification query completed")
-            
-            if not user_verification:
-                return jsonify({'success': False, 'message': 'User not found'}), 404
-            
-            # Check for existing pending requests
-            print(f"🔍 DEBUG: About to check pending requests...")
-            cursor.execute('''
-                SELECT COUNT(*) as pending_count 
-                FROM verification_requests 
-                WHERE user_id = ? AND status = 'pending'
-            ''', (data.get('residentId'),))
-            pending_result = cursor.fetchone()
-            has_pending = pending_result['pending_count'] > 0
-            print(f"🔍 DEBUG: Pending requests check completed")
-            
-            # Validate submission permission
-            if user_verification[0] == 1:  # Already verified resident
-                return jsonify({
-                    'success': False, 
-                    'message': 'You are already verified as a Resident with full benefits'
-                }), 400
-            
-            if has_pending:
-                return jsonify({
-                    'success': False,
-                    'message': 'You already submitted a Verification Request! wait for officials to either Reject or Approve your request'
-                }), 400
-            
-            # User can submit (unverified or non-resident wanting upgrade)
-            print(f"✅ User {data.get('residentId')} can submit verification request (verified: {user_verification[0]}, has_pending: {has_pending})")
-            
-            # 🔒 BAN VALIDATION: Check if user is banned before allowing verification request
-            print(f"🔍 DEBUG: About to check user ban status...")
-            cursor.execute('SELECT email, is_banned, ban_reason FROM users WHERE id = ?', (data.get('residentId'),))
-            user_result = cursor.fetchone()
-            print(f"🔍 DEBUG: User ban status check completed")
-            
-            if not user_result:
-                return jsonify({'success': False, 'message': 'User not found'}), 404
-            
-            user_email = user_result[0]
-            is_banned = user_result[1]
-            ban_reason = user_result[2]
-            
-            if is_banned:
-                print(f"🚨 BANNED USER ATTEMPTED VERIFICATION REQUEST: {user_email} - Reason: {ban_reason}")
-                return jsonify({
-                    'success': False, 
-                    'message': 'Account is banned. Cannot submit verification requests.',
-                    'error_type': 'user_banned',
-                    'ban_reason': ban_reason or 'Account has been banned by administrator.'
-                }), 403
-            
-            print(f"🔍 DEBUG: Verification request for user: {user_email}, banned: {is_banned}")
-            
-            # Insert new verification request
-            cursor.execute('''
-                INSERT INTO verification_requests 
-                (request_reference, user_id, verification_type, requested_discount_rate, user_photo_base64, valid_id_base64, 
-                 residential_address, status, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                f"VR-{data.get('residentId')}-{datetime.now().strftime('%Y%m%d%H%M%S')}",  # Generate unique request reference
-                data.get('residentId'),  # frontend sends residentId, map to user_id
-                data.get('verificationType', ''),
-                0.1 if data.get('verificationType') == 'resident' else 0.05,  # Set discount rate based on type
-                data.get('userPhotoUrl', ''),  # frontend sends userPhotoUrl, map to user_photo_base64
-                data.get('validIdUrl', ''),    # frontend sends validIdUrl, map to valid_id_base64
-                data.get('address', ''),       # frontend sends address, map to residential_address
-                data.get('status', 'pending'),
-                data.get('submittedAt')        # frontend sends submittedAt, map to created_at
-            ))
-            
-            # Also update user's contact number if provided
-            if data.get('contactNumber'):
+            with db_manager.write_connection() as conn:
+                cursor = conn.cursor()
+                print(f"🔍 DEBUG: Database connection established")
+                
+                # 🔒 VERIFICATION STATUS VALIDATION: Check if user can submit new request
+                print(f"🔍 DEBUG: About to check user verification status...")
+                cursor.execute('SELECT verified FROM users WHERE id = ?', (data.get('residentId'),))
+                user_verification = cursor.fetchone()
+                print(f"🔍 DEBUG: User verification query completed")
+                
+                if not user_verification:
+                    return jsonify({'success': False, 'message': 'User not found'}), 404
+                
+                # Check for existing pending requests
+                print(f"🔍 DEBUG: About to check pending requests...")
                 cursor.execute('''
-                    UPDATE users 
-                    SET contact_number = ?
-                    WHERE id = ?
-                ''', (data.get('contactNumber'), data.get('residentId')))
+                    SELECT COUNT(*) as pending_count 
+                    FROM verification_requests 
+                    WHERE user_id = ? AND status = 'pending'
+                ''', (data.get('residentId'),))
+                pending_result = cursor.fetchone()
+                has_pending = pending_result['pending_count'] > 0
+                print(f"🔍 DEBUG: Pending requests check completed")
+                
+                # Validate submission permission
+                if user_verification[0] == 1:  # Already verified resident
+                    return jsonify({
+                        'success': False, 
+                        'message': 'You are already verified as a Resident with full benefits'
+                    }), 400
+                
+                if has_pending:
+                    return jsonify({
+                        'success': False,
+                        'message': 'You already submitted a Verification Request! wait for officials to either Reject or Approve your request'
+                    }), 400
+                
+                # User can submit (unverified or non-resident wanting upgrade)
+                print(f"✅ User {data.get('residentId')} can submit verification request (verified: {user_verification[0]}, has_pending: {has_pending})")
+                
+                # 🔒 BAN VALIDATION: Check if user is banned before allowing verification request
+                print(f"🔍 DEBUG: About to check user ban status...")
+                cursor.execute('SELECT email, is_banned, ban_reason FROM users WHERE id = ?', (data.get('residentId'),))
+                user_result = cursor.fetchone()
+                print(f"🔍 DEBUG: User ban status check completed")
+                
+                if not user_result:
+                    return jsonify({'success': False, 'message': 'User not found'}), 404
+                
+                user_email = user_result[0]
+                is_banned = user_result[1]
+                ban_reason = user_result[2]
+                
+                if is_banned:
+                    print(f"🚨 BANNED USER ATTEMPTED VERIFICATION REQUEST: {user_email} - Reason: {ban_reason}")
+                    return jsonify({
+                        'success': False, 
+                        'message': 'Account is banned. Cannot submit verification requests.',
+                        'error_type': 'user_banned',
+                        'ban_reason': ban_reason or 'Account has been banned by administrator.'
+                    }), 403
+                
+                print(f"🔍 DEBUG: Verification request for user: {user_email}, banned: {is_banned}")
+                
+                # Photos go to the blob store; only non-base64 values (e.g. URLs) stay inline
+                blob_store = get_blob_store()
+                user_photo_blob = blob_store.store_document(conn, data.get('userPhotoUrl'))
+                valid_id_blob = blob_store.store_document(conn, data.get('validIdUrl'))
+                
+                # Insert new verification request
+                cursor.execute('''
+                    INSERT INTO verification_requests 
+                    (request_reference, user_id, verification_type, requested_discount_rate, user_photo_base64, valid_id_base64, 
+                     user_photo_blob, valid_id_blob, residential_address, status, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    f"VR-{data.get('residentId')}-{datetime.now().strftime('%Y%m%d%H%M%S')}",  # Generate unique request reference
+                    data.get('residentId'),  # frontend sends residentId, map to user_id
+                    data.get('verificationType', ''),
+                    0.1 if data.get('verificationType') == 'resident' else 0.05,  # Set discount rate based on type
+                    None if user_photo_blob else data.get('userPhotoUrl', ''),  # frontend sends userPhotoUrl, map to user_photo_base64
+                    None if valid_id_blob else data.get('validIdUrl', ''),    # frontend sends validIdUrl, map to valid_id_base64
+                    user_photo_blob,
+                    valid_id_blob,
+                    data.get('address', ''),       # frontend sends address, map to residential_address
+                    data.get('status', 'pending'),
+                    data.get('submittedAt')        # frontend sends submittedAt, map to created_at
+                ))
+                
+                # Also update user's contact number if provided
+                if data.get('contactNumber'):
+                    cursor.execute('''
+                        UPDATE users 
+                        SET contact_number = ?
+                        WHERE id = ?
+                    ''', (data.get('contactNumber'), data.get('residentId')))
             
-            conn.commit()
-            conn.close()
+            for photo_blob in (user_photo_blob, valid_id_blob):
+                derivatives.schedule(photo_blob)
             
             print("✅ Verification request created successfully")
             return jsonify({'success': True, 'message': 'Verification request submitted successfully'})
-            
+        
         except Exception as e:
             print(f"❌ Error creating verification request: {e}")
-            # Ensure database connection is closed on error
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
             return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/verification-requests/<int:request_id>/documents/<kind>', methods=['GET'])
+def get_verification_document(request_id, kind):
+    """Download one verification document: user_photo, valid_id or proof_of_residency
+    (officials, or the resident who submitted the request)"""
+    user_email = request.args.get('user_email')
+    user_role = request.args.get('user_role', 'resident')
+    exclude_user_role = request.args.get('excludeUserRole', '').lower() == 'true'
+    columns = {blob_column[:-len('_blob')]: (inline_column, blob_column)
+               for inline_column, blob_column in DOCUMENT_COLUMNS['verification_requests']}
+    if kind not in columns:
+        return jsonify({'success': False, 'message': f'Unknown document kind: {kind}'}), 404
+    inline_column, blob_column = columns[kind]
+    variant = request.args.get('variant')  # thumb / preview, full image when omitted
+    if variant and variant not in VARIANTS:
+        return jsonify({'success': False, 'message': f'Unknown variant: {variant}'}), 400
+    
+    with db_manager.read_connection() as conn:
+        document = conn.execute(f'''
+            SELECT vr.{blob_column}, vr.{inline_column}, bl.mime_type, u.email
+            FROM verification_requests vr
+            LEFT JOIN blobs bl ON bl.hash = vr.{blob_column}
+            LEFT JOIN users u ON vr.user_id = u.id
+            WHERE vr.id = ?
+        ''', (request_id,)).fetchone()
+        if not document:
+            return jsonify({'success': False, 'message': 'Verification request not found'}), 404
+        
+        # Same rule as receipts: officials, or the owner of the request
+        if not exclude_user_role and user_role != 'official':
+            owner_email = (document[3] or '').lower().strip()
+            if not user_email or owner_email != user_email.lower().strip():
+                return jsonify({'success': False, 'message': 'Not allowed to view this document'}), 403
+        
+        derived_hash = _lookup_variant(conn, document[0], document[2], variant)
+    
+    return _send_document(document[0], document[1], document[2], f'verification-{request_id}-{kind}', derived_hash)
+
 @app.route('/api/verification-requests/<int:request_id>', methods=['PUT'])
 def update_verification_request(request_id):
     try:
@@ -1861,73 +2276,81 @@ def update_verification_request(request_id):
         
         if not data.get('status'):
             return jsonify({'success': False, 'message': 'Status is required'})
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Update verification request
-        cursor.execute('''
-            UPDATE verification_requests 
-            SET status = ?, updated_at = ?
-            WHERE id = ?
-        ''', (
-            data.get('status'),
-            data.get('updatedAt', datetime.now().isoformat()),
-            request_id
-        ))
-        
-        # Also update the user's verification status and discount rate
-        if data.get('status') in ['approved', 'rejected']:
-            # Get verification request details to determine verification type and photos
-            cursor.execute('''
-                SELECT verification_type, user_photo_base64 FROM verification_requests WHERE id = ?
-            ''', (request_id,))
-            verification_request = cursor.fetchone()
-            verification_type = verification_request[0] if verification_request else 'resident'
-            user_photo_base64 = verification_request[1] if len(verification_request) > 1 else None
-            
-            # Use provided discount rate or determine from verification type
-            if data.get('discountRate') is not None:
-                discount_rate = float(data.get('discountRate'))
-            else:
-                discount_rate = 0.1 if verification_type == 'resident' else 0.05
-            
-            # Set verified status based on approval and verification type
-            if data.get('status') == 'approved':
-                # For residents: verified = 1, For non-residents: verified = 2
-                is_verified = 1 if verification_type == 'resident' else 2
-            else:
-                is_verified = 0  # rejected
-                discount_rate = 0.0
+
+        with db_manager.write_connection() as conn:
+            cursor = conn.cursor()
             
-            # Update user verification and discount
+            # Update verification request
             cursor.execute('''
-                UPDATE users 
-                SET verified = ?, discount_rate = ?, verification_type = ?, updated_at = ?
-                WHERE id = (SELECT user_id FROM verification_requests WHERE id = ?)
-            ''', (is_verified, discount_rate, verification_type, datetime.now(), request_id))
-            
-            # Update user profile photo if approved and photo provided
-            if data.get('status') == 'approved' and (data.get('profilePhotoUrl') or user_photo_base64):
-                profile_photo = data.get('profilePhotoUrl') or user_photo_base64
+                UPDATE verification_requests 
+                SET status = ?, updated_at = ?
+                WHERE id = ?
+            ''', (
+                data.get('status'),
+                data.get('updatedAt', datetime.now().isoformat()),
+                request_id
+            ))
+            
+            # Also update the user's verification status and discount rate
+            if data.get('status') in ['approved', 'rejected']:
+                # Get verification request details to determine verification type and photos
+                cursor.execute('''
+                    SELECT verification_type, user_photo_base64, user_photo_blob FROM verification_requests WHERE id = ?
+                ''', (request_id,))
+                verification_request = cursor.fetchone()
+                verification_type = verification_request[0] if verification_request else 'resident'
+                user_photo_base64 = verification_request[1] if verification_request else None
+                user_photo_blob = verification_request[2] if verification_request else None
+                
+                # Use provided discount rate or determine from verification type
+                if data.get('discountRate') is not None:
+                    discount_rate = float(data.get('discountRate'))
+                else:
+                    discount_rate = 0.1 if verification_type == 'resident' else 0.05
+                
+                # Set verified status based on approval and verification type
+                if data.get('status') == 'approved':
+                    # For residents: verified = 1, For non-residents: verified = 2
+                    is_verified = 1 if verification_type == 'resident' else 2
+                else:
+                    is_verified = 0  # rejected
+                    discount_rate = 0.0
+                
+                # Update user verification and discount
                 cursor.execute('''
                     UPDATE users 
-                    SET profile_photo_url = ?
+                    SET verified = ?, discount_rate = ?, verification_type = ?, updated_at = ?
                     WHERE id = (SELECT user_id FROM verification_requests WHERE id = ?)
-                ''', (profile_photo, request_id))
-                print(f"✅ Updated profile photo for user with verification request ID: {request_id}")
-        
-        conn.commit()
-        conn.close()
+                ''', (is_verified, discount_rate, verification_type, datetime.now(), request_id))
+                
+                # Update user profile photo if approved and photo provided
+                if data.get('status') == 'approved' and (data.get('profilePhotoUrl') or user_photo_base64 or user_photo_blob):
+                    if data.get('profilePhotoUrl'):
+                        _set_profile_photo(conn, 'id = (SELECT user_id FROM verification_requests WHERE id = ?)',
+                                           request_id, data['profilePhotoUrl'])
+                    elif user_photo_blob:
+                        # Same image as the verification photo: share the blob instead of copying it
+                        _set_profile_photo(conn, 'id = (SELECT user_id FROM verification_requests WHERE id = ?)',
+                                           request_id, None, user_photo_blob)
+                    else:
+                        _set_profile_photo(conn, 'id = (SELECT user_id FROM verification_requests WHERE id = ?)',
+                                           request_id, user_photo_base64)
+                    print(f"✅ Updated profile photo for user with verification request ID: {request_id}")
         
         print(f"✅ Verification request {request_id} updated successfully")
         return jsonify({'success': True, 'message': 'Verification request updated successfully'})
-        
+    
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
 if __name__ == '__main__':
     print("🚀 Starting Barangay Reserve Server...")
+    with db_manager.write_connection() as conn:
+        pruned = booking_changes.prune_tombstones(conn)
+    if pruned:
+        print(f"🧹 Pruned {pruned} booking tombstone(s) older than {Config.TOMBSTONE_RETENTION_DAYS} days")
+    if Config.INDEX_ADVISOR_ON_STARTUP:
+        index_advisor.print_report(index_advisor.run())
     print(f"📱 Server will be available at: http://localhost:{Config.PORT}")
     print("🌐 API endpoints:")
     print("   GET    /api/facilities")
@@ -1936,14 +2359,28 @@ if __name__ == '__main__':
     print("   DELETE /api/facilities/<id>")
     print("   GET    /api/bookings")
     print("   POST   /api/bookings")
+    print("   GET    /api/bookings/changes")
+    print("   GET    /api/bookings/<id>/receipt")
+    print("   POST   /api/uploads/receipt")
+    print("   GET    /api/bookings/<id>/similar-receipts")
+    print("   GET    /api/available-timeslots")
+    print("   GET    /api/available-timeslots/range")
+    print("   GET    /api/availability/grid")
+    print("   GET    /api/availability/next")
     print("   GET    /api/verification-requests")
     print("   POST   /api/verification-requests")
     print("   GET    /api/verification-requests/status/<user_id>")
+    print("   GET    /api/verification-requests/<id>/documents/<kind>")
     print("   PUT    /api/verification-requests/<id>")
     print("   POST   /api/login")
     print("   POST   /api/register")
     print("   PUT    /api/users/profile")
     print("   GET    /api/users/profile/<email>")
     print("   POST   /api/setup-sample-data")
+    print("   GET    /api/admin/db-pool")
+    print("   GET    /api/admin/db-stats")
+    print("   GET    /api/admin/schema")
+    print("   GET    /api/admin/index-report")
+    print("   GET    /api/admin/blob-stats")
     
     app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
@@ -4,15 +4,24 @@ Barangay Reserve Server - Updated Version
 Comprehensive backend for barangay reservation system
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, send_file, redirect
 from flask_cors import CORS
 import sqlite3
 import json
 import os
 from datetime import datetime, timedelta
 import hashlib
+import io
 import secrets
 from config import Config
+from db_pool import get_pool
+from database_manager import db_manager
+from blob_store import decode_document, get_blob_store, is_inline_document
+from image_derivatives import DerivativeCache
+from receipt_similarity import ReceiptSimilarityIndex
+from schema_migrations import check_schema, migrate
+import serializers
+import time_model
 from functools import wraps
 import re
 
@@ -20,336 +29,51 @@ app = Flask(__name__)
 # Dynamic CORS configuration for DuckDNS
 CORS(app, origins=Config.get_cors_origins())
 
-# Database setup with comprehensive schema
-def init_db():
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Drop existing tables to start fresh
-    cursor.execute("DROP TABLE IF EXISTS user_sessions")
-    cursor.execute("DROP TABLE IF EXISTS facility_availability_rules")
-    cursor.execute("DROP TABLE IF EXISTS notifications")
-    cursor.execute("DROP TABLE IF EXISTS booking_audit_log")
-    cursor.execute("DROP TABLE IF EXISTS barangay_events")
-    cursor.execute("DROP TABLE IF EXISTS verification_requests")
-    cursor.execute("DROP TABLE IF EXISTS bookings")
-    cursor.execute("DROP TABLE IF EXISTS time_slots")
-    cursor.execute("DROP TABLE IF EXISTS facilities")
-    cursor.execute("DROP TABLE IF EXISTS users")
-    
-    # Create USERS table
-    cursor.execute('''
-        CREATE TABLE users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email VARCHAR(255) UNIQUE NOT NULL,
-            password_hash VARCHAR(255) NOT NULL,
-            full_name VARCHAR(255) NOT NULL,
-            role VARCHAR(20) DEFAULT 'resident' CHECK (role IN ('resident', 'official')),
-            
-            -- Verification System
-            verified BOOLEAN DEFAULT FALSE,
-            verification_type VARCHAR(20) DEFAULT NULL,
-            discount_rate DECIMAL(3,2) DEFAULT 0.00,
-            
-            -- Contact Information
-            contact_number VARCHAR(20),
-            address TEXT,
-            
-            -- Profile Management
-            profile_photo_url TEXT,
-            profile_photo_base64 TEXT,
-            
-            -- Account Status
-            is_active BOOLEAN DEFAULT TRUE,
-            email_verified BOOLEAN DEFAULT FALSE,
-            last_login DATETIME,
-            
-            -- System Fields
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            created_by INTEGER
-        )
-    ''')
-    
-    # Create FACILITIES table
-    cursor.execute('''
-        CREATE TABLE facilities (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name VARCHAR(255) NOT NULL,
-            description TEXT,
-            
-            -- Pricing Information
-            hourly_rate DECIMAL(10,2) NOT NULL,
-            downpayment_rate DECIMAL(3,2) DEFAULT 0.50,
-            
-            -- Capacity and Physical Details
-            max_capacity INTEGER,
-            floor_area DECIMAL(8,2),
-            
-            -- Amenities (JSON array)
-            amenities TEXT,
-            
-            -- Media
-            main_photo_url TEXT,
-            photos TEXT,
-            
-            -- Status and Availability
-            is_active BOOLEAN DEFAULT TRUE,
-            requires_approval BOOLEAN DEFAULT TRUE,
-            
-            -- Time Slot Configuration
-            booking_window_days INTEGER DEFAULT 30,
-            min_booking_hours INTEGER DEFAULT 1,
-            max_booking_hours INTEGER DEFAULT 4,
-            
-            -- Operating Hours (JSON)
-            operating_hours TEXT,
-            
-            -- System Fields
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            created_by INTEGER
-        )
-    ''')
-    
-    # Create TIME_SLOTS table
-    cursor.execute('''
-        CREATE TABLE time_slots (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            facility_id INTEGER NOT NULL,
-            
-            -- Time Information
-            start_time TIME NOT NULL,
-            end_time TIME NOT NULL,
-            duration_minutes INTEGER NOT NULL,
-            
-            -- Slot Configuration
-            is_active BOOLEAN DEFAULT TRUE,
-            max_concurrent_bookings INTEGER DEFAULT 1,
-            
-            -- Pricing Variations
-            rate_multiplier DECIMAL(3,2) DEFAULT 1.00,
-            
-            -- System Fields
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            
-            FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
-        )
-    ''')
-    
-    # Create BOOKINGS table
-    cursor.execute('''
-        CREATE TABLE bookings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            booking_reference VARCHAR(20) UNIQUE NOT NULL,
-            
-            -- User and Facility
-            user_id INTEGER NOT NULL,
-            facility_id INTEGER NOT NULL,
-            time_slot_id INTEGER NOT NULL,
-            
-            -- Date and Time
-            booking_date DATE NOT NULL,
-            start_time TIME NOT NULL,
-            end_time TIME NOT NULL,
-            duration_hours DECIMAL(3,1) NOT NULL,
-            
-            -- Booking Details
-            purpose TEXT NOT NULL,
-            expected_attendees INTEGER DEFAULT 1,
-            special_requirements TEXT,
-            
-            -- Contact Information
-            contact_number VARCHAR(20),
-            contact_address TEXT,
-            
-            -- Financial Information
-            base_rate DECIMAL(10,2) NOT NULL,
-            discount_rate DECIMAL(3,2) DEFAULT 0.00,
-            discount_amount DECIMAL(10,2) DEFAULT 0.00,
-            downpayment_amount DECIMAL(10,2) NOT NULL,
-            total_amount DECIMAL(10,2) NOT NULL,
-            
-            -- Receipt Information
-            receipt_base64 TEXT,
-            receipt_filename VARCHAR(255),
-            receipt_uploaded_at DATETIME,
-            
-            -- Status Tracking
-            status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'approved', 'rejected', 'cancelled', 'completed', 'no_show')),
-            priority_level INTEGER DEFAULT 0,
-            
-            -- Approval Information
-            approved_by INTEGER,
-            approved_at DATETIME,
-            rejection_reason TEXT,
-            
-            -- Competition Tracking
-            is_competitive BOOLEAN DEFAULT FALSE,
-            competing_booking_ids TEXT,
-            competition_resolved BOOLEAN DEFAULT FALSE,
-            
-            -- System Fields
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (facility_id) REFERENCES facilities(id),
-            FOREIGN KEY (time_slot_id) REFERENCES time_slots(id),
-            FOREIGN KEY (approved_by) REFERENCES users(id)
-        )
-    ''')
-    
-    # Create VERIFICATION_REQUESTS table
-    cursor.execute('''
-        CREATE TABLE verification_requests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            request_reference VARCHAR(20) UNIQUE NOT NULL,
-            
-            -- User Information
-            user_id INTEGER NOT NULL,
-            
-            -- Verification Type
-            verification_type VARCHAR(20) NOT NULL,
-            requested_discount_rate DECIMAL(3,2) NOT NULL,
-            
-            -- Document Storage (Base64)
-            user_photo_base64 TEXT,
-            user_photo_filename VARCHAR(255),
-            valid_id_base64 TEXT,
-            valid_id_filename VARCHAR(255),
-            proof_of_residency_base64 TEXT,
-            proof_of_residency_filename VARCHAR(255),
-            
-            -- Additional Documents (JSON)
-            additional_documents TEXT,
-            
-            -- Address Information
-            residential_address TEXT,
-            years_of_residence INTEGER,
-            
-            -- Status Tracking
-            status VARCHAR(30) DEFAULT 'pending' CHECK (status IN ('pending', 'approved', 'rejected', 'requires_additional_info')),
-            
-            -- Review Information
-            reviewed_by INTEGER,
-            reviewed_at DATETIME,
-            approval_notes TEXT,
-            rejection_reason TEXT,
-            
-            -- Follow-up Information
-            additional_info_requested TEXT,
-            additional_info_provided TEXT,
-            
-            -- System Fields
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (reviewed_by) REFERENCES users(id)
-        )
-    ''')
-    
-    # Create BARANGAY_EVENTS table
-    cursor.execute('''
-        CREATE TABLE barangay_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            event_reference VARCHAR(20) UNIQUE NOT NULL,
-            
-            -- Event Details
-            title VARCHAR(255) NOT NULL,
-            description TEXT,
-            event_type VARCHAR(20) DEFAULT 'other',
-            
-            -- Scheduling
-            facility_id INTEGER NOT NULL,
-            start_date DATE NOT NULL,
-            end_date DATE NOT NULL,
-            start_time TIME NOT NULL,
-            end_time TIME NOT NULL,
-            
-            -- Event Configuration
-            is_recurring BOOLEAN DEFAULT FALSE,
-            recurring_pattern TEXT,
-            
-            -- Capacity and Access
-            max_attendees INTEGER,
-            is_public BOOLEAN DEFAULT TRUE,
-            requires_registration BOOLEAN DEFAULT FALSE,
-            
-            -- Event Management
-            organizer_id INTEGER NOT NULL,
-            status VARCHAR(20) DEFAULT 'scheduled',
-            
-            -- Media and Resources
-            event_photo_url TEXT,
-            event_documents TEXT,
-            
-            -- System Fields
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            
-            FOREIGN KEY (facility_id) REFERENCES facilities(id),
-            FOREIGN KEY (organizer_id) REFERENCES users(id)
-        )
-    ''')
-    
-    # Create indexes for performance
-    cursor.execute('CREATE INDEX idx_users_email ON users(email)')
-    cursor.execute('CREATE INDEX idx_users_role ON users(role)')
-    cursor.execute('CREATE INDEX idx_users_verified ON users(verified)')
-    
-    cursor.execute('CREATE INDEX idx_facilities_active ON facilities(is_active)')
-    cursor.execute('CREATE INDEX idx_facilities_name ON facilities(name)')
-    
-    cursor.execute('CREATE INDEX idx_time_slots_facility ON time_slots(facility_id, start_time)')
-    cursor.execute('CREATE INDEX idx_time_slots_active ON time_slots(is_active)')
-    
-    cursor.execute('CREATE INDEX idx_bookings_user_status ON bookings(user_id, status)')
-    cursor.execute('CREATE INDEX idx_bookings_facility_date ON bookings(facility_id, booking_date)')
-    cursor.execute('CREATE INDEX idx_bookings_date_status ON bookings(booking_date, status)')
-    cursor.execute('CREATE INDEX idx_bookings_reference ON bookings(booking_reference)')
-    cursor.execute('CREATE INDEX idx_bookings_competitive ON bookings(is_competitive, competition_resolved)')
-    
-    cursor.execute('CREATE INDEX idx_verification_user_status ON verification_requests(user_id, status)')
-    cursor.execute('CREATE INDEX idx_verification_status ON verification_requests(status)')
-    
-    cursor.execute('CREATE INDEX idx_events_facility_dates ON barangay_events(facility_id, start_date, end_date)')
-    cursor.execute('CREATE INDEX idx_events_status ON barangay_events(status)')
-    
-    conn.commit()
-    conn.close()
-    print("✅ Database initialized with comprehensive schema")
+# Schema is managed by schema_migrations.py; pending migrations are applied at import (WSGI and
+# test clients included), then any columns this server needs that the database lacks are reported.
+REQUIRED_COLUMNS = {
+    'users': ['password_hash', 'is_active', 'last_login', 'profile_photo_url'],
+    'facilities': ['hourly_rate', 'downpayment_rate', 'photos', 'is_active', 'requires_approval',
+                   'booking_window_days', 'min_booking_hours', 'max_booking_hours', 'operating_hours'],
+    'time_slots': ['duration_minutes', 'is_active'],
+    'bookings': ['time_slot_id', 'is_competitive', 'competing_booking_ids', 'competition_resolved'],
+    'verification_requests': ['additional_documents'],
+    'user_sessions': ['user_id', 'session_token', 'is_active', 'expires_at'],
+    'barangay_events': ['event_reference', 'created_at'],
+}
+migrate()
+check_schema(required_columns=REQUIRED_COLUMNS)
 
-# Initialize database on startup
-init_db()
+# Receipt thumbnails and perceptual hashes, computed off the request thread (same as server.py)
+derivatives = DerivativeCache(db_manager, get_blob_store())
+receipt_similarity = ReceiptSimilarityIndex(db_manager, get_blob_store(), derivatives)
 
-# Helper function to get database connection
+# Helper function to get database connection (borrowed from the pool, close() returns it)
 def get_db():
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool().acquire()
 
 # Helper function to generate booking reference
 def generate_booking_reference():
     year = datetime.now().year
-    count = get_db().execute("SELECT COUNT(*) FROM bookings WHERE created_at >= ?", 
-                           (f"{year}-01-01",)).fetchone()[0] + 1
+    with get_pool().connection() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM bookings WHERE created_at >= ?", 
+                             (f"{year}-01-01",)).fetchone()[0] + 1
     return f"BRG-{year}-{count:05d}"
 
 # Helper function to generate verification reference
 def generate_verification_reference():
     year = datetime.now().year
-    count = get_db().execute("SELECT COUNT(*) FROM verification_requests WHERE created_at >= ?", 
-                           (f"{year}-01-01",)).fetchone()[0] + 1
+    with get_pool().connection() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM verification_requests WHERE created_at >= ?", 
+                             (f"{year}-01-01",)).fetchone()[0] + 1
     return f"VRQ-{year}-{count:05d}"
 
 # Helper function to generate event reference
 def generate_event_reference():
     year = datetime.now().year
-    count = get_db().execute("SELECT COUNT(*) FROM barangay_events WHERE created_at >= ?", 
-                           (f"{year}-01-01",)).fetchone()[0] + 1
+    with get_pool().connection() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM barangay_events WHERE created_at >= ?", 
+                             (f"{year}-01-01",)).fetchone()[0] + 1
     return f"EVT-{year}-{count:05d}"
 
 # JWT-like token generation (simplified)
@@ -489,11 +213,17 @@ def get_current_user():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# JSON text columns are decoded, flags returned as booleans
+FACILITY_ROWS = serializers.RowSerializer(
+    booleans=('is_active', 'requires_approval'),
+    json_columns={'amenities': [], 'photos': [], 'operating_hours': {}},
+)
+
 @app.route('/api/facilities', methods=['GET'])
 def get_facilities():
     try:
         conn = get_db()
-        facilities = conn.execute('''
+        result = FACILITY_ROWS.all(conn.execute('''
             SELECT id, name, description, hourly_rate, downpayment_rate, max_capacity,
                    amenities, main_photo_url, photos, is_active, requires_approval,
                    booking_window_days, min_booking_hours, max_booking_hours,
@@ -501,44 +231,10 @@ def get_facilities():
             FROM facilities 
             WHERE is_active = TRUE
             ORDER BY name
-        ''').fetchall()
-        
-        result = []
-        for facility in facilities:
-            fac_data = dict(facility)
-            # Parse JSON fields
-            if fac_data['amenities']:
-                try:
-                    fac_data['amenities'] = json.loads(fac_data['amenities'])
-                except:
-                    fac_data['amenities'] = []
-            else:
-                fac_data['amenities'] = []
-            
-            if fac_data['photos']:
-                try:
-                    fac_data['photos'] = json.loads(fac_data['photos'])
-                except:
-                    fac_data['photos'] = []
-            else:
-                fac_data['photos'] = []
-            
-            if fac_data['operating_hours']:
-                try:
-                    fac_data['operating_hours'] = json.loads(fac_data['operating_hours'])
-                except:
-                    fac_data['operating_hours'] = {}
-            else:
-                fac_data['operating_hours'] = {}
-            
-            # Convert boolean fields
-            fac_data['is_active'] = bool(fac_data['is_active'])
-            fac_data['requires_approval'] = bool(fac_data['requires_approval'])
-            
-            result.append(fac_data)
+        '''))
         
         conn.close()
-        return jsonify({
+        return serializers.json_response({
             'success': True,
             'data': result
         })
@@ -617,6 +313,9 @@ def get_bookings():
             booking_data['is_competitive'] = bool(booking_data['is_competitive'])
             booking_data['competition_resolved'] = bool(booking_data['competition_resolved'])
             
+            # Receipts are downloaded from receipt_url, not inlined in every row
+            _add_receipt_fields(booking_data)
+            
             result.append(booking_data)
         
         conn.close()
@@ -628,6 +327,53 @@ def get_bookings():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _add_receipt_fields(booking_data):
+    """receipt_url/receipt_hash instead of the receipt bytes (external links stay in receipt_base64)"""
+    blob_hash = booking_data.pop('receipt_blob', None)
+    inline_value = booking_data.get('receipt_base64')
+    has_receipt = blob_hash or inline_value
+    booking_data['receipt_hash'] = blob_hash
+    booking_data['receipt_url'] = (
+        f"{request.host_url.rstrip('/')}/api/bookings/{booking_data['id']}/receipt"
+        + (f'?v={blob_hash}' if blob_hash else '')) if has_receipt else None
+    if is_inline_document(inline_value):
+        booking_data['receipt_base64'] = None
+
+@app.route('/api/bookings/<int:booking_id>/receipt', methods=['GET'])
+@token_required
+def get_booking_receipt(booking_id):
+    """Download a booking's receipt (its owner or an official)"""
+    conn = get_db()
+    booking = conn.execute('''
+        SELECT b.user_id, b.receipt_blob, b.receipt_base64, bl.mime_type
+        FROM bookings b
+        LEFT JOIN blobs bl ON bl.hash = b.receipt_blob
+        WHERE b.id = ?
+    ''', (booking_id,)).fetchone()
+    conn.close()
+    
+    if not booking:
+        return jsonify({'error': 'Booking not found'}), 404
+    if request.current_user['role'] != 'official' and booking['user_id'] != request.current_user['user_id']:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    if booking['receipt_blob']:
+        path = get_blob_store().path_for(booking['receipt_blob'])
+        if not os.path.exists(path):
+            return jsonify({'error': 'Receipt file is missing'}), 404
+        # Content-addressed: the hash is a strong ETag
+        return send_file(path, mimetype=booking['mime_type'], conditional=True, etag=booking['receipt_blob'])
+    
+    inline_value = booking['receipt_base64']
+    if inline_value and not is_inline_document(inline_value):
+        return redirect(inline_value)
+    decoded = decode_document(inline_value)
+    if decoded is None:
+        return jsonify({'error': 'Receipt not found'}), 404
+    data, mime_type = decoded
+    return send_file(io.BytesIO(data), mimetype=mime_type, conditional=True,
+                     etag=hashlib.sha256(data).hexdigest())
+
 @app.route('/api/bookings', methods=['POST'])
 @token_required
 def create_booking():
@@ -689,6 +435,12 @@ def create_booking():
         # Create booking
         booking_reference = generate_booking_reference()
         
+        # Receipt bytes go to the blob store; the row only keeps the hash
+        receipt_blob = get_blob_store().store_document(conn, data.get('receipt_base64'))
+        
+        # Integer copies of the date/slot for range queries (the database trigger fills them otherwise)
+        times = time_model.booking_time_fields(data['booking_date'], time_slot['start_time'], time_slot['end_time'])
+        
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO bookings (
@@ -698,9 +450,10 @@ def create_booking():
                 contact_number, contact_address,
                 base_rate, discount_rate, discount_amount,
                 downpayment_amount, total_amount,
-                receipt_base64, receipt_filename, receipt_uploaded_at,
-                status, is_competitive, competing_booking_ids
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                receipt_base64, receipt_blob, receipt_filename, receipt_uploaded_at,
+                status, is_competitive, competing_booking_ids,
+                day_key, start_minute, end_minute
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             booking_reference, user_id, data['facility_id'], data['time_slot_id'],
             data['booking_date'], time_slot['start_time'], time_slot['end_time'], duration_hours,
@@ -708,15 +461,21 @@ def create_booking():
             data.get('contact_number'), data.get('contact_address'),
             base_rate, discount_rate, discount_amount,
             downpayment_amount, total_amount,
-            data.get('receipt_base64'), data.get('receipt_filename'), 
+            None if receipt_blob else data.get('receipt_base64'),  # Only non-base64 values stay inline
+            receipt_blob, data.get('receipt_filename'), 
             datetime.now() if data.get('receipt_base64') else None,
-            'pending', is_competitive, json.dumps(competing_ids) if competing_ids else None
+            'pending', is_competitive, json.dumps(competing_ids) if competing_ids else None,
+            times['day_key'], times['start_minute'], times['end_minute']
         ))
         
         booking_id = cursor.lastrowid
         conn.commit()
         conn.close()
         
+        if receipt_blob:
+            derivatives.schedule(receipt_blob)  # Thumbnail ready before officials open the queue
+            receipt_similarity.schedule(booking_id, receipt_blob)
+        
         return jsonify({
             'success': True,
             'message': 'Booking created successfully',
@@ -728,6 +487,8 @@ def create_booking():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+VERIFICATION_REQUEST_ROWS = serializers.RowSerializer(json_columns={'additional_documents': {}})
+
 @app.route('/api/verification-requests', methods=['GET'])
 @token_required
 def get_verification_requests():
@@ -738,29 +499,15 @@ def get_verification_requests():
             return jsonify({'error': 'Access denied'}), 403
         
         conn = get_db()
-        requests = conn.execute('''
+        result = VERIFICATION_REQUEST_ROWS.all(conn.execute('''
             SELECT vr.*, u.email as user_email, u.full_name as user_name
             FROM verification_requests vr
             JOIN users u ON vr.user_id = u.id
             ORDER BY vr.created_at DESC
-        ''').fetchall()
-        
-        result = []
-        for req in requests:
-            req_data = dict(req)
-            # Parse JSON fields
-            if req_data['additional_documents']:
-                try:
-                    req_data['additional_documents'] = json.loads(req_data['additional_documents'])
-                except:
-                    req_data['additional_documents'] = {}
-            else:
-                req_data['additional_documents'] = {}
-            
-            result.append(req_data)
+        '''))
         
         conn.close()
-        return jsonify({
+        return serializers.json_response({
             'success': True,
             'data': result
         })
@@ -768,6 +515,17 @@ def get_verification_requests():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/db-pool', methods=['GET'])
+@token_required
+def get_db_pool_stats():
+    if request.current_user['role'] != 'official':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify({
+        'success': True,
+        'data': get_pool().stats()
+    })
+
 # Health check endpoint
 @app.route('/health', methods=['GET'])
 def health_check():
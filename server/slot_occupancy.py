@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Slot Occupancy for Barangay Reserve
+One row per facility and day holding the state of every time slot as a
+string of digits, so availability is a primary-key lookup
+
+States follow the facility's time_slots sort order: 0 free, 1 pending,
+2 approved, 3 official, 4 locked (held by a cancelled, completed or no-show
+booking). Triggers (migration 010) delete a row whenever a booking or time
+slot it depends on changes; booking writes rebuild it in the same
+transaction, and reads compute a missing row without storing it so they never
+take the write lock. Free days are stored too, so a date range is answered by
+one primary-key range scan.
+"""
+
+import time_model
+
+FREE, PENDING, APPROVED, OFFICIAL, LOCKED = 0, 1, 2, 3, 4
+STATE_NAMES = ('free', 'pending', 'approved', 'official', 'locked')
+
+# Which state wins when bookings overlap a slot: live bookings over closed ones
+_PRECEDENCE = {FREE: 0, LOCKED: 1, PENDING: 2, APPROVED: 3, OFFICIAL: 4}
+
+# Closed bookings still lock their slots (see _active_bookings) but aren't approved
+_STATUS_STATES = {'pending': PENDING, 'cancelled': LOCKED, 'completed': LOCKED, 'no_show': LOCKED}
+
+# Same role test the official auto-rejection uses for residents
+_IS_RESIDENT = "(u.role = 'resident' OR u.role = '0' OR u.role IS NULL OR u.role LIKE '0.%')"
+
+
+def _booking_state(status, is_resident):
+    if status == 'approved':
+        return APPROVED if is_resident else OFFICIAL
+    return _STATUS_STATES.get(status, LOCKED)  # Unknown status: locked, but not reported as approved
+
+
+def _states(slots, bookings):
+    """Highest state of any booking overlapping each slot; bookings are (start, end, status, is_resident)"""
+    states = [FREE] * len(slots)
+    for start_minute, end_minute, status, is_resident in bookings:
+        state = _booking_state(status, is_resident)
+        for i, (_, slot_start, slot_end, _) in enumerate(slots):
+            if (start_minute < slot_end and slot_start < end_minute
+                    and _PRECEDENCE[state] > _PRECEDENCE[states[i]]):
+                states[i] = state
+    return states
+
+
+def _active_bookings(conn, facility_id, first_day, last_day):
+    """{day_key: [(start, end, status, is_resident)]} with one indexed range query.
+
+    Every booking that isn't rejected locks its slots (cancelled, completed and no_show too),
+    the same rule the string-matching availability check used.
+    """
+    by_day = {}
+    for day, *booking in conn.execute(f'''
+        SELECT b.day_key, b.start_minute, b.end_minute, b.status, {_IS_RESIDENT}
+        FROM bookings b
+        LEFT JOIN users u ON b.user_id = u.id
+        WHERE b.facility_id = ? AND b.day_key BETWEEN ? AND ? AND b.status != 'rejected'
+        AND b.start_minute IS NOT NULL
+    ''', (facility_id, first_day, last_day)):
+        by_day.setdefault(day, []).append(booking)
+    return by_day
+
+
+def compute(conn, facility_id, day_key, slots=None):
+    """Slot states for one facility/day, read from bookings"""
+    slots = time_model.facility_slots(conn, facility_id) if slots is None else slots
+    return _states(slots, _active_bookings(conn, facility_id, day_key, day_key).get(day_key, []))
+
+
+def refresh(conn, facility_id, day_key):
+    """Rebuild and store one facility/day (call inside the booking write transaction)"""
+    if day_key is None:
+        return None
+    return refresh_range(conn, facility_id, [day_key])[day_key]
+
+
+def refresh_range(conn, facility_id, day_keys):
+    """Rebuild and store several days of one facility; free days get a row too"""
+    facility_id = int(facility_id)
+    day_keys = sorted(set(day_keys))
+    if not day_keys:
+        return {}
+    slots = time_model.facility_slots(conn, facility_id)
+    bookings = _active_bookings(conn, facility_id, day_keys[0], day_keys[-1])
+    result = {day: _states(slots, bookings.get(day, [])) for day in day_keys}
+    conn.executemany('''
+        INSERT OR REPLACE INTO slot_occupancy (facility_id, day_key, states, updated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ''', [(facility_id, day, ''.join(map(str, states))) for day, states in result.items()])
+    return result
+
+
+def lookup(conn, facility_id, day_key, slots):
+    """Stored states for these slots, or None when the row is missing or was built for other slots"""
+    row = conn.execute('SELECT states FROM slot_occupancy WHERE facility_id = ? AND day_key = ?',
+                       (facility_id, day_key)).fetchone()
+    if row is None or len(row[0]) != len(slots):
+        return None
+    return [int(c) for c in row[0]]
+
+
+def current(conn, facility_id, day_key, slots):
+    """Stored states for one facility/day, or computed from bookings without writing when missing"""
+    states = lookup(conn, facility_id, day_key, slots)
+    return compute(conn, int(facility_id), day_key, slots) if states is None else states
+
+
+def lookup_range(conn, facility_id, first_day, last_day, slots):
+    """{day_key: states} for the stored rows in [first_day, last_day] that match these slots"""
+    rows = conn.execute('''
+        SELECT day_key, states FROM slot_occupancy
+        WHERE facility_id = ? AND day_key BETWEEN ? AND ?
+    ''', (facility_id, first_day, last_day)).fetchall()
+    return {day: [int(c) for c in states] for day, states in rows if len(states) == len(slots)}
+
+
+def lookup_grid(conn, slots_by_facility, first_day, last_day):
+    """{(facility_id, day_key): states} of the stored rows for several facilities, one query"""
+    facility_ids = list(slots_by_facility)
+    if not facility_ids:
+        return {}
+    rows = conn.execute(f'''
+        SELECT facility_id, day_key, states FROM slot_occupancy
+        WHERE facility_id IN ({', '.join('?' * len(facility_ids))}) AND day_key BETWEEN ? AND ?
+    ''', (*facility_ids, first_day, last_day)).fetchall()
+    return {(facility_id, day): [int(c) for c in states] for facility_id, day, states in rows
+            if len(states) == len(slots_by_facility[facility_id])}
+
+
+def grid_states(conn, slots_by_facility, first_day, last_day):
+    """{(facility_id, day_key): states} for every facility and day without writing"""
+    cells = lookup_grid(conn, slots_by_facility, first_day, last_day)
+    for facility_id, slots in slots_by_facility.items():
+        if all((facility_id, day) in cells for day in range(first_day, last_day + 1)):
+            continue
+        for day, states in states_between(conn, facility_id, slots, first_day, last_day).items():
+            cells[(facility_id, day)] = states
+    return cells
+
+
+def refresh_grid(conn, days_by_facility):
+    """Rebuild {facility_id: [day_key, ...]} in one transaction; returns {(facility_id, day_key): states}"""
+    built = {}
+    for facility_id, day_keys in days_by_facility.items():
+        for day, states in refresh_range(conn, facility_id, day_keys).items():
+            built[(facility_id, day)] = states
+    return built
+
+
+def summarize(states):
+    """'free', 'partial' or 'full' for a calendar cell"""
+    free = states.count(FREE)
+    if states and free == len(states):
+        return 'free'
+    return 'partial' if free else 'full'
+
+
+def states_between(conn, facility_id, slots, first_day, last_day):
+    """{day_key: states} for every day in the range without writing: stored rows where they
+    exist, the rest computed from one bookings query (read paths like conflict suggestions)"""
+    by_day = lookup_range(conn, facility_id, first_day, last_day, slots)
+    missing = [day for day in range(first_day, last_day + 1) if day not in by_day]
+    if missing:
+        bookings = _active_bookings(conn, int(facility_id), missing[0], missing[-1])
+        for day in missing:
+            by_day[day] = _states(slots, bookings.get(day, []))
+    return by_day
+
+
+def free_runs(slots, states, duration=None, not_before=None):
+    """(start_minute, end_minute, label) for each free slot, or for each run of back-to-back
+    free slots that lasts at least duration minutes"""
+    runs = []
+    for i, (_, start_minute, _, label) in enumerate(slots):
+        if not_before is not None and start_minute < not_before:
+            continue
+        for j in range(i, len(slots)):
+            if states[j] != FREE or (j > i and slots[j][1] != slots[j - 1][2]):
+                break  # Taken slot or a gap before the run is long enough
+            end_minute = slots[j][2]
+            if duration is None or end_minute - start_minute >= duration:
+                runs.append((start_minute, end_minute,
+                             label if j == i else time_model.format_timeslot(start_minute, end_minute)))
+                break
+    return runs
+
+
+def next_available(conn, windows, first_day, duration=None, limit=5, not_before=None):
+    """Earliest free slots on or after first_day.
+
+    windows is {facility_id: last_day_key} (each facility's booking window);
+    not_before is a minute of first_day before which nothing is offered (e.g. now).
+    """
+    slots = time_model.slots_by_facility(conn, list(windows))
+    found = []
+    for facility_id, last_day in windows.items():
+        if last_day < first_day or not slots[facility_id]:
+            continue
+        by_day = states_between(conn, facility_id, slots[facility_id], first_day, last_day)
+        taken = 0
+        for day in range(first_day, last_day + 1):
+            for start_minute, end_minute, label in free_runs(
+                    slots[facility_id], by_day[day], duration, not_before if day == first_day else None):
+                found.append((day, start_minute, facility_id, end_minute, label))
+                taken += 1
+            if taken >= limit:
+                break  # Later days of this facility can't beat what it already has
+    found.sort()
+    return [{
+        'facility_id': facility_id,
+        'date': time_model.day_from_key(day),
+        'timeslot': label,
+        'start_minute': start_minute,
+        'end_minute': end_minute,
+    } for day, start_minute, facility_id, end_minute, label in found[:limit]]
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Blob Store Test
+Checks content-addressed storage, reference counting and the inline base64 migration
+"""
+
+import base64
+import io
+import os
+import sqlite3
+import tempfile
+from blob_store import BlobStore, UploadTooLarge, decode_document, migrate_inline_documents
+from schema_migrations import migrate
+
+RECEIPT = 'data:image/png;base64,' + base64.b64encode(b'\x89PNG\r\n\x1a\n' + b'receipt' * 100).decode()
+
+
+def test_dedup_and_refcount():
+    print("🧪 Testing blob dedup and reference counting...")
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'blobs.db')
+    migrate(db_path, verbose=False)
+    store = BlobStore(os.path.join(workdir, 'blobs'))
+
+    conn = sqlite3.connect(db_path)
+    first = store.store_document(conn, RECEIPT)
+    second = store.store_document(conn, RECEIPT)
+    assert first == second
+    assert store.store_document(conn, 'https://example.com/receipt.jpg') is None
+    conn.commit()
+
+    assert conn.execute('SELECT refcount, mime_type FROM blobs WHERE hash = ?', (first,)).fetchone() == (2, 'image/png')
+    assert store.data_url(first) == RECEIPT
+    print("✅ Identical receipts stored once with two references")
+
+    store.release(conn, first)
+    store.release(conn, first)
+    conn.commit()
+    assert store.collect_garbage(conn, grace_seconds=0) == 1
+    assert not store.exists(first)
+    assert conn.execute('SELECT COUNT(*) FROM blobs').fetchone()[0] == 0
+    conn.close()
+    print("✅ Unreferenced blob removed by garbage collection")
+    return True
+
+
+def test_inline_migration():
+    print("🧪 Testing migration of inline base64 documents...")
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'legacy.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    for i, receipt in enumerate([RECEIPT] * 5 + ['not base64!']):
+        conn.execute('''
+            INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                                  end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount,
+                                  receipt_base64)
+            VALUES (?, 1, 1, 0, '2026-01-01', '6:00 AM - 8:00 AM', '6:00 AM - 8:00 AM', 2, '', 0, 0, 0, ?)
+        ''', (f'BR{i}', receipt))
+    conn.commit()
+    conn.close()
+
+    store = BlobStore(os.path.join(workdir, 'blobs'))
+    totals = migrate_inline_documents(db_path, batch_size=2, vacuum=True, store=store, verbose=False)
+    assert totals['moved'] == 5 and totals['skipped'] == 1
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('SELECT COUNT(*) FROM bookings WHERE receipt_base64 IS NULL AND receipt_blob IS NOT NULL').fetchone()[0] == 5
+    assert conn.execute('SELECT refcount FROM blobs').fetchall() == [(5,)]
+    conn.close()
+
+    # Re-running is a no-op for rows that already moved
+    assert migrate_inline_documents(db_path, store=store, verbose=False)['moved'] == 0
+    assert decode_document(RECEIPT)[1] == 'image/png'
+    print("✅ Inline receipts moved to the blob store and deduplicated")
+    return True
+
+
+def test_streamed_upload():
+    print("🧪 Testing streamed uploads...")
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'uploads.db')
+    migrate(db_path, verbose=False)
+    store = BlobStore(os.path.join(workdir, 'blobs'))
+    photo = b'\xff\xd8\xff\xe0' + os.urandom(200 * 1024)
+
+    blob_hash, size, mime_type = store.write_stream(io.BytesIO(photo), max_bytes=len(photo), chunk_size=4096)
+    assert (size, mime_type) == (len(photo), 'image/jpeg')
+    assert store.read_bytes(blob_hash) == photo
+
+    try:
+        store.write_stream(io.BytesIO(photo), max_bytes=1024)
+        assert False, 'oversized upload was accepted'
+    except UploadTooLarge:
+        pass
+    assert os.listdir(os.path.join(store.root, '.incoming')) == []  # Nothing left behind
+    print("✅ Upload hashed in chunks and size limit enforced")
+
+    conn = sqlite3.connect(db_path)
+    store.register_upload(conn, blob_hash, size, mime_type)
+    assert not store.attach(conn, '0' * 64)
+    assert store.attach(conn, blob_hash)
+    conn.commit()
+    assert conn.execute('SELECT refcount FROM blobs WHERE hash = ?', (blob_hash,)).fetchone()[0] == 1
+    assert store.collect_garbage(conn, grace_seconds=3600) == 0  # Recent uploads are kept
+    conn.close()
+    print("✅ Uploaded blob attached by reference")
+    return True
+
+
+if __name__ == "__main__":
+    test_dedup_and_refcount()
+    test_inline_migration()
+    test_streamed_upload()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Booking Change Feed Test
+Checks the change sequence, tombstones and pruning behind /api/bookings/changes
+"""
+
+import os
+import sqlite3
+import tempfile
+import booking_changes
+from schema_migrations import migrate
+
+
+def changed_ids(conn, since):
+    return [row[0] for row in conn.execute(
+        f'SELECT b.id FROM bookings b WHERE {booking_changes.CHANGED_SINCE} ORDER BY b.id', (since,)).fetchall()]
+
+
+def test_change_feed():
+    print("🧪 Testing booking change feed...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'changes.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (1, 'res@x.com', 'Resident One', 'resident')")
+    for reference in ('BR1', 'BR2', 'BR3'):
+        conn.execute('''
+            INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                                  end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount)
+            VALUES (?, 1, 1, 0, '2026-03-10', 'ALL DAY', 'ALL DAY', 24, '', 0, 0, 0)
+        ''', (reference,))
+    cursor = booking_changes.current_cursor(conn)
+    # Opaque and monotonic: the time field trigger's UPDATE advances it too
+    assert cursor >= 3 and changed_ids(conn, 0) == [1, 2, 3]
+    assert changed_ids(conn, cursor) == [] and booking_changes.deleted_since(conn, cursor) == []
+    print("✅ Every insert advances the cursor")
+
+    conn.execute("UPDATE bookings SET status = 'approved' WHERE id = 2")
+    conn.execute('DELETE FROM bookings WHERE id = 3')
+    assert changed_ids(conn, cursor) == [2]
+    assert booking_changes.deleted_since(conn, cursor) == [3]
+    assert changed_ids(conn, booking_changes.current_cursor(conn)) == []
+    print("✅ Updates show up as changes, deletes as tombstones")
+
+    cursor = booking_changes.current_cursor(conn)
+    conn.execute("UPDATE users SET full_name = 'Resident Renamed' WHERE id = 1")
+    assert changed_ids(conn, cursor) == [1, 2]
+    print("✅ Renaming a user re-sends their bookings")
+
+    assert booking_changes.prune_tombstones(conn, days=1) == 0
+    conn.execute("UPDATE booking_tombstones SET deleted_at = datetime('now', '-2 days')")
+    assert booking_changes.prune_tombstones(conn, days=1) == 1
+    assert booking_changes.needs_reset(conn, 1) and not booking_changes.needs_reset(conn, 0)
+    assert not booking_changes.needs_reset(conn, booking_changes.current_cursor(conn))
+    for bad in ('abc', '-1'):
+        try:
+            booking_changes.parse_since(bad)
+            assert False, f"{bad} should be rejected"
+        except ValueError:
+            pass
+    conn.close()
+    print("✅ Cursors older than pruned tombstones must resync")
+    return True
+
+
+if __name__ == "__main__":
+    test_change_feed()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Booking Interval Index Test
+Checks overlap detection for partial slots and ALL DAY, with and without the R*Tree
+"""
+
+import os
+import sqlite3
+import tempfile
+import booking_intervals
+import time_model
+from schema_migrations import migrate
+
+DAY = time_model.day_key('2026-03-10')
+
+
+def add_booking(conn, reference, timeslot, status='pending', facility_id=1, booking_date='2026-03-10'):
+    fields = time_model.booking_time_fields(booking_date, timeslot)
+    cursor = conn.execute('''
+        INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                              end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount,
+                              status, day_key, start_minute, end_minute)
+        VALUES (?, 1, ?, 0, ?, ?, ?, 2, '', 0, 0, 0, ?, ?, ?, ?)
+    ''', (reference, facility_id, booking_date, timeslot, timeslot, status,
+          fields['day_key'], fields['start_minute'], fields['end_minute']))
+    return cursor.lastrowid
+
+
+def check_overlaps(conn):
+    six_to_ten = add_booking(conn, 'BR1', '6:00 AM - 10:00 AM')
+    eight_to_ten = add_booking(conn, 'BR2', '8:00 AM - 10:00 AM', status='approved')
+    ten_to_noon = add_booking(conn, 'BR3', '10:00 AM - 12:00 PM')
+    add_booking(conn, 'BR4', '8:00 AM - 10:00 AM', status='rejected')
+    add_booking(conn, 'BR5', '8:00 AM - 10:00 AM', facility_id=2)
+    add_booking(conn, 'BR6', '8:00 AM - 10:00 AM', booking_date='2026-03-11')
+
+    assert booking_intervals.find_conflicts(conn, 1, DAY, 480, 600) == [six_to_ten, eight_to_ten]
+    assert booking_intervals.find_conflicts(conn, 1, DAY, 360, 480) == [six_to_ten]  # 8 AM end touches, no clash
+    assert booking_intervals.find_conflicts(conn, 1, DAY, 0, 1440) == [six_to_ten, eight_to_ten, ten_to_noon]
+    assert booking_intervals.find_conflicts(conn, 1, DAY, 480, 600, statuses=('pending',),
+                                            exclude_booking_id=six_to_ten) == []
+
+    # Status changes and deletes leave the index
+    conn.execute("UPDATE bookings SET status = 'rejected' WHERE id = ?", (six_to_ten,))
+    conn.execute('DELETE FROM bookings WHERE id = ?', (ten_to_noon,))
+    assert booking_intervals.find_conflicts(conn, 1, DAY, 0, 1440) == [eight_to_ten]
+
+
+def test_rtree_overlaps():
+    print("🧪 Testing R*Tree overlap detection...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'intervals.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    assert booking_intervals.has_rtree(conn)
+    check_overlaps(conn)
+    assert booking_intervals.find_conflicts(conn, 1, DAY, 0, 1440) == [2]
+    assert booking_intervals.rebuild(conn) == 3  # BR2, BR5, BR6 are the active bookings left
+    conn.close()
+    print("✅ Partial and ALL DAY overlaps found; rejected and deleted bookings drop out")
+    return True
+
+
+def test_fallback_overlaps():
+    print("🧪 Testing overlap detection without the R*Tree...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'intervals_fallback.db')
+    migrate(db_path, target=8, verbose=False)
+    conn = sqlite3.connect(db_path)
+    assert not booking_intervals.has_rtree(conn)
+    check_overlaps(conn)
+    conn.close()
+    print("✅ Minutes index gives the same answers")
+    return True
+
+
+if __name__ == "__main__":
+    test_rtree_overlaps()
+    test_fallback_overlaps()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Booking Projection Test
+Checks that resident masking happens in SQL
+"""
+
+import os
+import sqlite3
+import tempfile
+import booking_projection
+from schema_migrations import migrate
+
+
+def test_sql_masking():
+    print("🧪 Testing SQL-side privacy projection...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'projection.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (1, 'Res@x.com', 'Resident One', 'resident')")
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (2, 'official@barangay.gov', 'Official', 'official')")
+    for reference, user_id in (('BR1', 1), ('BR2', 2)):
+        conn.execute('''
+            INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                                  end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount,
+                                  contact_number, receipt_base64)
+            VALUES (?, ?, 1, 0, '2026-03-10', 'ALL DAY', 'ALL DAY', 24, 'Secret party', 0, 0, 0, '0917', 'data:...')
+        ''', (reference, user_id))
+
+    sql, params = booking_projection.listing_query(conn, ['b.facility_id = ?'], [1], viewer_email='res@X.com ', masked=True,
+                                                   order_by='b.id')
+    own, other = booking_projection.fetch(conn, sql, params)
+    assert (own['purpose'], own['contact_number'], own['receipt_base64'], own['user_email']) == \
+        ('Secret party', '0917', 'data:...', 'Res@x.com')
+    assert own['is_official_booking'] is None
+    assert (other['purpose'], other['contact_number'], other['receipt_base64'], other['full_name'], other['user_email']) == \
+        ('Private Booking', 'private', None, 'Reserved', 'private')
+    assert other['is_official_booking'] is True
+    print("✅ Only the caller's own booking keeps its details")
+
+    sql, params = booking_projection.listing_query(conn, masked=True, order_by='b.id')
+    assert all(row['purpose'] == 'Private Booking' for row in booking_projection.fetch(conn, sql, params))
+    sql, params = booking_projection.listing_query(conn, order_by='b.id')
+    rows = booking_projection.fetch(conn, sql, params)
+    assert [row['purpose'] for row in rows] == ['Secret party', 'Secret party'] and 'is_official_booking' not in rows[0]
+    conn.close()
+    print("✅ Shared calendar rows are all masked, official listings are not")
+    return True
+
+
+def test_field_projection():
+    print("🧪 Testing ?fields= / ?view= projection...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'fields.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (1, 'res@x.com', 'Resident One', 'resident')")
+    conn.execute('''
+        INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                              end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount,
+                              receipt_base64)
+        VALUES ('BR1', 1, 1, 0, '2026-03-10', 'ALL DAY', 'ALL DAY', 24, 'Party', 0, 0, 0, 'data:...')
+    ''')
+
+    assert booking_projection.resolve_fields(conn) is None
+    assert booking_projection.resolve_fields(conn, view='detail') is None
+    assert booking_projection.resolve_fields(conn, 'status, booking_date') == ('id', 'status', 'booking_date')
+    assert booking_projection.resolve_fields(conn, view='calendar') == booking_projection.VIEWS['calendar']
+    for bad in (('password', None), ('receipt_blob', None), (None, 'everything')):
+        try:
+            booking_projection.resolve_fields(conn, *bad)
+            assert False, f"{bad} should be rejected"
+        except ValueError:
+            pass
+    print("✅ Fields and views resolve against the whitelist")
+
+    fields = booking_projection.resolve_fields(conn, 'status,facility_name')
+    sql, params = booking_projection.listing_query(conn, fields=fields)
+    assert 'receipt_base64' not in sql and 'purpose' not in sql and 'f.name' in sql
+    rows = booking_projection.project(booking_projection.fetch(conn, sql, params), fields)
+    assert rows == [{'id': 1, 'status': 'pending', 'facility_name': None}]
+
+    # Receipt links only need to know an inline receipt exists, not read it
+    fields = booking_projection.resolve_fields(conn, 'receipt_url')
+    sql, params = booking_projection.listing_query(conn, viewer_email='other@x.com', masked=True, fields=fields)
+    assert 'b.receipt_base64 AS' not in sql and 'b.receipt_blob' in sql
+    row, = booking_projection.fetch(conn, sql, params)
+    assert row['has_inline_receipt'] == 0
+    sql, params = booking_projection.listing_query(conn, fields=fields)
+    row, = booking_projection.fetch(conn, sql, params)
+    assert row['has_inline_receipt'] == 1
+    conn.close()
+    print("✅ Only the columns the requested fields need are selected")
+    return True
+
+
+if __name__ == "__main__":
+    test_sql_masking()
+    test_field_projection()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Masked Calendar Cache Test
+Checks the per-user merge and trigger-driven invalidation
+"""
+
+import os
+import sqlite3
+import tempfile
+import calendar_cache
+from schema_migrations import migrate
+
+
+def add_booking(conn, reference, user_id, date='2026-03-10', day_key=20522):
+    cursor = conn.execute('''
+        INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                              end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount, day_key)
+        VALUES (?, ?, 1, 0, ?, 'ALL DAY', 'ALL DAY', 24, 'party', 0, 0, 0, ?)
+    ''', (reference, user_id, date, day_key))
+    return cursor.lastrowid
+
+
+def test_merge_own():
+    print("🧪 Testing calendar merge...")
+
+    row = calendar_cache.without_receipt({'id': 1, 'receipt_blob': None, 'receipt_base64': None})
+    assert 'receipt_blob' not in row and row['receipt_url'] is None
+
+    merged = calendar_cache.merge_own([{'id': 1, 'mine': False}, {'id': 2, 'mine': False}],
+                                      [{'id': 2, 'mine': True}, {'id': 3, 'mine': True}])
+    assert [(row['id'], row['mine']) for row in merged] == [(1, False), (2, True), (3, True)]
+    print("✅ The caller's bookings are swapped into the shared list")
+    return True
+
+
+def test_cache_invalidation():
+    print("🧪 Testing calendar cache invalidation...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'calendar.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (1, 'r@x.com', 'R', 'resident')")
+    add_booking(conn, 'BR1', 1)
+
+    builds = []
+
+    def build(conn):
+        builds.append(1)
+        return [dict(row) for row in conn.execute("SELECT * FROM bookings WHERE facility_id = 1 AND booking_date = '2026-03-10'")]
+
+    cache = calendar_cache.MaskedCalendarCache(max_entries=2)
+    assert len(cache.get(conn, '1', '2026-03-10', build)) == 1
+    assert len(cache.get(conn, '1', '2026-03-10', build)) == 1
+    assert len(builds) == 1
+    print("✅ Second request is a cache hit")
+
+    add_booking(conn, 'BR2', 1, date='2026-03-11', day_key=20523)  # Another day: still valid
+    cache.get(conn, '1', '2026-03-10', build)
+    assert len(builds) == 1
+    add_booking(conn, 'BR3', 1)
+    assert len(cache.get(conn, '1', '2026-03-10', build)) == 2
+    conn.execute("UPDATE users SET full_name = 'Renamed' WHERE id = 1")
+    cache.get(conn, '1', '2026-03-10', build)
+    assert len(builds) == 3
+    print("✅ Booking writes on that day and user edits invalidate the entry")
+
+    cache.get(conn, None, None, build)
+    cache.get(conn, '1', '2026-03-11', build)
+    assert cache.stats()['entries'] == 2
+    conn.close()
+    print("✅ Entries are bounded (LRU)")
+    return True
+
+
+if __name__ == "__main__":
+    test_merge_own()
+    test_cache_invalidation()
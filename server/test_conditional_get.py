@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Conditional GET Test
+Checks that table counters drive ETags and that unchanged tables answer 304
+"""
+
+import os
+import sqlite3
+import tempfile
+from flask import Flask, jsonify
+import conditional_get
+from database_manager import DatabaseManager
+from schema_migrations import migrate
+
+
+def test_conditional_get():
+    print("🧪 Testing conditional GET...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'conditional.db')
+    migrate(db_path, verbose=False)
+    manager = DatabaseManager(db_path)
+    calls = []
+
+    app = Flask(__name__)
+
+    @app.route('/facilities')
+    @conditional_get.depends_on('facilities', manager=manager)
+    def facilities():
+        calls.append('facilities')
+        return jsonify({'success': True, 'data': []})
+
+    @app.route('/missing')
+    @conditional_get.depends_on('facilities', manager=manager)
+    def missing():
+        return jsonify({'success': False}), 404
+
+    client = app.test_client()
+    first = client.get('/facilities')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/')
+    assert 'Last-Modified' not in first.headers and 'no-cache' in first.headers['Cache-Control']
+
+    again = client.get('/facilities', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b'' and again.headers['ETag'] == etag
+    assert calls == ['facilities']
+    print("✅ Matching If-None-Match returns 304 without running the view")
+
+    other = client.get('/facilities?active=1', headers={'If-None-Match': etag})
+    assert other.status_code == 200 and other.headers['ETag'] != etag
+    print("✅ ETags are per URL")
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO facilities (name, hourly_rate) VALUES ('Covered Court', 200)")
+    conn.commit()
+    conn.close()
+    changed = client.get('/facilities', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    print("✅ Writing a declared table changes the ETag")
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (email, full_name, role) VALUES ('res@x.com', 'Resident One', 'resident')")
+    conn.commit()
+    conn.close()
+    fresh = changed.headers['ETag']
+    assert client.get('/facilities', headers={'If-None-Match': fresh}).status_code == 304
+    print("✅ Writes to other tables keep the ETag")
+
+    # Date validators are second-granular, so they never produce a 304 on their own
+    dated = client.get('/facilities', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert dated.status_code == 200
+    print("✅ If-Modified-Since alone is answered in full")
+
+    error = client.get('/missing')
+    assert error.status_code == 404 and 'ETag' not in error.headers
+    print("✅ Errors are not given validators")
+    return True
+
+
+if __name__ == "__main__":
+    test_conditional_get()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Database Manager Test
+Checks that reads run alongside the single writer and that writes roll back cleanly
+"""
+
+import os
+import tempfile
+import threading
+from database_manager import DatabaseManager, WriteRollback
+
+
+def test_readers_and_writer():
+    print("🧪 Testing concurrent reader / single writer mode...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'manager_test.db')
+    manager = DatabaseManager(db_path)
+
+    with manager.write_connection() as conn:
+        conn.execute('CREATE TABLE bookings (id INTEGER PRIMARY KEY, status TEXT)')
+        conn.execute("INSERT INTO bookings (status) VALUES ('pending')")
+
+    # A reader is not blocked while the writer holds its transaction open
+    writer_holding = threading.Event()
+    reader_done = threading.Event()
+
+    def slow_write():
+        with manager.write_connection() as conn:
+            conn.execute("UPDATE bookings SET status = 'approved'")
+            writer_holding.set()
+            reader_done.wait(timeout=5)
+
+    writer = threading.Thread(target=slow_write)
+    writer.start()
+    writer_holding.wait(timeout=5)
+    with manager.read_connection() as conn:
+        status = conn.execute('SELECT status FROM bookings WHERE id = 1').fetchone()[0]
+    reader_done.set()
+    writer.join()
+    assert status == 'pending'  # Reader sees the last committed snapshot
+    print("✅ Reader ran while the writer held the lock")
+
+    # WriteRollback discards the changes but still returns a result
+    def reject_write(conn):
+        conn.execute("UPDATE bookings SET status = 'rejected'")
+        raise WriteRollback(({'success': False}, 409))
+
+    result = manager.run_write(reject_write)
+    assert result == ({'success': False}, 409)
+    with manager.read_connection() as conn:
+        assert conn.execute('SELECT status FROM bookings').fetchone()[0] == 'approved'
+    print("✅ WriteRollback rolled back and returned its result")
+
+    stats = manager.stats()
+    print(f"📊 Manager stats: {stats}")
+    assert stats['writes'] == 3
+    assert stats['rollbacks'] == 1
+    assert stats['writer_lock_hold_ms_max'] > 0
+
+    manager.close()
+    return True
+
+
+if __name__ == "__main__":
+    test_readers_and_writer()
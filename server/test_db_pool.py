@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Connection Pool Test
+Checks that pooled connections are reused, pre-configured and counted
+"""
+
+import os
+import tempfile
+import threading
+from db_pool import ConnectionPool
+
+
+def test_connection_pool():
+    print("🧪 Testing SQLite connection pool...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'pool_test.db')
+    pool = ConnectionPool(db_path, max_size=2, timeout=1)
+
+    # First acquire is a miss, second (after release) is a hit on the same connection
+    conn = pool.acquire()
+    raw = conn._conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA temp_store').fetchone()[0] == 2  # MEMORY
+    assert conn.execute('PRAGMA busy_timeout').fetchone()[0] > 0
+    conn.close()
+
+    conn = pool.acquire()
+    assert conn._conn is raw
+    conn.close()
+    print("✅ Connections are reused and configured once")
+
+    # Uncommitted work is rolled back when a connection goes back to the pool
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)')
+        conn.commit()
+        conn.execute("INSERT INTO items (name) VALUES ('draft')")
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+    print("✅ Uncommitted work is discarded on release")
+
+    # A third borrower waits for one of the two connections to be returned
+    first, second = pool.acquire(), pool.acquire()
+    threading.Timer(0.05, first.close).start()
+    third = pool.acquire()
+    third.close()
+    second.close()
+
+    stats = pool.stats()
+    print(f"📊 Pool stats: {stats}")
+    assert stats['misses'] == 2
+    assert stats['waits'] == 1
+    assert stats['in_use'] == 0
+    assert stats['idle'] == 2
+    print("✅ Hit/miss/wait metrics recorded")
+
+    pool.close_all()
+    return True
+
+
+if __name__ == "__main__":
+    test_connection_pool()
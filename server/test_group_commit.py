@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Group-Commit Writer Test
+Checks that queued writes are batched and each caller gets its own result or error
+"""
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import TimeoutError
+from database_manager import DatabaseManager, WriteRollback
+from group_commit import GroupCommitWriter
+
+
+def insert_booking(conn, slot):
+    if slot == 'taken':
+        raise WriteRollback(({'success': False, 'error_type': 'duplicate_user_booking'}, 409))
+    if slot is None:
+        raise ValueError('timeslot is required')
+    cursor = conn.execute('INSERT INTO bookings (start_time) VALUES (?)', (slot,))
+    return {'success': True, 'booking_id': cursor.lastrowid}, 200
+
+
+def test_group_commit():
+    print("🧪 Testing group-commit writer...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'group_commit_test.db')
+    manager = DatabaseManager(db_path)
+    with manager.write_connection() as conn:
+        conn.execute('CREATE TABLE bookings (id INTEGER PRIMARY KEY, start_time TEXT)')
+
+    writer = GroupCommitWriter(manager, max_batch_size=10, flush_interval_ms=50)
+    slots = ['6:00 AM - 8:00 AM', 'taken', None, '8:00 AM - 10:00 AM', '10:00 AM - 12:00 PM']
+    futures = [writer.submit(insert_booking, slot) for slot in slots]
+
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result(timeout=5))
+        except ValueError as e:
+            results.append(str(e))
+    writer.stop()
+
+    print(f"📋 Results: {results}")
+    assert results[0] == ({'success': True, 'booking_id': 1}, 200)
+    assert results[1][1] == 409
+    assert results[2] == 'timeslot is required'
+    assert results[3][0]['booking_id'] == 2
+
+    with manager.read_connection() as conn:
+        count = conn.execute('SELECT COUNT(*) FROM bookings').fetchone()[0]
+    assert count == 3
+    print("✅ Failed operations were isolated from the rest of the batch")
+
+    stats = writer.stats()
+    print(f"📊 Group-commit stats: {stats}")
+    assert stats['batches'] == 1
+    assert stats['operations'] == 5
+    assert stats['max_batch_seen'] == 5
+    print("✅ All writes committed in one batch")
+
+    manager.close()
+    return True
+
+
+def test_timeout_cancels_queued_write():
+    print("🧪 Testing that a timed-out write never commits...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'group_commit_timeout.db')
+    manager = DatabaseManager(db_path)
+    with manager.write_connection() as conn:
+        conn.execute('CREATE TABLE bookings (id INTEGER PRIMARY KEY, start_time TEXT)')
+
+    release = threading.Event()
+
+    def slow_booking(conn, slot):
+        release.wait(5)
+        return insert_booking(conn, slot)
+
+    writer = GroupCommitWriter(manager, max_batch_size=1, flush_interval_ms=0)
+    blocking = writer.submit(slow_booking, '6:00 AM - 8:00 AM')
+    time.sleep(0.1)  # The writer is now inside the first batch
+
+    try:
+        writer.run(insert_booking, '8:00 AM - 10:00 AM', timeout=0.1)
+        assert False, 'expected a timeout'
+    except TimeoutError:
+        pass
+    release.set()
+    assert blocking.result(timeout=5)[1] == 200
+    print("✅ A queued write times out while the writer is busy")
+
+    # Already running when the caller's timeout expires: the caller gets the committed result
+    release.clear()
+    threading.Timer(0.3, release.set).start()
+    assert writer.run(slow_booking, '10:00 AM - 12:00 PM', timeout=0.1)[1] == 200
+    writer.stop()
+
+    with manager.read_connection() as conn:
+        slots = [row[0] for row in conn.execute('SELECT start_time FROM bookings ORDER BY id')]
+    assert slots == ['6:00 AM - 8:00 AM', '10:00 AM - 12:00 PM'], slots
+    assert writer.stats()['cancelled'] == 1
+    print("✅ The cancelled write was skipped; a running one still reports its result")
+
+    manager.close()
+    return True
+
+
+if __name__ == "__main__":
+    test_group_commit()
+    test_timeout_cancels_queued_write()
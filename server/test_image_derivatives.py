@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Image Derivatives Test
+Checks that thumbnails and previews are rendered in the process pool and cached as blobs
+"""
+
+import io
+import os
+import sqlite3
+import tempfile
+import time
+from PIL import Image
+from blob_store import BlobStore
+from database_manager import DatabaseManager
+from image_derivatives import DerivativeCache
+from schema_migrations import migrate
+
+
+def wait_for(cache, generated, timeout=10, stat='generated'):
+    deadline = time.time() + timeout
+    while cache.stats()[stat] < generated and time.time() < deadline:
+        time.sleep(0.05)
+
+
+def test_image_derivatives():
+    print("🧪 Testing thumbnail and preview generation...")
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'derivatives.db')
+    migrate(db_path, verbose=False)
+    store = BlobStore(os.path.join(workdir, 'blobs'))
+    manager = DatabaseManager(db_path)
+    cache = DerivativeCache(manager, store, max_workers=1, queue_limit=4)
+
+    photo = io.BytesIO()
+    Image.new('RGB', (3000, 2000), (20, 120, 200)).save(photo, 'JPEG')
+    conn = sqlite3.connect(db_path)
+    source_hash = store.put(conn, photo.getvalue())
+    conn.commit()
+
+    assert cache.schedule(source_hash) == 2
+    assert cache.schedule(source_hash) == 0  # Already in flight
+    wait_for(cache, 2)
+
+    thumb = cache.lookup(conn, source_hash, 'thumb')
+    preview = cache.lookup(conn, source_hash, 'preview')
+    assert Image.open(io.BytesIO(store.read_bytes(thumb))).size == (160, 107)
+    assert Image.open(io.BytesIO(store.read_bytes(preview))).size == (800, 533)
+    print(f"✅ Thumbnail {len(store.read_bytes(thumb))} bytes, preview {len(store.read_bytes(preview))} bytes")
+
+    # Non-images are never queued
+    assert cache.schedule(store.put(conn, b'%PDF-1.4'), mime_type='application/pdf') == 0
+
+    conn.close()
+    cache.shutdown()
+    manager.close()
+    return True
+
+
+def test_failed_derivatives_retry():
+    print("🧪 Testing that failed renders are retried after a while...")
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'derivatives_retry.db')
+    migrate(db_path, verbose=False)
+    store = BlobStore(os.path.join(workdir, 'blobs'))
+    manager = DatabaseManager(db_path)
+    cache = DerivativeCache(manager, store, max_workers=1, queue_limit=4, retry_seconds=60)
+
+    conn = sqlite3.connect(db_path)
+    broken_hash = store.put(conn, b'not really a jpeg')
+    conn.commit()
+
+    assert cache.schedule(broken_hash, variants=('thumb',)) == 1
+    wait_for(cache, 1, stat='failed')
+    assert cache.stats()['failed'] == 1
+    assert cache.schedule(broken_hash, variants=('thumb',)) == 0  # Inside the retry window
+    print("✅ A failed render isn't retried on every request")
+
+    cache.retry_seconds = 0
+    assert cache.schedule(broken_hash, variants=('thumb',)) == 1
+    wait_for(cache, 2, stat='failed')
+    assert cache.stats()['failed'] == 2
+    print("✅ Once the retry window passes the variant is rendered again")
+
+    conn.close()
+    cache.shutdown()
+    manager.close()
+    return True
+
+
+if __name__ == "__main__":
+    test_image_derivatives()
+    test_failed_derivatives_retry()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Index Advisor Test
+Checks that full scans in the hot queries are flagged and fixed by the recommended indexes
+"""
+
+import os
+import tempfile
+import index_advisor
+from schema_migrations import migrate
+
+
+def test_index_advisor():
+    print("🧪 Testing hot-query index advisor...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'advisor.db')
+    migrate(db_path, target=2, verbose=False)  # Schema before the hot query indexes
+
+    report = index_advisor.run(db_path)
+    assert report['full_scan_count'] > 0
+    assert len(report['missing_indexes']) == len(index_advisor.RECOMMENDED_INDEXES)
+    print(f"⚠️  {report['full_scan_count']} hot queries scan whole tables without indexes")
+
+    report = index_advisor.run(db_path, apply=True)
+    assert sorted(report['created_indexes']) == sorted(index_advisor.RECOMMENDED_INDEXES)
+    assert report['full_scan_count'] == 0
+    assert report['missing_indexes'] == []
+    print("✅ Recommended indexes remove every full scan")
+
+    # The migrated schema already ships the same indexes
+    db_path = os.path.join(tempfile.mkdtemp(), 'advisor_latest.db')
+    migrate(db_path, verbose=False)
+    assert index_advisor.run(db_path)['full_scan_count'] == 0
+    print("✅ Latest schema has no full scans on hot queries")
+    return True
+
+
+if __name__ == "__main__":
+    test_index_advisor()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Keyset Pagination Test
+Checks that walking every page returns each row exactly once, in order
+"""
+
+import random
+import sqlite3
+import pagination
+from pagination import SortKey
+
+
+def test_keyset_pages():
+    print("🧪 Testing keyset pagination...")
+
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('CREATE TABLE b (id INTEGER PRIMARY KEY, booking_date TEXT NOT NULL, start_minute INTEGER)')
+    rng = random.Random(12)
+    conn.executemany('INSERT INTO b (booking_date, start_minute) VALUES (?, ?)', [
+        (f'2026-03-{rng.randint(1, 4):02d}', rng.choice([None, 360, 480, 600]))
+        for _ in range(60)
+    ])
+    sort_keys = [SortKey('booking_date', 'DESC', False), SortKey('start_minute', 'ASC', True), SortKey('id', 'ASC', False)]
+    expected = [row['id'] for row in conn.execute(f'SELECT id FROM b ORDER BY {pagination.order_by(sort_keys)}')]
+
+    for limit in (1, 7, 60, 100):
+        seen, token = [], None
+        while True:
+            page = pagination.page_request({'limit': str(limit), 'cursor': token} if token else {'limit': str(limit)},
+                                           sort_keys)
+            where, params = '', []
+            if page.after is not None:
+                where, params = pagination.keyset_condition(sort_keys, page.after)
+                where = f'WHERE {where}'
+            rows = [dict(row) for row in conn.execute(
+                f'SELECT * FROM b {where} ORDER BY {pagination.order_by(sort_keys)} LIMIT ?', params + [limit + 1])]
+            rows, token = pagination.next_cursor(
+                rows, limit, lambda row: (row['booking_date'], row['start_minute'], row['id']))
+            seen.extend(row['id'] for row in rows)
+            if token is None:
+                break
+        assert seen == expected, f"limit={limit}"
+    print("✅ Every page size walks the whole listing once, NULL minutes included")
+
+    for args in ({'limit': 'ten'}, {'limit': '0'}, {'cursor': 'not-a-cursor'}, {'cursor': pagination.encode_cursor([1])}):
+        try:
+            pagination.page_request(args, sort_keys)
+            assert False, f"{args} should be rejected"
+        except ValueError:
+            pass
+    assert pagination.page_request({}, sort_keys) is None
+    assert pagination.page_request({'limit': '100000'}, sort_keys).limit == pagination.Config.PAGE_SIZE_MAX
+    conn.close()
+    print("✅ Bad limits and cursors are rejected, limit is capped")
+    return True
+
+
+if __name__ == "__main__":
+    test_keyset_pages()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Duplicate Receipt Test
+Checks that receipt_hashes follows bookings and flags reused receipts
+"""
+
+import os
+import sqlite3
+import tempfile
+import receipt_checks
+from schema_migrations import migrate
+
+
+def add_booking(conn, reference, user_id, receipt_blob):
+    cursor = conn.execute('''
+        INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                              end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount,
+                              receipt_blob)
+        VALUES (?, ?, 1, 0, '2026-01-01', '6:00 AM - 8:00 AM', '6:00 AM - 8:00 AM', 2, '', 0, 0, 0, ?)
+    ''', (reference, user_id, receipt_blob))
+    return cursor.lastrowid
+
+
+def test_duplicate_receipts():
+    print("🧪 Testing duplicate receipt detection...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'receipts.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+
+    first = add_booking(conn, 'BR1', 1, 'a' * 64)
+    assert receipt_checks.duplicate_bookings(conn, 'a' * 64, exclude_booking_id=first) == []
+    second = add_booking(conn, 'BR2', 2, 'a' * 64)
+    third = add_booking(conn, 'BR3', 2, 'b' * 64)
+    add_booking(conn, 'BR4', 3, None)
+    assert receipt_checks.duplicate_bookings(conn, 'a' * 64, exclude_booking_id=second) == [first]
+    print("✅ Reused receipt found with one indexed lookup")
+
+    bookings = [{'id': first, 'receipt_blob': 'a' * 64}, {'id': third, 'receipt_blob': 'b' * 64}]
+    receipt_checks.flag_duplicates(conn, bookings)
+    assert bookings[0]['duplicate_receipt'] and bookings[0]['duplicate_receipt_booking_ids'] == [second]
+    assert not bookings[1]['duplicate_receipt']
+
+    # Triggers keep the index in step with updates and deletes
+    conn.execute('UPDATE bookings SET receipt_blob = ? WHERE id = ?', ('b' * 64, second))
+    assert receipt_checks.duplicate_bookings(conn, 'a' * 64) == [first]
+    conn.execute('DELETE FROM bookings WHERE id = ?', (third,))
+    assert receipt_checks.duplicate_bookings(conn, 'b' * 64) == [second]
+    conn.close()
+    print("✅ Official view flags duplicates and the index follows booking changes")
+    return True
+
+
+if __name__ == "__main__":
+    test_duplicate_receipts()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Receipt Test
+Checks perceptual hashes against edited copies and the BK-tree against a linear scan
+"""
+
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from PIL import Image, ImageDraw
+from blob_store import BlobStore
+from database_manager import DatabaseManager
+from image_derivatives import DerivativeCache
+from receipt_similarity import (BKTree, ReceiptSimilarityIndex, average_hash, difference_hash, hamming,
+                                perceptual_hash, to_signed, to_unsigned)
+from schema_migrations import migrate
+
+
+def make_receipt(seed):
+    rng = random.Random(seed)
+    image = Image.new('RGB', (600, 1000), 'white')
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randint(0, 550), rng.randint(0, 950)
+        draw.rectangle([x, y, x + rng.randint(10, 200), y + rng.randint(5, 40)], fill=(rng.randint(0, 255),) * 3)
+    return image
+
+
+def recompress(image, quality):
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=quality)
+    return Image.open(io.BytesIO(output.getvalue()))
+
+
+def test_perceptual_hashes():
+    print("🧪 Testing perceptual hashes on edited receipts...")
+
+    original = make_receipt(1)
+    edited = recompress(original.crop((12, 12, 588, 988)), quality=50)
+    other = make_receipt(2)
+
+    for name, hash_fn in (('aHash', average_hash), ('dHash', difference_hash), ('pHash', perceptual_hash)):
+        near = hamming(hash_fn(original), hash_fn(edited))
+        far = hamming(hash_fn(original), hash_fn(other))
+        print(f"📊 {name}: edited copy {near} bits, different receipt {far} bits")
+        assert near < far
+
+    assert hamming(perceptual_hash(original), perceptual_hash(edited)) <= 10
+    value = perceptual_hash(original)
+    assert to_unsigned(to_signed(value)) == value
+    print("✅ Cropped and re-compressed copy stays within the default threshold")
+    return True
+
+
+def test_bk_tree():
+    print("🧪 Testing BK-tree search...")
+
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(2000)]
+    tree = BKTree()
+    for item, value in enumerate(values):
+        tree.add(value, item)
+    assert len(tree) == len(values)
+
+    for query in values[:20]:
+        expected = sorted((hamming(query, v), i) for i, v in enumerate(values) if hamming(query, v) <= 20)
+        assert sorted(tree.search(query, 20)) == expected
+    print("✅ BK-tree returns the same matches as a linear scan")
+    return True
+
+
+def test_similarity_index():
+    print("🧪 Testing the receipt similarity index refresh and backlog...")
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'similarity.db')
+    migrate(db_path, verbose=False)
+    manager = DatabaseManager(db_path)
+    index = ReceiptSimilarityIndex(manager, None)
+
+    def save(booking_id, phash):
+        with manager.write_connection() as conn:
+            index._save(conn, booking_id, f'hash{booking_id}', (0, 0, phash))
+
+    def similar(booking_id):
+        with manager.read_connection() as conn:
+            return index.similar(conn, booking_id, k=None, max_distance=2)
+
+    save(11, 0b1111)
+    assert similar(11) == []
+    save(10, 0b1110)  # Finished after booking 11 was already loaded
+    assert similar(11) == [(1, 10)]
+    print("✅ Hashes saved out of booking order are still picked up")
+
+    # Only earlier receipts count: the original isn't a duplicate of its later copy
+    assert similar(10) == []
+    save(13, 0b1111)
+    assert similar(10) == [] and similar(13) == [(0, 11), (1, 10)]
+    with manager.write_connection() as conn:
+        conn.execute('DELETE FROM receipt_phashes WHERE booking_id = 13')
+    print("✅ A later near-duplicate isn't reported against the original")
+
+    save(10, 0b1111 << 40)  # Re-hashed: replaced with a distant value
+    assert similar(11) == [] and similar(10) == []
+    save(12, 0b0111)
+    with manager.write_connection() as conn:
+        conn.execute('DELETE FROM receipt_phashes WHERE booking_id = 12')
+    assert similar(11) == [] and similar(12) is None
+    print("✅ Replaced and deleted rows leave the tree")
+
+    store = BlobStore(os.path.join(workdir, 'blobs'))
+    workers = DerivativeCache(manager, store, max_workers=1, queue_limit=1)
+    index = ReceiptSimilarityIndex(manager, store, workers)
+    conn = sqlite3.connect(db_path)
+    for booking_id in (21, 22, 23):
+        image = io.BytesIO()
+        make_receipt(booking_id).save(image, 'PNG')
+        receipt_hash = store.put(conn, image.getvalue())
+        conn.commit()
+        assert index.schedule(booking_id, receipt_hash)
+    assert index.stats()['backlog'] >= 1  # Only one job fits in the pool at a time
+    deadline = time.time() + 20
+    while conn.execute('SELECT COUNT(*) FROM receipt_phashes WHERE booking_id > 20').fetchone()[0] < 3:
+        assert time.time() < deadline, "backlogged receipts were never hashed"
+        time.sleep(0.05)
+    assert index.stats()['backlog'] == 0
+    conn.close()
+    workers.shutdown()
+    manager.close()
+    print("✅ Receipts that found the pool busy are hashed once it frees up")
+    return True
+
+
+if __name__ == "__main__":
+    test_perceptual_hashes()
+    test_bk_tree()
+    test_similarity_index()
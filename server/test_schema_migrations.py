@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Schema Migration Test
+Checks that migrations are versioned, idempotent and upgrade legacy databases
+"""
+
+import os
+import sqlite3
+import tempfile
+from schema_migrations import LATEST_VERSION, check_schema, get_schema_version, migrate, schema_drift
+
+
+def test_fresh_database():
+    print("🧪 Testing migrations on a fresh database...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'fresh.db')
+    assert check_schema(db_path)['version'] == 0
+
+    applied = migrate(db_path, verbose=False)
+    assert applied == list(range(1, LATEST_VERSION + 1))
+    assert migrate(db_path, verbose=False) == []  # Second run is a no-op
+
+    conn = sqlite3.connect(db_path)
+    assert get_schema_version(conn) == LATEST_VERSION
+    assert schema_drift(conn) == {}
+    conn.close()
+
+    assert check_schema(db_path)['up_to_date']
+    print("✅ Fresh database migrated to the latest version")
+    return True
+
+
+def test_legacy_database():
+    print("🧪 Testing migrations on a legacy database...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'legacy.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT UNIQUE, password TEXT, full_name TEXT, role TEXT)')
+    conn.execute("INSERT INTO users (email, role) VALUES ('resident@barangay.com', 'resident')")
+    conn.commit()
+    conn.close()
+
+    migrate(db_path, verbose=False)
+
+    conn = sqlite3.connect(db_path)
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(users)')]
+    assert 'is_banned' in columns and 'fake_booking_violations' in columns
+    assert conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 1  # Data kept
+    conn.close()
+
+    status = check_schema(db_path, required_columns={'users': ['email_verified']})
+    assert status['missing_columns'] == {'users': ['email_verified']}
+    print("✅ Legacy database upgraded in place and drift reported")
+    return True
+
+
+def test_session_auth_schema():
+    print("🧪 Testing the session auth schema used by server_updated.py...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'sessions.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT UNIQUE, password TEXT, full_name TEXT, role TEXT)")
+    conn.execute("INSERT INTO users (email, password, full_name, role) VALUES ('old@x.com', 'aaa', 'Old User', 'resident')")
+    conn.commit()
+    conn.close()
+
+    migrate(db_path, verbose=False)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (email, password, full_name, role) VALUES ('new@x.com', 'bbb', 'New User', 'resident')")
+    conn.execute("UPDATE users SET password = 'ccc' WHERE email = 'old@x.com'")
+    assert conn.execute('SELECT email, password_hash, is_active FROM users ORDER BY id').fetchall() == [
+        ('old@x.com', 'ccc', 1), ('new@x.com', 'bbb', 1)]
+    conn.execute("INSERT INTO user_sessions (user_id, session_token, expires_at) VALUES (1, 'token', '2099-01-01')")
+    assert conn.execute('SELECT is_active FROM user_sessions').fetchone() == (1,)
+    conn.close()
+
+    status = check_schema(db_path, required_columns={
+        'users': ['password_hash', 'is_active', 'last_login'],
+        'facilities': ['min_booking_hours', 'max_booking_hours'],
+        'user_sessions': ['user_id', 'session_token', 'is_active', 'expires_at'],
+        'barangay_events': ['event_reference', 'created_at'],
+    })
+    assert status['up_to_date']
+    print("✅ Sessions, password hashes and events work on a migrated database")
+    return True
+
+
+if __name__ == "__main__":
+    test_fresh_database()
+    test_legacy_database()
+    test_session_auth_schema()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Row Serializers Test
+Checks compiled row mappers and the JSON encoders
+"""
+
+import json
+import sqlite3
+from flask import Flask, request
+import serializers
+
+
+def test_compiled_mapper():
+    print("🧪 Testing compiled row mappers...")
+
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row  # Overridden per cursor by the serializer
+    conn.execute('CREATE TABLE t (id INTEGER, user_id INTEGER, is_active BOOLEAN, amenities TEXT, secret TEXT)')
+    conn.executemany('INSERT INTO t VALUES (?, ?, ?, ?, ?)', [
+        (1, 7, 1, '["wifi", "stage"]', 'x'),
+        (2, 8, None, 'not json', 'y'),
+        (3, 9, 0, None, 'z'),
+    ])
+    rows = serializers.RowSerializer(
+        rename={'user_id': 'residentId', 'secret': None},
+        booleans=('is_active',),
+        json_columns={'amenities': []},
+    )
+    result = rows.all(conn.execute('SELECT * FROM t ORDER BY id'))
+    assert result[0] == {'id': 1, 'residentId': 7, 'is_active': True, 'amenities': ['wifi', 'stage']}
+    assert (result[1]['is_active'], result[1]['amenities']) == (None, [])
+    assert (result[2]['is_active'], result[2]['amenities']) == (False, [])
+    result[1]['amenities'].append('mutated')
+    assert result[2]['amenities'] == [], "JSON defaults must not be shared between rows"
+
+    # One mapper per column list, reused across queries
+    rows.all(conn.execute('SELECT * FROM t'))
+    rows.all(conn.execute('SELECT id FROM t'))
+    assert len(rows._mappers) == 2
+    conn.close()
+    print("✅ Renames, booleans and JSON columns are applied by one compiled mapper")
+    return True
+
+
+def test_encoders():
+    print("🧪 Testing JSON encoders...")
+
+    payload = {'success': True, 'data': [{'id': 1, 'name': 'Covered Court ñ', 'rate': None}]}
+    for name in serializers.ENCODERS:
+        assert json.loads(serializers.dumps(payload, name)) == payload
+    assert serializers.get_encoder('missing') is serializers.ENCODERS['json']
+
+    serializers.register_encoder('sorted', lambda p: json.dumps(p, sort_keys=True).encode())
+    try:
+        assert serializers.dumps({'b': 1, 'a': 2}, 'sorted') == b'{"a": 2, "b": 1}'
+    finally:
+        serializers.ENCODERS.pop('sorted')
+    print(f"✅ Encoders round-trip: {', '.join(serializers.ENCODERS)}")
+    return True
+
+
+def test_streaming():
+    print("🧪 Testing streamed listings...")
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE t (id INTEGER, name TEXT)')
+    conn.executemany('INSERT INTO t VALUES (?, ?)', [(i, f'row {i}') for i in range(1, 8)])
+    rows = serializers.RowSerializer()
+    assert [len(batch) for batch in rows.batches(conn.execute('SELECT * FROM t'), batch_size=3)] == [3, 3, 1]
+
+    app = Flask(__name__)
+
+    @app.route('/rows')
+    def listing():
+        stream = serializers.stream_format(request)
+        batches = rows.batches(conn.execute('SELECT * FROM t ORDER BY id'), batch_size=3)
+        return serializers.stream_response(batches, ndjson=stream == 'ndjson')
+
+    client = app.test_client()
+    response = client.get('/rows')
+    assert response.is_streamed and response.mimetype == 'application/json'
+    body = response.get_json()
+    assert body['success'] and [row['id'] for row in body['data']] == list(range(1, 8))
+
+    response = client.get('/rows', headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data().decode().splitlines()
+    assert [json.loads(line)['name'] for line in lines] == [f'row {i}' for i in range(1, 8)]
+
+    with app.test_request_context():
+        empty = serializers.stream_response(iter([[]]))
+        assert json.loads(b''.join(empty.response)) == {'success': True, 'data': []}
+    with app.test_request_context('/?stream=true', headers={'Accept': '*/*'}):
+        assert serializers.stream_format(request) == 'json'
+    with app.test_request_context('/'):
+        assert serializers.stream_format(request) is None
+    conn.close()
+    print("✅ JSON array and NDJSON streams carry every row")
+    return True
+
+
+if __name__ == "__main__":
+    test_compiled_mapper()
+    test_encoders()
+    test_streaming()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Slot Occupancy Test
+Checks that per facility/day slot states are rebuilt and invalidated with bookings
+"""
+
+import os
+import sqlite3
+import tempfile
+import slot_occupancy
+import time_model
+from schema_migrations import migrate
+
+DAY = time_model.day_key('2026-03-10')
+
+
+def add_booking(conn, reference, user_id, timeslot, status='pending'):
+    fields = time_model.booking_time_fields('2026-03-10', timeslot)
+    cursor = conn.execute('''
+        INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                              end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount,
+                              status, day_key, start_minute, end_minute)
+        VALUES (?, ?, 1, 0, '2026-03-10', ?, ?, 2, '', 0, 0, 0, ?, ?, ?, ?)
+    ''', (reference, user_id, timeslot, timeslot, status,
+          fields['day_key'], fields['start_minute'], fields['end_minute']))
+    return cursor.lastrowid
+
+
+def test_slot_occupancy():
+    print("🧪 Testing slot occupancy...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'occupancy.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (1, 'r@x.com', 'R', 'resident')")
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (2, 'o@x.com', 'O', 'official')")
+    for order, (start, end) in enumerate((('6:00 AM', '8:00 AM'), ('8:00 AM', '10:00 AM'), ('10:00 AM', '12:00 PM'))):
+        conn.execute('INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order) VALUES (1, ?, ?, 120, ?)',
+                     (start, end, order))
+    slots = time_model.facility_slots(conn, 1)
+
+    first = add_booking(conn, 'BR1', 1, '6:00 AM - 10:00 AM')
+    assert slot_occupancy.refresh(conn, 1, DAY) == [1, 1, 0]
+    assert slot_occupancy.lookup(conn, 1, DAY, slots) == [1, 1, 0]
+    print("✅ A 6-10 AM booking marks both slots it covers")
+
+    # Booking writes invalidate the stored row; the write path rebuilds it
+    conn.execute("UPDATE bookings SET status = 'approved' WHERE id = ?", (first,))
+    assert slot_occupancy.lookup(conn, 1, DAY, slots) is None
+    assert slot_occupancy.refresh(conn, 1, DAY) == [2, 2, 0]
+    add_booking(conn, 'BR2', 2, 'ALL DAY', status='approved')
+    assert slot_occupancy.lookup(conn, 1, DAY, slots) is None
+    assert slot_occupancy.refresh(conn, 1, DAY) == [3, 3, 3]
+    conn.execute('DELETE FROM bookings')
+    assert slot_occupancy.refresh(conn, 1, DAY) == [0, 0, 0]
+    print("✅ Status changes, official bookings and deletes are reflected")
+
+    # Anything but rejected keeps its slots locked, as the old string-matching check did,
+    # but closed bookings are reported as locked rather than approved
+    add_booking(conn, 'BR3', 1, '6:00 AM - 8:00 AM', status='cancelled')
+    add_booking(conn, 'BR4', 1, '8:00 AM - 10:00 AM', status='rejected')
+    add_booking(conn, 'BR6', 1, '10:00 AM - 12:00 PM', status='no_show')
+    assert slot_occupancy.refresh(conn, 1, DAY) == [4, 0, 4]
+    add_booking(conn, 'BR7', 1, '6:00 AM - 8:00 AM', status='completed')
+    add_booking(conn, 'BR8', 1, '10:00 AM - 12:00 PM')
+    assert slot_occupancy.refresh(conn, 1, DAY) == [4, 0, 1]
+    assert [slot_occupancy.STATE_NAMES[state] for state in [4, 0, 1]] == ['locked', 'free', 'pending']
+    conn.execute('DELETE FROM bookings')
+    slot_occupancy.refresh(conn, 1, DAY)
+    print("✅ Only rejected bookings free their slots; closed ones show as locked")
+
+    # Written without the integer columns (server_updated.py, seed scripts): triggers still invalidate
+    conn.execute('''
+        INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                              end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount, status)
+        VALUES ('BR5', 1, 1, 0, '2026-03-10', '10:00 AM', '12:00 PM', 2, '', 0, 0, 0, 'pending')
+    ''')
+    assert slot_occupancy.lookup(conn, 1, DAY, slots) is None
+    assert slot_occupancy.refresh(conn, 1, DAY) == [0, 0, 1]
+    print("✅ Bookings from other writers invalidate and fill the stored row")
+
+    conn.execute("INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order) VALUES (1, '1:00 PM', '3:00 PM', 120, 3)")
+    assert slot_occupancy.lookup(conn, 1, DAY, time_model.facility_slots(conn, 1)) is None
+    conn.close()
+    print("✅ Changing a facility's time slots invalidates its rows")
+    return True
+
+
+def test_slot_occupancy_range():
+    print("🧪 Testing slot occupancy date ranges...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'occupancy_range.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (1, 'r@x.com', 'R', 'resident')")
+    for order, (start, end) in enumerate((('6:00 AM', '8:00 AM'), ('8:00 AM', '10:00 AM'))):
+        conn.execute('INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order) VALUES (1, ?, ?, 120, ?)',
+                     (start, end, order))
+    slots = time_model.facility_slots(conn, 1)
+    add_booking(conn, 'BR1', 1, '6:00 AM - 8:00 AM')
+    add_booking(conn, 'BR2', 1, 'ALL DAY', status='approved')
+
+    days = list(range(DAY - 1, DAY + 2))
+    assert slot_occupancy.lookup_range(conn, 1, days[0], days[-1], slots) == {}
+    built = slot_occupancy.refresh_range(conn, 1, days)
+    assert built == {DAY - 1: [0, 0], DAY: [2, 2], DAY + 1: [0, 0]}
+    assert slot_occupancy.lookup_range(conn, 1, days[0], days[-1], slots) == built
+    assert [slot_occupancy.summarize(built[day]) for day in days] == ['free', 'full', 'free']
+    assert slot_occupancy.summarize([1, 0]) == 'partial'
+    conn.close()
+    print("✅ Free days are stored too, so a month is one range lookup")
+    return True
+
+
+def test_slot_occupancy_grid():
+    print("🧪 Testing multi-facility occupancy grid...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'occupancy_grid.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (1, 'r@x.com', 'R', 'resident')")
+    for facility_id, count in ((1, 2), (2, 3)):
+        for order in range(count):
+            conn.execute('INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order) VALUES (?, ?, ?, 120, ?)',
+                         (facility_id, f'{6 + 2 * order}:00 AM', f'{8 + 2 * order}:00 AM', order))
+    add_booking(conn, 'BR1', 1, '8:00 AM - 10:00 AM')
+
+    slots = time_model.slots_by_facility(conn, [1, 2])
+    assert [len(slots[1]), len(slots[2])] == [2, 3]
+    assert slot_occupancy.lookup_grid(conn, slots, DAY, DAY) == {}
+    # Reads compute missing cells without storing them (no write lock on GET)
+    assert slot_occupancy.grid_states(conn, slots, DAY, DAY) == {(1, DAY): [0, 1], (2, DAY): [0, 0, 0]}
+    assert slot_occupancy.current(conn, 1, DAY, slots[1]) == [0, 1]
+    assert slot_occupancy.lookup_grid(conn, slots, DAY, DAY) == {}
+    built = slot_occupancy.refresh_grid(conn, {1: [DAY], 2: [DAY]})
+    assert built == {(1, DAY): [0, 1], (2, DAY): [0, 0, 0]}
+    assert slot_occupancy.lookup_grid(conn, slots, DAY, DAY) == built
+    conn.close()
+    print("✅ Every facility's slot states come back from one query")
+    return True
+
+
+def test_next_available():
+    print("🧪 Testing next available slot search...")
+
+    slots = [(1, 360, 480, '6:00 AM - 8:00 AM'), (2, 480, 600, '8:00 AM - 10:00 AM'), (3, 600, 720, '10:00 AM - 12:00 PM')]
+    assert slot_occupancy.free_runs(slots, [0, 1, 0]) == [(360, 480, '6:00 AM - 8:00 AM'), (600, 720, '10:00 AM - 12:00 PM')]
+    assert slot_occupancy.free_runs(slots, [0, 1, 0], duration=240) == []
+    assert slot_occupancy.free_runs(slots, [1, 0, 0], duration=240) == [(480, 720, '8:00 AM - 12:00 PM')]
+    assert slot_occupancy.free_runs(slots, [0, 0, 0], not_before=400) == [(480, 600, '8:00 AM - 10:00 AM'), (600, 720, '10:00 AM - 12:00 PM')]
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'occupancy_next.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (1, 'r@x.com', 'R', 'resident')")
+    for start, end in (('6:00 AM', '8:00 AM'), ('8:00 AM', '10:00 AM')):
+        conn.execute("INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order) VALUES (1, ?, ?, 120, 0)",
+                     (start, end))
+    add_booking(conn, 'BR1', 1, 'ALL DAY')
+    found = slot_occupancy.next_available(conn, {1: DAY + 5}, DAY, duration=240, limit=2)
+    assert [(s['date'], s['timeslot']) for s in found] == [('2026-03-11', '6:00 AM - 10:00 AM'),
+                                                           ('2026-03-12', '6:00 AM - 10:00 AM')]
+    assert slot_occupancy.next_available(conn, {1: DAY}, DAY) == []  # Booking window ends on a full day
+    assert conn.execute('SELECT COUNT(*) FROM slot_occupancy').fetchone()[0] == 0  # Read-only search
+    conn.close()
+    print("✅ Searches forward past full days and joins back-to-back slots for longer durations")
+    return True
+
+
+if __name__ == "__main__":
+    test_slot_occupancy()
+    test_slot_occupancy_range()
+    test_slot_occupancy_grid()
+    test_next_available()
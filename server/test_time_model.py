@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Integer Time Model Test
+Checks timeslot parsing and the migration that backfills minute/day columns
+"""
+
+import os
+import sqlite3
+import tempfile
+import booking_intervals
+import slot_occupancy
+import time_model
+from schema_migrations import migrate
+
+
+def test_parsing():
+    print("🧪 Testing timeslot parsing...")
+
+    assert time_model.parse_clock('6:00 AM') == 360
+    assert time_model.parse_clock('12:00 PM') == 720
+    assert time_model.parse_clock('12:30 am') == 30
+    assert time_model.parse_clock('18:30') == 1110
+    assert time_model.parse_clock('13:00 PM') is None
+    assert time_model.parse_timeslot('6:00 AM - 8:00 AM') == (360, 480)
+    assert time_model.parse_timeslot('10:00 PM - 12:00 AM') == (1320, 1440)
+    assert time_model.parse_timeslot('10:00 PM - 2:00 AM') == (1320, 1560)
+    assert time_model.parse_timeslot('ALL DAY') == (0, 1440)
+    assert time_model.parse_timeslot('sometime') is None
+    assert time_model.format_timeslot(360, 480) == '6:00 AM - 8:00 AM'
+    assert time_model.format_timeslot(0, 1440) == 'ALL DAY'
+    assert time_model.day_key('1970-01-02') == 1
+    assert time_model.day_from_key(time_model.day_key('2026-03-10T08:00:00')) == '2026-03-10'
+    assert time_model.day_key('not a date') is None
+    print("✅ Display strings round-trip through minutes and day keys")
+    return True
+
+
+def test_backfill_migration():
+    print("🧪 Testing time model backfill...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'times.db')
+    migrate(db_path, target=7, verbose=False)
+    conn = sqlite3.connect(db_path)
+    slot_id = conn.execute('''
+        INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order)
+        VALUES (1, '8:00 AM', '10:00 AM', 120, 1)
+    ''').lastrowid
+    for reference, timeslot in (('BR1', '8:00 AM - 10:00 AM'), ('BR2', 'ALL DAY'), ('BR3', 'whenever')):
+        conn.execute('''
+            INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                                  end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount)
+            VALUES (?, 1, 1, 0, '2026-03-10', ?, ?, 2, '', 0, 0, 0)
+        ''', (reference, timeslot, timeslot))
+    conn.commit()
+    conn.close()
+
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('''
+        SELECT booking_reference, day_key, start_minute, end_minute, time_slot_id FROM bookings ORDER BY id
+    ''').fetchall()
+    day = time_model.day_key('2026-03-10')
+    assert rows == [('BR1', day, 480, 600, slot_id), ('BR2', day, 0, 1440, 0), ('BR3', day, None, None, 0)]
+    print("✅ Existing bookings got minutes, day keys and their time_slots id")
+
+    plan = ' '.join(row[3] for row in conn.execute('''
+        EXPLAIN QUERY PLAN SELECT id FROM bookings
+        WHERE facility_id = 1 AND day_key = ? AND start_minute < 600 AND end_minute > 480
+    ''', (day,)))
+    conn.close()
+    assert 'idx_bookings_facility_day_minutes' in plan
+    print("✅ Overlap query is an index range scan")
+    return True
+
+
+def test_sql_matches_python():
+    print("🧪 Testing the SQL time parsers against the Python ones...")
+
+    conn = sqlite3.connect(':memory:')
+    cases = [
+        ('2026-03-10', '6:00 AM - 8:00 AM', '6:00 AM - 8:00 AM'), ('2026-03-10', '6:00 AM', '8:00 AM'),
+        ('2026-03-10', 'ALL DAY', 'ALL DAY'), ('2026-03-10', 'all day (event)', None),
+        ('2026-03-10T08:00:00', '10:00 PM - 12:00 AM', None), ('2026-03-10', '10:00 PM', '2:00 AM'),
+        ('2026-03-10', '6 a.m. - 7:30 p.m.', None), ('2026-03-10', '18:30', ''), ('2026-03-10', '24:00', None),
+        ('2026-03-10', '13:00 PM - 2 PM', None), ('2026-03-10', '9:60 AM - 10 AM', None),
+        ('2026-03-10', 'whenever', 'whenever'), ('2026-03-10', '', ''), ('2026-03-10', None, None),
+        ('2026-02-30', '6:00 AM', '8:00 AM'), ('03/10/2026', '6:00 AM', '8:00 AM'), (None, '  9:00AM ', '11:00AM'),
+    ]
+    sql = time_model.sql_booking_time_fields('?1', '?2', '?3')
+    for booking_date, start_time, end_time in cases:
+        fields = time_model.booking_time_fields(booking_date, start_time, end_time)
+        expected = (fields['day_key'], fields['start_minute'], fields['end_minute'])
+        actual = conn.execute(sql, (booking_date, start_time, end_time)).fetchone()
+        assert actual == expected, f"{(booking_date, start_time, end_time)}: SQL {actual}, Python {expected}"
+    conn.close()
+    print(f"✅ {len(cases)} date/timeslot strings parse the same in SQL and Python")
+    return True
+
+
+def test_time_fields_trigger():
+    print("🧪 Testing bookings written without the integer columns...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'trigger.db')
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, full_name, role) VALUES (1, 'res@x.com', 'Resident One', 'resident')")
+    conn.execute("INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order) VALUES (1, '6:00 AM', '8:00 AM', 120, 1)")
+    conn.execute("INSERT INTO time_slots (facility_id, start_time, end_time, duration_minutes, sort_order) VALUES (1, '8:00 AM', '10:00 AM', 120, 2)")
+    # Written the way server_updated.py and the seed scripts do: no day_key/start_minute/end_minute
+    booking_id = conn.execute('''
+        INSERT INTO bookings (booking_reference, user_id, facility_id, time_slot_id, booking_date, start_time,
+                              end_time, duration_hours, purpose, base_rate, downpayment_amount, total_amount, status)
+        VALUES ('BR1', 1, 1, 1, '2026-03-10', '6:00 AM', '8:00 AM', 2, '', 0, 0, 0, 'pending')
+    ''').lastrowid
+    day = time_model.day_key('2026-03-10')
+    assert conn.execute('SELECT day_key, start_minute, end_minute FROM bookings').fetchone() == (day, 360, 480)
+    assert booking_intervals.find_conflicts(conn, 1, day, 0, 1440) == [booking_id]
+    states = slot_occupancy.compute(conn, 1, day)
+    assert [slot_occupancy.STATE_NAMES[state] for state in states] == ['pending', 'free']
+    print("✅ Trigger fills the columns, so the booking locks its slot and shows up as a conflict")
+
+    conn.execute("UPDATE bookings SET start_time = '8:00 AM - 10:00 AM', end_time = '8:00 AM - 10:00 AM'")
+    assert conn.execute('SELECT start_minute, end_minute FROM bookings').fetchone() == (480, 600)
+    assert booking_intervals.find_conflicts(conn, 1, day, 360, 480) == []
+    conn.close()
+    print("✅ Rescheduling by the display strings moves the integer columns too")
+    return True
+
+
+if __name__ == "__main__":
+    test_parsing()
+    test_backfill_migration()
+    test_sql_matches_python()
+    test_time_fields_trigger()
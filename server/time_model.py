@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Integer Time Model for Barangay Reserve
+Converts between the display strings the app uses ("6:00 AM - 8:00 AM",
+"ALL DAY", "2026-03-10") and integers that sort and compare correctly:
+minutes since midnight and a day number
+
+Bookings keep start_time/end_time as display strings for the API; the
+start_minute/end_minute/day_key columns are what queries filter and sort on.
+"""
+
+import re
+from datetime import date, timedelta
+
+MINUTES_PER_DAY = 24 * 60
+ALL_DAY = 'ALL DAY'
+_EPOCH = date(1970, 1, 1)
+
+_CLOCK = re.compile(r'^\s*(\d{1,2})(?::(\d{2}))?\s*([AaPp]\.?[Mm]\.?)?\s*$')
+
+
+def parse_clock(value):
+    """'6:00 AM' / '18:30' -> minutes since midnight, None if unparseable"""
+    match = _CLOCK.match(value or '')
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if minute >= 60:
+        return None
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem[0].lower() == 'p' else 0)
+    elif hour > 24 or (hour == 24 and minute):
+        return None
+    return hour * 60 + minute
+
+
+def parse_timeslot(value):
+    """'6:00 AM - 8:00 AM' -> (360, 480); 'ALL DAY' -> (0, 1440); None if unparseable"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.upper().startswith(ALL_DAY):
+        return 0, MINUTES_PER_DAY
+    start, sep, end = value.partition('-')
+    if not sep:
+        start_minute = parse_clock(start)
+        return None if start_minute is None else (start_minute, start_minute)
+    start_minute, end_minute = parse_clock(start), parse_clock(end)
+    if start_minute is None or end_minute is None:
+        return None
+    if end_minute <= start_minute:
+        end_minute += MINUTES_PER_DAY  # Runs past midnight: "10:00 PM - 12:00 AM" ends at 1440
+    return start_minute, end_minute
+
+
+def format_clock(minute):
+    hour, minute = divmod(minute % MINUTES_PER_DAY, 60)
+    return f"{hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def format_timeslot(start_minute, end_minute):
+    """Inverse of parse_timeslot, in the format the app displays"""
+    if start_minute == 0 and end_minute >= MINUTES_PER_DAY:
+        return ALL_DAY
+    return f"{format_clock(start_minute)} - {format_clock(end_minute)}"
+
+
+def day_key(value):
+    """'2026-03-10' (or an ISO timestamp) -> days since 1970-01-01, None if unparseable"""
+    try:
+        return (date.fromisoformat(str(value)[:10]) - _EPOCH).days
+    except (TypeError, ValueError):
+        return None
+
+
+def day_from_key(key):
+    return (_EPOCH + timedelta(days=key)).isoformat()
+
+
+def booking_label(start_time, end_time=None):
+    """The timeslot a booking row describes: server.py stores the whole label in start_time
+    (and again in end_time), server_updated.py stores the slot's start and end separately"""
+    if (not start_time or '-' in start_time or start_time.strip().upper().startswith(ALL_DAY)
+            or not end_time or not end_time.strip() or end_time.strip() == start_time.strip()):
+        return start_time
+    return f"{start_time} - {end_time}"
+
+
+def booking_time_fields(booking_date, start_time, end_time=None):
+    """Integer columns stored alongside a booking's display strings"""
+    minutes = parse_timeslot(booking_label(start_time, end_time))
+    return {
+        'day_key': day_key(booking_date),
+        'start_minute': minutes[0] if minutes else None,
+        'end_minute': minutes[1] if minutes else None,
+    }
+
+
+def facility_slots(conn, facility_id):
+    """[(time_slot_id, start_minute, end_minute, label)] in display order"""
+    return slots_by_facility(conn, [facility_id]).get(int(facility_id), [])
+
+
+def slots_by_facility(conn, facility_ids):
+    """{facility_id: facility_slots(...)} for several facilities with one query"""
+    facility_ids = [int(f) for f in facility_ids]
+    slots = {facility_id: [] for facility_id in facility_ids}
+    if not facility_ids:
+        return slots
+    for facility_id, slot_id, start_time, end_time in conn.execute(f'''
+        SELECT facility_id, id, start_time, end_time FROM time_slots
+        WHERE facility_id IN ({', '.join('?' * len(facility_ids))})
+        ORDER BY facility_id, sort_order, id
+    ''', facility_ids).fetchall():
+        label = f"{start_time} - {end_time}"
+        minutes = parse_timeslot(label)
+        if minutes:
+            slots[facility_id].append((slot_id, minutes[0], minutes[1], label))
+    return slots
+
+
+def resolve_time_slot_id(conn, facility_id, start_minute, end_minute):
+    """time_slots.id of the facility slot with exactly these minutes, 0 (the app's 'no slot') otherwise"""
+    for slot_id, slot_start, slot_end, _ in facility_slots(conn, facility_id):
+        if (slot_start, slot_end) == (start_minute, end_minute):
+            return slot_id
+    return 0
+
+
+def backfill_booking_times(cursor, batch_size=500):
+    """Fill start_minute/end_minute/day_key (and time_slot_id where it was 0) for older rows"""
+    updated = last_id = 0
+    while True:
+        rows = cursor.execute('''
+            SELECT id, facility_id, booking_date, start_time, end_time, time_slot_id FROM bookings
+            WHERE (day_key IS NULL OR start_minute IS NULL) AND id > ?
+            ORDER BY id LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        if not rows:
+            return updated
+        for booking_id, facility_id, booking_date, start_time, end_time, time_slot_id in rows:
+            last_id = booking_id
+            fields = booking_time_fields(booking_date, start_time, end_time)
+            if not time_slot_id and fields['start_minute'] is not None:
+                time_slot_id = resolve_time_slot_id(cursor, facility_id, fields['start_minute'], fields['end_minute'])
+            cursor.execute('''
+                UPDATE bookings SET day_key = ?, start_minute = ?, end_minute = ?, time_slot_id = ?
+                WHERE id = ?
+            ''', (fields['day_key'], fields['start_minute'], fields['end_minute'], time_slot_id or 0, booking_id))
+            updated += 1
+
+
+# SQL versions of the parsers above, for triggers that fill the integer columns whoever writes the
+# row (scripts and server_updated.py included). They must agree with the Python versions;
+# test_time_model.py compares them.
+
+def sql_day_key(expr):
+    """SQL for day_key(expr)"""
+    day = f"substr({expr}, 1, 10)"
+    # date(x, '+0 days') normalizes impossible days like 02-30, which date.fromisoformat() rejects
+    return f"(CASE WHEN date({day}, '+0 days') = {day} THEN CAST(julianday({day}) - 2440587.5 AS INTEGER) END)"
+
+
+def sql_clock(expr):
+    """SQL for parse_clock(expr)"""
+    return f'''(SELECT CASE
+            WHEN NOT (d GLOB '[0-9]' OR d GLOB '[0-9][0-9]' OR d GLOB '[0-9]:[0-5][0-9]' OR d GLOB '[0-9][0-9]:[0-5][0-9]') THEN NULL
+            WHEN half IS NOT NULL THEN CASE WHEN h BETWEEN 1 AND 12 THEN (h % 12 + half) * 60 + m END
+            WHEN h < 24 OR (h = 24 AND m = 0) THEN h * 60 + m
+        END
+        FROM (SELECT d, half, CAST(CASE WHEN instr(d, ':') THEN substr(d, 1, instr(d, ':') - 1) ELSE d END AS INTEGER) AS h,
+                     CASE WHEN instr(d, ':') THEN CAST(substr(d, instr(d, ':') + 1) AS INTEGER) ELSE 0 END AS m
+              FROM (SELECT CASE WHEN c GLOB '*[AP]M' THEN substr(c, 1, length(c) - 2) ELSE c END AS d,
+                           CASE WHEN c GLOB '*AM' THEN 0 WHEN c GLOB '*PM' THEN 12 END AS half
+                    FROM (SELECT upper(replace(replace(trim({expr}), '.', ''), ' ', '')) AS c))))'''
+
+
+def sql_booking_label(start_expr, end_expr):
+    """SQL for booking_label(start_expr, end_expr)"""
+    return f'''(CASE WHEN instr({start_expr}, '-') OR upper(trim({start_expr})) LIKE 'ALL DAY%'
+                   OR {end_expr} IS NULL OR trim({end_expr}) = '' OR trim({end_expr}) = trim({start_expr})
+              THEN {start_expr} ELSE {start_expr} || ' - ' || {end_expr} END)'''
+
+
+def sql_booking_time_fields(date_expr, start_expr, end_expr):
+    """SELECT of (day_key, start_minute, end_minute) matching booking_time_fields()"""
+    return f'''SELECT {sql_day_key(date_expr)} AS day_key,
+               CASE WHEN all_day THEN 0 WHEN s IS NULL OR e IS NULL THEN NULL ELSE s END AS start_minute,
+               CASE WHEN all_day THEN {MINUTES_PER_DAY} WHEN s IS NULL OR e IS NULL THEN NULL
+                    WHEN sep AND e <= s THEN e + {MINUTES_PER_DAY} ELSE e END AS end_minute
+        FROM (SELECT all_day, sep, {sql_clock("CASE WHEN sep THEN substr(v, 1, sep - 1) ELSE v END")} AS s,
+                     {sql_clock("CASE WHEN sep THEN substr(v, sep + 1) ELSE v END")} AS e
+              FROM (SELECT v, upper(v) LIKE 'ALL DAY%' AS all_day, instr(v, '-') AS sep
+                    FROM (SELECT trim({sql_booking_label(start_expr, end_expr)}) AS v)))'''